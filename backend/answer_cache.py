@@ -0,0 +1,231 @@
+"""
+Answer Cache for EchoLearn AI - This file remembers answers to questions that were already asked
+Semantic cache keyed on question embeddings and retrieved chunks - Saves an LLM call and a TTS call per repeat
+"""
+
+from collections import OrderedDict  # Import OrderedDict for least-recently-used eviction
+from pathlib import Path  # Import Path to check that cached audio still exists
+from typing import Dict, List, Optional, Tuple  # Import types for organization
+import hashlib  # Import hashlib for exact-match prompt keys
+import threading  # Import threading because many requests use the cache at once
+import logging  # Import logging for tracking cache activity
+import time  # Import time for expiry checks
+import uuid  # Import uuid for naming cache entries
+
+import numpy as np  # Import numpy for cosine similarity math
+
+from config import Config  # Import project settings
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for the answer cache
+
+
+class AnswerCache:  # Define the semantic cache for tutor answers
+    """Cache answers by question embedding, retrieved chunk IDs and index generation"""
+
+    def __init__(  # Initialize cache settings
+        self,
+        similarity_threshold: float = None,
+        max_entries: int = None,
+        ttl_seconds: int = None
+    ):
+        """
+        Initialize Answer Cache
+        """
+        self.similarity_threshold = similarity_threshold or Config.ANSWER_CACHE_SIMILARITY  # How close counts as "same"
+        self.max_entries = max_entries or Config.ANSWER_CACHE_MAX_ENTRIES  # Limit on remembered answers
+        self.ttl_seconds = ttl_seconds or Config.ANSWER_CACHE_TTL_SECONDS  # How long an answer stays valid
+
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()  # entry_id -> entry (oldest first)
+        self.groups: Dict[Tuple, List[str]] = {}  # (generation, chunk_ids) -> entry ids with that context
+        self._lock = threading.Lock()  # Protect the cache from concurrent updates
+
+        self.hits = 0  # Number of questions answered from the cache
+        self.misses = 0  # Number of questions that needed the LLM
+        self.latency_saved = 0.0  # Seconds of LLM/TTS work skipped thanks to hits
+
+    def lookup(  # Find a cached answer for a question
+        self,
+        embedding: np.ndarray,
+        chunk_ids: Tuple[int, ...],
+        generation: int
+    ) -> Optional[Dict]:
+        """
+        Find a cached answer whose question is similar enough and used the same chunks
+        """
+        vector = self._normalize(embedding)
+        group_key = (generation, tuple(chunk_ids))
+        now = time.time()
+
+        with self._lock:
+            best_entry, best_score = None, -1.0
+            for entry_id in list(self.groups.get(group_key, [])):  # Only answers built from the same material
+                entry = self.entries[entry_id]
+                if now - entry["created"] > self.ttl_seconds:  # Too old - forget it
+                    self._remove(entry_id)
+                    continue
+                score = float(np.dot(entry["embedding"], vector))  # Cosine similarity (both normalized)
+                if score > best_score:
+                    best_entry, best_score = entry, score
+
+            if best_entry is None or best_score < self.similarity_threshold:  # Nothing close enough
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(best_entry["id"])  # Mark as recently used
+            self.hits += 1
+            saved = best_entry["generation_time"]  # We skipped the LLM call...
+            if self.audio_available(best_entry):
+                saved += best_entry["synthesis_time"]  # ...and the TTS call
+            self.latency_saved += saved
+
+            logger.info(f"Answer cache hit (similarity {best_score:.3f})")
+            return dict(best_entry, similarity=best_score)
+
+    def store(  # Remember a freshly generated answer
+        self,
+        embedding: np.ndarray,
+        chunk_ids: Tuple[int, ...],
+        generation: int,
+        answer: str,
+        generation_time: float
+    ) -> str:
+        """
+        Store an answer and return its cache key
+        """
+        entry_id = uuid.uuid4().hex  # Key the server uses to attach audio later
+        entry = {
+            "id": entry_id,
+            "embedding": self._normalize(embedding),
+            "group": (generation, tuple(chunk_ids)),
+            "answer": answer,
+            "generation_time": generation_time,  # How long the LLM took (saved on every hit)
+            "audio_path": None,  # Filled in once the answer has been spoken
+            "audio_segments": [],  # Per-sentence files for pipelined answers
+            "synthesis_time": 0.0,
+            "created": time.time()
+        }
+
+        with self._lock:
+            self.entries[entry_id] = entry
+            self.groups.setdefault(entry["group"], []).append(entry_id)
+            while len(self.entries) > self.max_entries:  # Too many - drop the least recently used
+                self._remove(next(iter(self.entries)))
+
+        return entry_id
+
+    def attach_audio(  # Save the pre-synthesized audio next to the cached answer
+        self,
+        cache_key: str,
+        audio_path: Optional[str] = None,
+        audio_segments: Optional[List[str]] = None,
+        synthesis_time: float = 0.0
+    ):
+        """
+        Attach synthesized audio to a cached answer so later hits skip TTS too
+        """
+        with self._lock:
+            entry = self.entries.get(cache_key)
+            if entry is None:  # Already evicted
+                return
+            entry["audio_path"] = audio_path
+            entry["audio_segments"] = list(audio_segments or [])
+            entry["synthesis_time"] = synthesis_time
+
+    def clear(self):  # Forget all answers (e.g. after the index was wiped)
+        """Clear all cached answers"""
+        with self._lock:
+            self.entries.clear()
+            self.groups.clear()
+        logger.info("Answer cache cleared")
+
+    def get_stats(self) -> Dict:  # Report for /metrics
+        """Get cache statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "latency_saved_seconds": round(self.latency_saved, 2)
+            }
+
+    def _remove(self, entry_id: str):  # Internal helper (caller holds the lock)
+        """Remove one entry from both lookup tables"""
+        entry = self.entries.pop(entry_id, None)
+        if entry is None:
+            return
+        group = self.groups.get(entry["group"], [])
+        if entry_id in group:
+            group.remove(entry_id)
+        if not group:
+            self.groups.pop(entry["group"], None)
+
+    @staticmethod
+    def audio_available(entry: Dict, audio_format: Optional[str] = None) -> bool:
+        """Check that the cached audio files still exist on disk (and are in audio_format, if given)"""
+        paths = [entry["audio_path"]] if entry["audio_path"] else entry["audio_segments"]
+        if audio_format and any(Path(p).suffix != f".{audio_format}" for p in paths):
+            return False
+        return bool(paths) and all(Path(p).exists() for p in paths)
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        """Scale a vector to length 1 so a dot product equals cosine similarity"""
+        vector = np.asarray(embedding, dtype="float32").reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+
+class PromptCache:  # Define an exact-match cache for fixed-purpose prompts
+    """Exact-match LRU cache keyed on the full prompt text"""
+
+    def __init__(self, max_entries: int = None):  # Initialize cache settings
+        """
+        Initialize Prompt Cache
+        """
+        self.max_entries = max_entries or Config.PROMPT_CACHE_MAX_ENTRIES  # Limit on remembered responses
+        self.entries: "OrderedDict[str, str]" = OrderedDict()  # prompt hash -> response
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, prompt: str) -> str:  # Build a short key for a prompt
+        """Hash the model name and prompt into a cache key"""
+        return hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:  # Look up a response
+        """Get a cached response or None"""
+        with self._lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)  # Mark as recently used
+            self.hits += 1
+            return self.entries[key]
+
+    def put(self, key: str, response: str):  # Save a response
+        """Store a response"""
+        with self._lock:
+            self.entries[key] = response
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:  # Drop the least recently used
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """Clear all cached responses"""
+        with self._lock:
+            self.entries.clear()
+
+    def get_stats(self) -> Dict:  # Report for /metrics
+        """Get cache statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
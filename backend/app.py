@@ -9,6 +9,7 @@ from pathlib import Path  # Import Path for file path manipulation
 import time  # Import time for delays or timestamps
 from audio_recorder_streamlit import audio_recorder  # Import tool to record voice in browser
 import base64  # Import base64 for encoding/decoding data
+import uuid  # Import uuid to give each browser tab its own conversation
 from config import Config  # Import configuration settings
 
 # Configuration
@@ -71,6 +72,13 @@ st.markdown("""
 """, unsafe_allow_html=True)  # Allow HTML/CSS injection into Streamlit
 
 
+def session_headers():  # Define function that identifies this user's conversation to the backend
+    """Headers carrying this Streamlit session's conversation ID"""
+    if "session_id" not in st.session_state:  # First request from this browser tab
+        st.session_state["session_id"] = uuid.uuid4().hex
+    return {"X-Session-ID": st.session_state["session_id"]}
+
+
 def check_server_health():  # Define function to check if backend is alive
     """Check if backend server is running"""
     try:  # Start error handling block
@@ -113,6 +121,7 @@ def ask_question_text(question, use_retrieval=True):  # Define function to ask t
         response = requests.post(  # Send the question to the backend
             f"{API_BASE_URL}/ask",  # The target "ask" endpoint
             data=data,  # Pass the dictionary data
+            headers=session_headers(),  # Keep this user's conversation separate
             timeout=120  # Allow 2 minutes for a response
         )
         
@@ -140,6 +149,7 @@ def ask_question_audio(audio_bytes, use_retrieval=True):  # Define function to a
             f"{API_BASE_URL}/ask",  # The target "ask" endpoint
             files=files,  # Pass the audio file
             data=data,  # Pass the options
+            headers=session_headers(),  # Keep this user's conversation separate
             timeout=120  # Allow 2 minutes
         )
         
@@ -248,7 +258,7 @@ def main():  # Define the main application logic
         # Clear memory button
         if st.button("🗑️ Clear Conversation"):  # If user clicks clear button
             try:  # Try to contact server
-                requests.post(f"{API_BASE_URL}/clear-memory")  # Tell backend to forget chat history
+                requests.post(f"{API_BASE_URL}/clear-memory", headers=session_headers())  # Tell backend to forget our chat history
                 st.success("Conversation cleared!")  # Show success message
                 st.rerun()  # Refresh the UI
             except:  # If request fails
@@ -0,0 +1,77 @@
+"""
+Audio Encoder for EchoLearn AI - This file turns a raw waveform into a compressed audio file in memory
+Converts model output to 16-bit PCM with NumPy and encodes MP3/Opus with PyAV - No temporary WAV files, no ffmpeg subprocess
+"""
+
+from io import BytesIO  # Import BytesIO to encode without touching the disk
+from typing import Dict  # Import types for organization
+
+import numpy as np  # Import numpy for waveform conversion
+
+from config import Config  # Import project settings
+
+# Container, encoder and the sample rates each encoder accepts
+FORMATS: Dict[str, Dict] = {
+    "mp3": {"container": "mp3", "codec": "libmp3lame", "rates": (8000, 11025, 12000, 16000, 22050, 24000, 32000, 44100, 48000)},
+    "opus": {"container": "ogg", "codec": "libopus", "rates": (8000, 12000, 16000, 24000, 48000)},
+}
+
+
+def to_pcm16(waveform) -> np.ndarray:  # Model output (list, tensor or array of floats) -> int16 samples
+    """Convert a float waveform in [-1, 1] to mono 16-bit PCM"""
+    audio = np.asarray(waveform, dtype=np.float32).reshape(-1)  # Coqui returns a list of floats
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def resample(audio: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:  # Linear interpolation
+    """Resample a mono waveform (good enough for speech; no extra dependency)"""
+    if source_rate == target_rate or len(audio) == 0:
+        return audio
+    length = int(round(len(audio) * target_rate / source_rate))
+    positions = np.arange(length) * (source_rate / target_rate)
+    return np.interp(positions, np.arange(len(audio)), audio.astype(np.float32)).astype(audio.dtype)
+
+
+def encode(waveform, sample_rate: int, audio_format: str = "mp3", bitrate_kbps: int = None) -> bytes:
+    """
+    Encode a mono float waveform to MP3 or Opus bytes in memory
+    """
+    import av  # Imported here: PyAV is installed with faster-whisper, only needed when encoding locally
+
+    spec = FORMATS[audio_format]
+    audio = np.asarray(waveform, dtype=np.float32).reshape(-1)
+    rate = sample_rate
+    if rate not in spec["rates"]:  # e.g. Opus only takes 48 kHz-family rates
+        rate = min(spec["rates"], key=lambda candidate: (candidate < sample_rate, abs(candidate - sample_rate)))
+        audio = resample(audio, sample_rate, rate)
+    pcm = to_pcm16(audio)
+    if bitrate_kbps is None:
+        bitrate_kbps = Config.TTS_OPUS_BITRATE_KBPS if audio_format == "opus" else Config.TTS_MP3_BITRATE_KBPS
+
+    buffer = BytesIO()
+    with av.open(buffer, mode="w", format=spec["container"]) as container:
+        stream = container.add_stream(spec["codec"], rate=rate, layout="mono")
+        stream.bit_rate = bitrate_kbps * 1000
+        frame = av.AudioFrame.from_ndarray(pcm[np.newaxis, :], format="s16", layout="mono")
+        frame.sample_rate = rate
+        for packet in stream.encode(frame):  # PyAV splits the waveform into encoder-sized frames
+            container.mux(packet)
+        for packet in stream.encode(None):  # Flush the encoder
+            container.mux(packet)
+    return buffer.getvalue()
+
+
+def transcode(data: bytes, audio_format: str) -> bytes:  # e.g. gTTS MP3 -> Opus for mobile clients
+    """Decode compressed audio in memory and re-encode it in another format"""
+    import av  # Imported here: PyAV is installed with faster-whisper, only needed when encoding locally
+
+    pieces = []
+    with av.open(BytesIO(data)) as container:
+        stream = container.streams.audio[0]
+        sample_rate = stream.rate
+        resampler = av.AudioResampler(format="flt", layout="mono", rate=sample_rate)  # Packed float, one channel
+        for frame in container.decode(stream):
+            pieces.extend(chunk.to_ndarray().reshape(-1) for chunk in resampler.resample(frame))
+        pieces.extend(chunk.to_ndarray().reshape(-1) for chunk in resampler.resample(None))  # Flush
+    waveform = np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+    return encode(waveform, sample_rate, audio_format)
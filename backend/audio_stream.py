@@ -0,0 +1,198 @@
+"""
+Audio Stream for EchoLearn AI - This file lets the student hear an answer while it is still being spoken
+Synthesizes sentences in order and hands out the MP3 bytes as they arrive - Backs GET /audio/stream/{id}
+"""
+
+from typing import Callable, Dict, Iterator, List, Optional  # Import types for organization
+import queue  # Import queue for handing sentences to the speaking thread
+import threading  # Import threading for the speaking thread and waking readers
+import logging  # Import logging for tracking streams
+import time  # Import time for time-to-first-audio and expiry
+import uuid  # Import uuid for stream IDs
+
+from config import Config  # Import project settings
+from request_context import record_saved  # Import the counter of work skipped by cancellations
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for audio streams
+
+
+class AudioStream:  # One answer's audio, readable while it is being written
+    """Speak sentences in order in a background thread and buffer the MP3 bytes for any number of readers"""
+
+    def __init__(self, tts, on_complete: Optional[Callable[[List[str]], None]] = None):  # Initialize the stream
+        """
+        Initialize Audio Stream
+        """
+        self.id = uuid.uuid4().hex  # Used in the stream URL
+        self.tts = tts  # The voice engine that does the actual work
+        self.on_complete = on_complete  # Called with the per-sentence files once everything is spoken
+        self.chunks: List[bytes] = []  # Every MP3 chunk so far (late readers start from the beginning)
+        self.segments: List[str] = []  # Audio file of each finished sentence, in order
+        self.done = False
+        self.created = time.time()
+        self.first_audio_time: Optional[float] = None  # When the first bytes became playable
+        self.filler_played = False  # A "thinking" clip was streamed before the answer
+        self.cancelled = False  # Set on barge-in/disconnect - queued sentences are skipped
+        self._queued = False  # Anything (sentence or file) queued yet?
+        self._queue_lock = threading.Lock()
+
+        self._sentences: "queue.Queue[Optional[tuple]]" = queue.Queue()  # ("text"|"file"|"filler", value) / None
+        self._changed = threading.Condition()  # Wakes readers when new bytes arrive
+        self._done_callbacks: List[Callable[[], None]] = []
+        self._worker = threading.Thread(target=self._run, name=f"audio-stream-{self.id[:8]}", daemon=True)
+        self._worker.start()
+
+    def submit(self, sentence: str):  # Called for each sentence the LLM finishes
+        """Queue a sentence to be spoken (returns immediately)"""
+        if self.cancelled:
+            record_saved("tts_segments")
+        elif sentence and sentence.strip():
+            self._put(("text", sentence))
+
+    def add_file(self, path: str):  # Already-spoken audio (e.g. from the answer cache)
+        """Queue an existing audio file to be streamed as-is"""
+        self._put(("file", path))
+
+    def play_filler(self, path: str, delay: float):  # Mask a slow start of the answer
+        """Stream a short filler clip if nothing has been queued after delay seconds"""
+        def fire():
+            with self._queue_lock:
+                if not self._queued:
+                    self._queued = True
+                    self.filler_played = True
+                    self._sentences.put(("filler", path))
+
+        timer = threading.Timer(delay, fire)
+        timer.daemon = True
+        timer.start()
+
+    def finish(self):  # No more sentences are coming
+        """Mark the end of the answer (the stream closes once the queued sentences are spoken)"""
+        self._put(None)
+
+    def cancel(self):  # The student interrupted or went away
+        """Stop speaking: skip the sentences still queued and close the stream"""
+        self.cancelled = True
+        self._put(None)
+
+    def add_done_callback(self, callback: Callable[[], None]):  # e.g. forget the request once it is spoken
+        """Run callback once the stream has finished (right away if it already has)"""
+        with self._changed:
+            if not self.done:
+                self._done_callbacks.append(callback)
+                return
+        callback()
+
+    def _put(self, item):
+        with self._queue_lock:
+            self._queued = True
+            self._sentences.put(item)
+
+    def _run(self):  # Background thread: speak sentences in order
+        while True:
+            item = self._sentences.get()
+            if item is None:
+                break
+            kind, value = item
+            if self.cancelled:
+                if kind == "text":
+                    record_saved("tts_segments")
+                continue
+            try:
+                if kind in ("file", "filler"):
+                    with open(value, "rb") as f:
+                        for chunk in iter(lambda: f.read(Config.TTS_STREAM_CHUNK_BYTES), b""):
+                            self._append(chunk)
+                    if kind == "file":  # Fillers are not part of the answer
+                        self.segments.append(value)
+                else:
+                    for chunk in self.tts.synthesize_stream(value, add_pauses=True):
+                        self._append(chunk)
+                    path = self.tts.audio_path_for(value, add_pauses=True)
+                    if path.exists():  # Saved in the TTS cache (reusable for the answer cache)
+                        self.segments.append(str(path))
+            except Exception as e:  # One bad sentence should not silence the whole answer
+                logger.error(f"Streaming synthesis failed for one sentence: {e}")
+
+        with self._changed:
+            self.done = True
+            self._changed.notify_all()
+            callbacks, self._done_callbacks = self._done_callbacks, []
+        for callback in callbacks:
+            callback()
+        if self.on_complete and self.segments and not self.cancelled:
+            try:
+                self.on_complete(list(self.segments))
+            except Exception as e:
+                logger.error(f"Audio stream completion callback failed: {e}")
+
+    def _append(self, chunk: bytes):
+        if not chunk:
+            return
+        with self._changed:
+            if self.first_audio_time is None:
+                self.first_audio_time = time.time()
+            self.chunks.append(chunk)
+            self._changed.notify_all()
+
+    def iter_chunks(self, timeout: float = None) -> Iterator[bytes]:  # Used by the streaming HTTP response
+        """Yield the MP3 bytes from the start, waiting for new ones until the answer is fully spoken"""
+        timeout = timeout or Config.TTS_STREAM_IDLE_TIMEOUT_SECONDS
+        index = 0
+        while True:
+            with self._changed:
+                if index >= len(self.chunks) and not self.done:
+                    self._changed.wait(timeout)  # Nothing new yet - wait for the next sentence
+                available = self.chunks[index:]
+                finished = self.done
+            if not available:
+                if finished:
+                    return
+                logger.warning(f"Audio stream {self.id[:8]} stalled - closing")
+                return
+            index += len(available)
+            for chunk in available:
+                yield chunk
+
+    def wait(self, timeout: float = None) -> List[str]:  # Block until everything is spoken
+        """Wait for the stream to finish and return the per-sentence audio files"""
+        self._worker.join(timeout)
+        return list(self.segments)
+
+
+class AudioStreamRegistry:  # The streams that can currently be fetched
+    """Look up live audio streams by ID, forgetting them after TTS_STREAM_TTL_SECONDS"""
+
+    def __init__(self, ttl_seconds: int = None):  # Initialize the registry
+        """
+        Initialize Audio Stream Registry
+        """
+        self.ttl_seconds = ttl_seconds or Config.TTS_STREAM_TTL_SECONDS
+        self.streams: Dict[str, AudioStream] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+
+    def create(self, tts, on_complete: Optional[Callable[[List[str]], None]] = None) -> AudioStream:
+        """Start a new stream (and drop expired ones, stopping any that never finished)"""
+        stream = AudioStream(tts, on_complete=on_complete)
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, s in self.streams.items() if now - s.created > self.ttl_seconds]
+            for stream_id in expired:
+                old = self.streams.pop(stream_id)
+                if not old.done:  # Its speaker thread would otherwise wait for sentences forever
+                    old.cancel()
+            self.streams[stream.id] = stream
+            self.created += 1
+        return stream
+
+    def get(self, stream_id: str) -> Optional[AudioStream]:
+        with self._lock:
+            return self.streams.get(stream_id)
+
+    def get_stats(self) -> Dict:  # Report for /metrics
+        """Get stream counts"""
+        with self._lock:
+            active = sum(1 for stream in self.streams.values() if not stream.done)
+            return {"created": self.created, "active": active, "retained": len(self.streams)}
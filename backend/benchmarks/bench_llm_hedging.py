@@ -0,0 +1,68 @@
+"""
+Hedging Benchmark for EchoLearn AI - Measures LLM latency with and without hedged requests
+Runs the LLMRouter against two local stub servers with configurable tail latency and errors
+Usage: cd backend && python benchmarks/bench_llm_hedging.py
+"""
+
+from pathlib import Path  # Import Path to find the backend folder
+import argparse  # Import argparse for command-line options
+import sys  # Import sys to make the backend modules importable
+import time  # Import time for measuring latency
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # Make backend modules importable
+
+from config import Config  # Import project settings
+from llm_router import LLMProvider, LLMRouter  # Import the router under test
+from metrics import LatencyTracker  # Import percentile reporting
+from benchmarks.stub_llm_server import start_stub_server  # Import the fake LLM server
+
+MESSAGES = [{"role": "user", "content": "What is machine learning?"}]
+
+
+def run(router: LLMRouter, requests: int) -> LatencyTracker:  # Send requests one by one
+    """Measure full-answer latency for a number of sequential requests"""
+    tracker = LatencyTracker(window=requests)
+    errors = 0
+    for _ in range(requests):
+        start = time.time()
+        try:
+            router.complete(MESSAGES, max_tokens=20)
+        except Exception:
+            errors += 1
+        tracker.record(time.time() - start)
+    if errors:
+        print(f"  {errors} requests failed")
+    return tracker
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare LLM latency with and without hedging")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--tail-prob", type=float, default=0.1, help="Chance the primary is very slow")
+    parser.add_argument("--tail-ms", type=float, default=3000)
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Chance the primary returns 429")
+    args = parser.parse_args()
+
+    # Primary: usually fast, sometimes very slow or rate limited (like a free tier). Secondary: steady.
+    start_stub_server(18101, first_token_ms=150, tail_prob=args.tail_prob, tail_ms=args.tail_ms,
+                      error_rate=args.error_rate, error_status=429)
+    start_stub_server(18102, first_token_ms=400)
+
+    def providers():
+        return [
+            LLMProvider("primary", "stub", "stub-model", "http://127.0.0.1:18101/v1"),
+            LLMProvider("secondary", "stub", "stub-model", "http://127.0.0.1:18102/v1")
+        ]
+
+    Config.LLM_HEDGE_ENABLED = False
+    no_hedge = LLMRouter(providers())
+    print("Without hedging (failover only):")
+    print(f"  {run(no_hedge, args.requests).get_stats()}")
+
+    Config.LLM_HEDGE_ENABLED = True
+    Config.LLM_HEDGE_MIN_SAMPLES = 10
+    hedged = LLMRouter(providers())
+    print("With hedging:")
+    print(f"  {run(hedged, args.requests).get_stats()}")
+    stats = hedged.get_stats()
+    print(f"  hedges fired: {stats['hedges_fired']}, won: {stats['hedges_won']}, failovers: {stats['failovers']}")
@@ -0,0 +1,55 @@
+"""
+Rate-Limit Benchmark for EchoLearn AI - Shows the scheduler keeping a burst inside an RPM limit
+Sends a burst of concurrent requests from several sessions to a stub server that enforces a requests-per-minute limit
+Usage: cd backend && python benchmarks/bench_llm_scheduler.py
+"""
+
+from concurrent.futures import ThreadPoolExecutor  # Import a thread pool to simulate a busy class
+from pathlib import Path  # Import Path to find the backend folder
+import argparse  # Import argparse for command-line options
+import sys  # Import sys to make the backend modules importable
+import time  # Import time for measuring throughput
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # Make backend modules importable
+
+from config import Config  # Import project settings
+from llm_router import LLMProvider, LLMRouter  # Import the router (which owns the scheduler)
+from benchmarks.stub_llm_server import start_stub_server  # Import the fake LLM server
+
+MESSAGES = [{"role": "user", "content": "What is machine learning?"}]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Burst of LLM requests against an RPM-limited stub")
+    parser.add_argument("--rpm", type=int, default=60, help="Stub server requests-per-minute limit")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--sessions", type=int, default=4)
+    args = parser.parse_args()
+
+    start_stub_server(18201, first_token_ms=100, rpm_limit=args.rpm)
+    Config.LLM_HEDGE_ENABLED = False
+    Config.LLM_QUEUE_MAX_WAIT_S = 120
+
+    provider = LLMProvider("stub", "stub", "stub-model", "http://127.0.0.1:18201/v1")
+    provider.budget.requests.sync(args.rpm // 2, None, None)  # Start below the real limit; headers correct it
+    router = LLMRouter([provider])
+
+    def ask(i):
+        start = time.time()
+        try:
+            router.complete(MESSAGES, max_tokens=10, session_id=f"student-{i % args.sessions}")
+            return True, time.time() - start
+        except Exception:
+            return False, time.time() - start
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=args.requests) as pool:
+        results = list(pool.map(ask, range(args.requests)))
+    elapsed = time.time() - start
+
+    ok = sum(1 for success, _ in results if success)
+    print(f"{ok}/{args.requests} answered in {elapsed:.1f}s ({ok / elapsed * 60:.0f} per minute, limit {args.rpm})")
+    stats = router.get_stats()
+    print(f"429 responses: {stats['providers']['stub']['failures']}")
+    print(f"Scheduler: {stats['scheduler']}")
+    print(f"Budget: {stats['providers']['stub']['budget']}")
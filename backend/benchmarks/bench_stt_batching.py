@@ -0,0 +1,54 @@
+"""
+STT Batching Benchmark for EchoLearn AI - Concurrent voice questions with and without micro-batching
+Sends bursts of simultaneous uploads straight to SpeechToText, then through STTBatcher, and compares latency/throughput
+Usage: cd backend && python benchmarks/bench_stt_batching.py [--audio question.webm] [--concurrency 8] [--rounds 5]
+"""
+
+from concurrent.futures import ThreadPoolExecutor  # Import a thread pool to simulate simultaneous students
+from pathlib import Path  # Import Path to find the backend folder
+import argparse  # Import argparse for command-line options
+import sys  # Import sys to make the backend modules importable
+import time  # Import time for measuring latency
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # Make backend modules importable
+
+from metrics import LatencyTracker  # Import percentile reporting
+from speech_to_text import SpeechToText  # Import the engine
+from stt_batcher import STTBatcher  # Import the batching scheduler
+from benchmarks.bench_stt_decode import synthetic_clip  # Import the synthetic recording
+
+
+def burst(transcriber, data: bytes, concurrency: int, rounds: int):  # Several rounds of simultaneous uploads
+    tracker = LatencyTracker()
+
+    def one(_):
+        start = time.perf_counter()
+        transcriber.transcribe_bytes(data)
+        tracker.record(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(rounds):
+            list(pool.map(one, range(concurrency)))
+    return tracker.get_stats(), concurrency * rounds / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent transcription with and without micro-batching")
+    parser.add_argument("--audio", help="Recording to use (default: a synthetic 7 s WAV)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    data = Path(args.audio).read_bytes() if args.audio else synthetic_clip()
+    stt = SpeechToText()
+    stt.transcribe_bytes(data)  # Load the model before timing
+    batcher = STTBatcher(stt, max_batch_size=args.concurrency)
+
+    for name, transcriber in (("direct", stt), ("batched", batcher)):
+        stats, throughput = burst(transcriber, data, args.concurrency, args.rounds)
+        print(
+            f"{name:>8}: p50 {stats['p50']:.2f}s  p95 {stats['p95']:.2f}s  p99 {stats['p99']:.2f}s  "
+            f"{throughput:.2f} questions/s"
+        )
+    print(f"Batcher: {batcher.get_stats()}")
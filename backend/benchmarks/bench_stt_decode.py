@@ -0,0 +1,81 @@
+"""
+STT Upload Benchmark for EchoLearn AI - Compares transcribing an upload via a temporary file vs in memory
+"disk" saves the upload to UPLOAD_DIR and transcribes the file (the old /ask path); "memory" decodes the bytes directly
+Usage: cd backend && python benchmarks/bench_stt_decode.py [--audio question.webm] [--runs 20] [--decode-only]
+"""
+
+from io import BytesIO  # Import BytesIO to build the synthetic WAV in memory
+from pathlib import Path  # Import Path to find the backend folder
+import argparse  # Import argparse for command-line options
+import sys  # Import sys to make the backend modules importable
+import time  # Import time for measuring latency
+import uuid  # Import uuid for unique temporary file names
+import wave  # Import wave to write the synthetic clip
+
+import numpy as np  # Import numpy to synthesize audio
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # Make backend modules importable
+
+from config import Config  # Import project settings
+from metrics import LatencyTracker  # Import percentile reporting
+from speech_to_text import SAMPLE_RATE, SpeechToText, decode_audio, trim_silence  # Import the engine and decoder
+
+
+def synthetic_clip(seconds: float = 4.0, silence: float = 1.5) -> bytes:  # A browser-like recording
+    """16-bit WAV with silence before and after a voiced section (harmonics with a wobbling pitch)"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6)) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t) ** 2)
+    pad = np.zeros(int(silence * SAMPLE_RATE))
+    audio = np.concatenate([pad, 0.2 * voice, pad])
+
+    buffer = BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(SAMPLE_RATE)
+        out.writeframes((audio * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def via_disk(data: bytes, stt: SpeechToText, decode_only: bool):  # The old /ask path
+    path = Config.UPLOAD_DIR / f"question_{uuid.uuid4().hex}.wav"
+    path.write_bytes(data)
+    try:
+        if decode_only:
+            decode_audio(str(path), sampling_rate=SAMPLE_RATE)
+        else:
+            stt.transcribe(str(path))
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def in_memory(data: bytes, stt: SpeechToText, decode_only: bool):  # The new /ask path
+    if decode_only:
+        trim_silence(decode_audio(BytesIO(data), sampling_rate=SAMPLE_RATE))
+    else:
+        stt.transcribe_bytes(data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upload transcription latency: temporary file vs in memory")
+    parser.add_argument("--audio", help="Recording to use (default: a synthetic 7 s WAV)")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--decode-only", action="store_true", help="Measure decoding only (no Whisper model)")
+    args = parser.parse_args()
+
+    Config.ensure_directories()
+    data = Path(args.audio).read_bytes() if args.audio else synthetic_clip()
+    stt = SpeechToText()
+    if not args.decode_only:
+        stt.transcribe_bytes(data)  # Load the model and warm up before timing
+
+    for name, run in (("disk", via_disk), ("memory", in_memory)):
+        tracker = LatencyTracker()
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            run(data, stt, args.decode_only)
+            tracker.record(time.perf_counter() - start)
+        stats = tracker.get_stats()
+        print(f"{name:>6}: p50 {stats['p50'] * 1000:7.1f} ms  p95 {stats['p95'] * 1000:7.1f} ms  ({args.runs} runs)")
@@ -0,0 +1,94 @@
+"""
+STT Profile Benchmark for EchoLearn AI - Word error rate vs latency for every decoding profile
+Transcribes the clips in benchmarks/stt_clips (listed in manifest.json) with each profile and with "auto"
+Missing clips are synthesized once with the configured TTS provider; record your own voice over them for real numbers
+Usage: cd backend && python benchmarks/bench_stt_profiles.py [--runs 3]
+"""
+
+from pathlib import Path  # Import Path to find the clips
+import argparse  # Import argparse for command-line options
+import json  # Import json to read the manifest
+import re  # Import re for normalizing transcripts
+import shutil  # Import shutil to keep synthesized clips next to the manifest
+import sys  # Import sys to make the backend modules importable
+import time  # Import time for measuring latency
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # Make backend modules importable
+
+from config import Config  # Import project settings
+from metrics import LatencyTracker  # Import percentile reporting
+from speech_to_text import (  # Import the engine and its profiles
+    DECODING_PROFILES, SAMPLE_RATE, SpeechToText, choose_profile, decode_audio, trim_silence
+)
+
+CLIPS_DIR = Path(__file__).resolve().parent / "stt_clips"
+
+
+def normalize(text: str) -> list:  # Compare words, not punctuation or case
+    return re.sub(r"[^a-z0-9' ]", " ", text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:  # Word-level edit distance / reference length
+    """WER = (substitutions + deletions + insertions) / words in the reference"""
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / max(1, len(ref))
+
+
+def load_clips() -> list:  # (id, reference text, 16 kHz audio)
+    """Load every clip in the manifest, synthesizing the ones that are missing"""
+    manifest = json.loads((CLIPS_DIR / "manifest.json").read_text())
+    tts = None
+    clips = []
+    for item in manifest:
+        path = next(CLIPS_DIR.glob(f"{item['id']}.*"), None)  # Any audio format (recorded .wav/.webm or synthesized .mp3)
+        if path is None:
+            if tts is None:
+                from text_to_speech import TextToSpeech  # Only needed the first time
+                tts = TextToSpeech()
+            generated = tts.synthesize(item["text"], output_filename=f"bench_{item['id']}.mp3", add_pauses=False)
+            path = CLIPS_DIR / f"{item['id']}.mp3"
+            shutil.move(generated, path)
+            print(f"Synthesized {path.name}")
+        clips.append((item["id"], item["text"], trim_silence(decode_audio(str(path), sampling_rate=SAMPLE_RATE))))
+    return clips
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WER vs latency for each Whisper decoding profile")
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs per clip and profile")
+    args = parser.parse_args()
+
+    Config.ensure_directories()
+    clips = load_clips()
+    stt = SpeechToText()
+    stt.transcribe_audio(clips[0][2], profile="greedy")  # Load the model and warm up before timing
+
+    print(f"{len(clips)} clips, model '{stt.model_size}', {args.runs} runs each\n")
+    print(f"{'profile':>10}  {'WER':>6}  {'p50':>7}  {'p95':>7}  {'RTF':>6}")
+    for profile in list(DECODING_PROFILES) + ["auto"]:
+        tracker = LatencyTracker()
+        errors = words = 0.0
+        busy = audio_seconds = 0.0
+        for _, reference, audio in clips:
+            chosen = choose_profile(len(audio) / SAMPLE_RATE, 0) if profile == "auto" else profile
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                result = stt.transcribe_audio(audio, profile=chosen)
+                elapsed = time.perf_counter() - start
+                tracker.record(elapsed)
+                busy += elapsed
+                audio_seconds += len(audio) / SAMPLE_RATE
+            reference_words = len(normalize(reference))
+            errors += word_error_rate(reference, result["transcript"]) * reference_words
+            words += reference_words
+        stats = tracker.get_stats()
+        print(
+            f"{profile:>10}  {errors / words:6.1%}  {stats['p50'] * 1000:5.0f}ms  {stats['p95'] * 1000:5.0f}ms  "
+            f"{busy / audio_seconds:6.3f}"
+        )
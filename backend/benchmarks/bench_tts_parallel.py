@@ -0,0 +1,67 @@
+"""
+Parallel TTS Benchmark for EchoLearn AI - Wall time vs answer length, one provider call vs parallel sentence groups
+Uses the configured TTS_PROVIDER (gTTS needs network access; Coqui loads one model per worker process)
+Usage: cd backend && python benchmarks/bench_tts_parallel.py [--sentences 2 4 8 16] [--runs 3] [--workers 4]
+"""
+
+from pathlib import Path  # Import Path to find the backend folder
+import argparse  # Import argparse for command-line options
+import sys  # Import sys to make the backend modules importable
+import time  # Import time for measuring wall time
+import uuid  # Import uuid for unique output names (bypasses the TTS cache)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # Make backend modules importable
+
+from config import Config  # Import project settings
+from metrics import LatencyTracker  # Import percentile reporting
+from parallel_tts import ParallelSynthesizer, group_sentences  # Import the parallel path
+from text_to_speech import TextToSpeech  # Import the engine
+
+SENTENCES = [  # Typical tutor sentences, repeated to build longer answers
+    "Machine learning is a way for computers to learn patterns from examples instead of fixed rules.",
+    "A model looks at many labelled examples and adjusts its parameters to reduce its mistakes.",
+    "For example, a spam filter learns which words usually appear in unwanted emails.",
+    "Once trained, the model can make predictions about examples it has never seen before.",
+]
+
+
+def answer(sentences: int) -> str:
+    return " ".join(SENTENCES[i % len(SENTENCES)] for i in range(sentences))
+
+
+def timed(tts: TextToSpeech, text: str, runs: int) -> dict:  # Wall time of synthesize() for this text
+    tracker = LatencyTracker()
+    for _ in range(runs):
+        start = time.perf_counter()
+        path = tts.synthesize(text, output_filename=f"bench_{uuid.uuid4().hex}.mp3", add_pauses=False)
+        tracker.record(time.perf_counter() - start)
+        Path(path).unlink(missing_ok=True)
+    return tracker.get_stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TTS wall time vs answer length, sequential vs parallel")
+    parser.add_argument("--sentences", type=int, nargs="+", default=[2, 4, 8, 16])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=Config.TTS_PARALLEL_WORKERS)
+    args = parser.parse_args()
+
+    Config.ensure_directories()
+    tts = TextToSpeech(use_cache=False, parallel=False)
+    parallel = ParallelSynthesizer(tts, workers=args.workers)
+    Config.TTS_PARALLEL_MIN_CHARS = 0  # Always take the parallel path when it is switched on
+    timed(tts, answer(1), 1)  # Load the model / open connections before timing
+
+    print(f"Provider '{tts.provider}', {args.workers} workers, {args.runs} runs each\n")
+    print(f"{'sentences':>9}  {'chars':>6}  {'groups':>6}  {'sequential':>10}  {'parallel':>9}  {'speedup':>7}")
+    for count in args.sentences:
+        text = answer(count)
+        tts.parallel = None
+        sequential = timed(tts, text, args.runs)
+        tts.parallel = parallel
+        fanned_out = timed(tts, text, args.runs)
+        print(
+            f"{count:>9}  {len(text):>6}  {len(group_sentences(text)):>6}  {sequential['p50']:9.2f}s  "
+            f"{fanned_out['p50']:8.2f}s  {sequential['p50'] / fanned_out['p50']:6.2f}x"
+        )
+    parallel.shutdown()
@@ -0,0 +1,165 @@
+"""
+Stub LLM Server for EchoLearn AI - A fake OpenAI-compatible chat server for local testing
+Configurable first-token latency, tail latency and 429/5xx errors - Exercises hedging and failover without API keys
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Import the standard-library web server
+import argparse  # Import argparse for command-line options
+import json  # Import json for request and response bodies
+import random  # Import random for simulated tail latency and errors
+import threading  # Import threading to run the server in the background
+import time  # Import time for simulated delays
+
+REPLY = "Machine learning lets computers learn patterns from examples. For example, spam filters learn from emails you mark."
+
+
+def make_handler(options: dict):  # Build a request handler with the chosen behaviour
+    """Create a handler class bound to the given latency/error options"""
+
+    recent = []  # Times of requests in the last minute (for the simulated RPM limit)
+    lock = threading.Lock()
+
+    def rate_limit_headers():  # Enforce the per-minute request limit like a real provider
+        """Return (allowed, headers) for a new request"""
+        limit = options["rpm_limit"]
+        if not limit:
+            return True, {
+                "x-ratelimit-remaining-requests": str(options["remaining_requests"]),
+                "x-ratelimit-remaining-tokens": str(options["remaining_tokens"])
+            }
+        with lock:
+            now = time.time()
+            recent[:] = [t for t in recent if now - t < 60]
+            allowed = len(recent) < limit
+            if allowed:
+                recent.append(now)
+            reset = 60 - (now - recent[0]) if recent else 0
+            return allowed, {
+                "x-ratelimit-limit-requests": str(limit),
+                "x-ratelimit-remaining-requests": str(limit - len(recent)),
+                "x-ratelimit-reset-requests": f"{reset:.2f}s",
+                "retry-after": str(max(1, int(reset) + 1))
+            }
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):  # Keep benchmark output quiet
+            pass
+
+        def do_POST(self):  # Handle /v1/chat/completions
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            allowed, limit_headers = rate_limit_headers()
+            if not allowed:  # Over the simulated RPM limit
+                self.send_response(429)
+                for name, value in limit_headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(json.dumps({"error": {"message": "rate limit", "type": "requests"}}).encode())
+                return
+
+            if random.random() < options["error_rate"]:  # Simulated rate limit or server error
+                self.send_response(options["error_status"])
+                self.send_header("Content-Type", "application/json")
+                self.send_header("retry-after", "1")
+                self.end_headers()
+                self.wfile.write(json.dumps({"error": {"message": "stub error", "type": "stub"}}).encode())
+                return
+
+            delay = options["first_token_ms"] / 1000
+            if random.random() < options["tail_prob"]:  # Occasionally be very slow (the tail hedging fixes)
+                delay = options["tail_ms"] / 1000
+            time.sleep(delay)
+
+            words = REPLY.split(" ")[:body.get("max_tokens") or None]
+            if not body.get("stream"):  # Plain (non-streaming) completion
+                self._send_json({
+                    "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": body.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)},
+                                 "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": len(words), "total_tokens": 10 + len(words)}
+                })
+                return
+
+            self.send_response(200)  # Streaming completion as server-sent events
+            self.send_header("Content-Type", "text/event-stream")
+            for name, value in limit_headers.items():
+                if name != "retry-after":
+                    self.send_header(name, value)
+            self.end_headers()
+            try:
+                for i, word in enumerate(words):
+                    chunk = {
+                        "id": "stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": body.get("model"),
+                        "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word},
+                                     "finish_reason": None}]
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                    time.sleep(options["token_ms"] / 1000)
+                self.wfile.write(b"data: [DONE]\n\n")
+            except (BrokenPipeError, ConnectionResetError):  # Client cancelled (e.g. lost a hedge race)
+                pass
+
+        def _send_json(self, payload: dict):
+            data = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return StubHandler
+
+
+def start_stub_server(  # Start a stub server in a background thread
+    port: int,
+    first_token_ms: float = 200,
+    tail_prob: float = 0.0,
+    tail_ms: float = 3000,
+    token_ms: float = 10,
+    error_rate: float = 0.0,
+    error_status: int = 429,
+    remaining_requests: int = 30,
+    remaining_tokens: int = 6000,
+    rpm_limit: int = 0
+) -> ThreadingHTTPServer:
+    """
+    Start a stub OpenAI-compatible server on localhost:port (base URL http://localhost:port/v1)
+    """
+    options = dict(
+        first_token_ms=first_token_ms, tail_prob=tail_prob, tail_ms=tail_ms, token_ms=token_ms,
+        error_rate=error_rate, error_status=error_status,
+        remaining_requests=remaining_requests, remaining_tokens=remaining_tokens, rpm_limit=rpm_limit
+    )
+    ThreadingHTTPServer.request_queue_size = 256  # Accept a whole class connecting at once
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(options))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":  # Run a stub server from the command line
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--first-token-ms", type=float, default=200)
+    parser.add_argument("--tail-prob", type=float, default=0.0, help="Chance of a slow first token")
+    parser.add_argument("--tail-ms", type=float, default=3000)
+    parser.add_argument("--token-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--rpm-limit", type=int, default=0, help="Reject requests over this many per minute")
+    args = parser.parse_args()
+
+    start_stub_server(
+        args.port, args.first_token_ms, args.tail_prob, args.tail_ms, args.token_ms,
+        args.error_rate, args.error_status, rpm_limit=args.rpm_limit
+    )
+    print(f"Stub LLM server on http://localhost:{args.port}/v1 (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
@@ -9,6 +9,7 @@ import pickle  # Import pickle for saving and loading Python objects to disk
 from pathlib import Path  # Import Path for managing file locations
 from typing import List, Dict, Optional  # Import types for organization
 from sentence_transformers import SentenceTransformer  # Import tool to turn text into numbers (embeddings)
+import threading  # Import threading so concurrent first uses load the model only once
 import logging  # Import logging for tracking progress
 
 from config import Config  # Import project settings
@@ -16,6 +17,18 @@ from config import Config  # Import project settings
 logging.basicConfig(level=logging.INFO)  # Setup standard log reports
 logger = logging.getLogger(__name__)  # Create a logger for the database builder
 
+_embedding_models: Dict[str, SentenceTransformer] = {}  # model name -> loaded model (one copy per process)
+_embedding_models_lock = threading.Lock()
+
+
+def load_embedding_model(name: str) -> SentenceTransformer:  # Shared by the builder and the retriever
+    """Load an embedding model once per process and return the shared instance"""
+    with _embedding_models_lock:
+        if name not in _embedding_models:
+            logger.info(f"Loading embedding model: {name}")
+            _embedding_models[name] = SentenceTransformer(name)
+        return _embedding_models[name]
+
 
 class VectorDBBuilder:  # Define a class for building and managing the document database
     """Build and manage FAISS vector database"""
@@ -35,14 +48,14 @@ class VectorDBBuilder:  # Define a class for building and managing the document
         self.index = None  # This will hold the actual searchable index
         self.documents = []  # List to store the original text chunks
         self.metadata = []   # List to store info about each chunk (like filename)
+        self.generation = 0  # Bumped every time the index contents change (used to invalidate caches)
         
         logger.info(f"VectorDBBuilder initialized (Lazy loading model: {self.embedding_model_name})")  # Log finish
 
     def _get_model(self):
         """Lazy load the embedding model"""
         if self.embedding_model is None:
-            logger.info(f"Loading embedding model: {self.embedding_model_name}")
-            self.embedding_model = SentenceTransformer(self.embedding_model_name)
+            self.embedding_model = load_embedding_model(self.embedding_model_name)
             
             # Update dimension based on actual model
             if self.embedding_dim is None:
@@ -86,6 +99,7 @@ class VectorDBBuilder:  # Define a class for building and managing the document
         # Store the original text and its info so we can show it later
         self.documents.extend(texts)
         self.metadata.extend(chunk_metadata)
+        self.generation += 1  # Contents changed
         
         logger.info(f"Index now contains {self.index.ntotal} documents")  # Log total count
         return self.index.ntotal  # Return total number of items indexed
@@ -155,6 +169,7 @@ class VectorDBBuilder:  # Define a class for building and managing the document
                         f"{data['embedding_model']} vs {self.embedding_model_name}"
                     )
             
+            self.generation += 1  # Contents changed
             return True  # Return success
             
         except Exception as e:  # If reading fails
@@ -181,6 +196,7 @@ class VectorDBBuilder:  # Define a class for building and managing the document
         self.index = None  # Delete index
         self.documents = []  # Delete texts
         self.metadata = []  # Delete metadata
+        self.generation += 1  # Contents changed
         logger.info("Index cleared")  # Log action
 
 
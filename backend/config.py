@@ -4,6 +4,7 @@ Supports multiple LLM and TTS providers with flexible API key management - Built
 """
 
 import os  # Import os for interacting with the operating system (like getting environment variables)
+import json  # Import json for settings given as JSON
 from pathlib import Path  # Import Path for managing file and folder paths easily
 from dotenv import load_dotenv  # Import load_dotenv to read the .env file
 
@@ -18,6 +19,14 @@ class Config:  # Define a class to hold all our settings in one place
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")  # Get OpenAI key from secrets
     GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")  # Get Groq key from secrets
     HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY", "")  # Get HuggingFace key from secrets
+    LOCAL_LLM_API_KEY = os.getenv("LOCAL_LLM_API_KEY", "not-needed")  # Local OpenAI-compatible servers rarely check keys
+    
+    # Which key belongs to which OpenAI-compatible LLM provider
+    LLM_API_KEYS = {
+        "openai": OPENAI_API_KEY,
+        "groq": GROQ_API_KEY,
+        "local": LOCAL_LLM_API_KEY
+    }
     
     # ============ LLM Configuration ============
     # Options: "openai", "groq", "llama", "mistral"
@@ -28,9 +37,37 @@ class Config:  # Define a class to hold all our settings in one place
         "openai": os.getenv("OPENAI_MODEL", "gpt-4"),  # Default to GPT-4 for OpenAI
         "groq": os.getenv("GROQ_MODEL", "llama-3.1-70b-versatile"),  # Default to Llama-3.1 for Groq
         "llama": "meta-llama/Llama-2-7b-chat-hf",  # Local Llama model name
-        "mistral": "mistralai/Mistral-7B-Instruct-v0.2"  # Local Mistral model name
+        "mistral": "mistralai/Mistral-7B-Instruct-v0.2",  # Local Mistral model name
+        "local": os.getenv("LOCAL_LLM_MODEL", "local-model")  # Any OpenAI-compatible server (vLLM, Ollama, stub)
     }
     
+    # Where each OpenAI-compatible provider lives (None = the official OpenAI address)
+    LLM_BASE_URLS = {
+        "openai": None,
+        "groq": "https://api.groq.com/openai/v1",
+        "local": os.getenv("LOCAL_LLM_BASE_URL", "http://localhost:8001/v1")
+    }
+    
+    # Extra providers to hedge to / fail over to, in order (e.g. "openai" or "local")
+    LLM_FALLBACK_PROVIDERS = [p.strip() for p in os.getenv("LLM_FALLBACK_PROVIDERS", "").split(",") if p.strip()]
+    LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "30"))  # Give up on one provider call after this long
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))  # Failover attempts after 429/5xx errors
+    LLM_BACKOFF_BASE_S = float(os.getenv("LLM_BACKOFF_BASE_S", "0.5"))  # First backoff wait (doubles each retry)
+    LLM_BACKOFF_MAX_S = float(os.getenv("LLM_BACKOFF_MAX_S", "8"))  # Longest backoff wait
+    LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"  # Send a duplicate when the first token is late
+    LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))  # Hedge after this percentile of first-token latency
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))  # Latencies needed before trusting the percentile
+    LLM_HEDGE_DEFAULT_DELAY_S = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_S", "2.0"))  # Hedge delay until then
+    LLM_HEDGE_MIN_DELAY_S = float(os.getenv("LLM_HEDGE_MIN_DELAY_S", "0.3"))  # Never hedge sooner than this
+    LLM_HEDGE_MAX_DELAY_S = float(os.getenv("LLM_HEDGE_MAX_DELAY_S", "5.0"))  # Never wait longer than this to hedge
+    # Starting request/token budgets per minute (0 = unlimited); corrected from x-ratelimit-* response headers
+    LLM_RATE_LIMITS = {
+        "openai": (int(os.getenv("OPENAI_RPM_LIMIT", "500")), int(os.getenv("OPENAI_TPM_LIMIT", "30000"))),
+        "groq": (int(os.getenv("GROQ_RPM_LIMIT", "30")), int(os.getenv("GROQ_TPM_LIMIT", "6000"))),
+        "local": (int(os.getenv("LOCAL_LLM_RPM_LIMIT", "0")), int(os.getenv("LOCAL_LLM_TPM_LIMIT", "0")))
+    }
+    LLM_QUEUE_MAX_WAIT_S = float(os.getenv("LLM_QUEUE_MAX_WAIT_S", "30"))  # Longest a request waits for quota
+    
     LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.7"))  # Set how "creative" or "precise" the AI is
     LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "1000"))  # Set the maximum length of AI answers
     
@@ -54,6 +91,34 @@ class Config:  # Define a class to hold all our settings in one place
     # Voice options
     TTS_VOICE = os.getenv("TTS_VOICE", "alloy")  # For OpenAI: alloy, echo, fable, onyx, nova, shimmer
     TTS_SPEED = float(os.getenv("TTS_SPEED", "1.0"))  # Set how fast the tutor speaks
+    TTS_PIPELINE_WORKERS = int(os.getenv("TTS_PIPELINE_WORKERS", "1"))  # Sentences spoken at once in pipelined mode
+    TTS_MP3_BITRATE_KBPS = int(os.getenv("TTS_MP3_BITRATE_KBPS", "64"))  # Locally encoded (Coqui) MP3 bitrate
+    TTS_OPUS_BITRATE_KBPS = int(os.getenv("TTS_OPUS_BITRATE_KBPS", "24"))  # Locally encoded Opus bitrate
+    # Replies that never change - synthesized once at startup and served instantly
+    FIXED_PHRASES = {
+        "not_heard": "I didn't quite catch that. Could you please repeat your question?",
+        "error": "I apologize, but I encountered an error processing your question. Please try again.",
+        "greeting": "Hi! I'm your tutor. Ask me anything about your documents.",
+        **json.loads(os.getenv("TTS_PHRASES_JSON") or "{}")  # Add or override, e.g. {"goodbye": "See you next time!"}
+    }
+    TTS_FILLER_PHRASES = [p.strip() for p in os.getenv(  # Short "thinking" clips that mask a slow answer
+        "TTS_FILLER_PHRASES", "Let me think about that.|Good question, give me a moment.|Let me check your notes."
+    ).split("|") if p.strip()]
+    TTS_FILLER_ENABLED = os.getenv("TTS_FILLER_ENABLED", "false").lower() == "true"  # Play a filler in stream mode
+    TTS_FILLER_DELAY_MS = int(os.getenv("TTS_FILLER_DELAY_MS", "1200"))  # ...if no sentence is ready by then
+    AUDIO_INLINE_MAX_KB = int(os.getenv("AUDIO_INLINE_MAX_KB", "96"))  # audio_mode=inline: embed audio up to this size
+    TTS_PARALLEL_ENABLED = os.getenv("TTS_PARALLEL_ENABLED", "true").lower() == "true"  # Split long answers
+    TTS_PARALLEL_PROVIDERS = [p.strip() for p in os.getenv("TTS_PARALLEL_PROVIDERS", "gtts,coqui").split(",") if p.strip()]
+    TTS_PARALLEL_WORKERS = int(os.getenv("TTS_PARALLEL_WORKERS", "4"))  # Threads (gTTS/OpenAI) or processes (Coqui)
+    TTS_PARALLEL_MIN_CHARS = int(os.getenv("TTS_PARALLEL_MIN_CHARS", "300"))  # Shorter text is one provider call
+    TTS_PARALLEL_GROUP_CHARS = int(os.getenv("TTS_PARALLEL_GROUP_CHARS", "200"))  # Target size of each piece
+    TTS_STREAM_CHUNK_BYTES = int(os.getenv("TTS_STREAM_CHUNK_BYTES", "4096"))  # Size of each streamed audio chunk
+    TTS_STREAM_IDLE_TIMEOUT_SECONDS = float(os.getenv("TTS_STREAM_IDLE_TIMEOUT_SECONDS", "30"))  # Close a stalled stream
+    TTS_STREAM_TTL_SECONDS = int(os.getenv("TTS_STREAM_TTL_SECONDS", "600"))  # How long a stream URL stays valid
+    TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"  # Reuse audio for identical text
+    TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "500"))  # Size limit for the audio folder
+    TTS_CACHE_MIN_AGE_SECONDS = int(os.getenv("TTS_CACHE_MIN_AGE_SECONDS", "600"))  # Never evict newer files
+    TTS_CACHE_SWEEP_INTERVAL_SECONDS = int(os.getenv("TTS_CACHE_SWEEP_INTERVAL_SECONDS", "300"))  # Eviction schedule
     
     # ============ STT Configuration ============
     # Options: "faster-whisper", "openai-whisper"
@@ -66,6 +131,42 @@ class Config:  # Define a class to hold all our settings in one place
     STT_ENERGY_THRESHOLD = float(os.getenv("STT_ENERGY_THRESHOLD", "0.5"))  # Set voice loudness sensitivity
     STT_MIN_SILENCE_DURATION_MS = int(os.getenv("STT_MIN_SILENCE_DURATION_MS", "1000"))  # Set minimum silence in milliseconds
     
+    # Decoding profiles (greedy, beam3, beam5 or custom ones in STT_DECODING_PROFILES_JSON): "auto" picks per clip
+    STT_DECODING_PROFILE = os.getenv("STT_DECODING_PROFILE", "auto")
+    STT_DECODING_PROFILES_JSON = os.getenv("STT_DECODING_PROFILES_JSON", "")  # e.g. {"beam2": {"beam_size": 2, "temperature_fallback": false, "without_timestamps": true}}
+    STT_PROFILE_FAST = os.getenv("STT_PROFILE_FAST", "greedy")  # Short clips and busy moments
+    STT_PROFILE_BALANCED = os.getenv("STT_PROFILE_BALANCED", "beam3")  # Some other transcriptions waiting
+    STT_PROFILE_ACCURATE = os.getenv("STT_PROFILE_ACCURATE", "beam5")  # Idle
+    STT_SHORT_CLIP_S = float(os.getenv("STT_SHORT_CLIP_S", "2.5"))  # Clips this short use the fast profile
+    STT_BUSY_QUEUE_DEPTH = int(os.getenv("STT_BUSY_QUEUE_DEPTH", "4"))  # This many waiting -> fast profile for everyone
+    
+    # Live transcription (/ws/transcribe): a pause of STT_MIN_SILENCE_DURATION_MS closes a segment, STT_PAUSE_THRESHOLD ends the question
+    STT_STREAM_VAD_RATIO = float(os.getenv("STT_STREAM_VAD_RATIO", "3.0"))  # Speech is this many times louder than the background
+    STT_STREAM_VAD_MIN_RMS = float(os.getenv("STT_STREAM_VAD_MIN_RMS", "0.01"))  # Quietest level counted as speech
+    STT_STREAM_MAX_SEGMENT_S = float(os.getenv("STT_STREAM_MAX_SEGMENT_S", "28"))  # Cut long speech before Whisper's 30 s window
+    
+    # Micro-batching: uploaded questions arriving within STT_BATCH_MAX_WAIT_MS are transcribed in one batched call
+    STT_BATCHING_ENABLED = os.getenv("STT_BATCHING_ENABLED", "true").lower() == "true"
+    STT_BATCH_MAX_SIZE = int(os.getenv("STT_BATCH_MAX_SIZE", "8"))  # Most questions per model call
+    STT_BATCH_MAX_WAIT_MS = int(os.getenv("STT_BATCH_MAX_WAIT_MS", "25"))  # How long the first question waits for company
+    
+    # Thread budget of a Whisper model (0 threads = CTranslate2 default)
+    STT_CPU_THREADS = int(os.getenv("STT_CPU_THREADS", "0"))
+    STT_NUM_WORKERS = int(os.getenv("STT_NUM_WORKERS", "1"))
+    
+    # Options: "inprocess" (model inside the API process), "pool" (separate worker processes, each with its own model)
+    STT_MODE = os.getenv("STT_MODE", "inprocess")
+    STT_POOL_PROCESSES = int(os.getenv("STT_POOL_PROCESSES", "2"))  # Worker processes (one model each)
+    STT_POOL_CPU_THREADS = int(os.getenv("STT_POOL_CPU_THREADS", "0"))  # Threads per worker (0 = cores / processes)
+    STT_POOL_MAX_PENDING = int(os.getenv("STT_POOL_MAX_PENDING", "16"))  # Transcriptions queued or running before 503
+    STT_POOL_PIN_CORES = os.getenv("STT_POOL_PIN_CORES", "true").lower() == "true"  # Give each worker its own cores (Linux)
+    
+    # ============ Warmup Configuration ============
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"  # Load models at startup instead of on first use
+    WARMUP_BLOCKING = os.getenv("WARMUP_BLOCKING", "false").lower() == "true"  # Wait for warmup before accepting requests
+    WARMUP_COMPONENTS = [c.strip() for c in os.getenv("WARMUP_COMPONENTS", "embeddings,stt,tts,phrases").split(",") if c.strip()]
+    WARMUP_OPTIONAL_COMPONENTS = [c.strip() for c in os.getenv("WARMUP_OPTIONAL_COMPONENTS", "tts,phrases").split(",") if c.strip()]  # May fail without failing /health/ready
+    
     # ============ Vector Database Configuration ============
     # Options: "faiss", "chroma"
     VECTOR_DB_TYPE = os.getenv("VECTOR_DB_TYPE", "faiss")  # Choose database type
@@ -97,9 +198,60 @@ class Config:  # Define a class to hold all our settings in one place
         "CORS_ORIGINS",
         "http://localhost:3000,http://localhost:5173,http://localhost:8501,https://echo-learner-ai.vercel.app"
     ).split(",")  # Allowed frontends (local dev + production Vercel; override via CORS_ORIGINS env var)
+    CANCEL_ON_DISCONNECT = os.getenv("CANCEL_ON_DISCONNECT", "true").lower() == "true"  # Stop LLM/TTS work when the client goes away
+    CANCEL_POLL_INTERVAL_MS = int(os.getenv("CANCEL_POLL_INTERVAL_MS", "250"))  # How often /ask checks for a disconnect
+    
+    # ============ Deadline Configuration ============
+    # Latency budget of one /ask (0 = none; clients can send X-Deadline-Ms) - stages cut corners to stay inside it
+    REQUEST_DEADLINE_MS = int(os.getenv("REQUEST_DEADLINE_MS", "0"))
+    DEADLINE_STT_FAST_MS = int(os.getenv("DEADLINE_STT_FAST_MS", "8000"))  # Less budget than this -> fast STT profile
+    DEADLINE_RETRIEVAL_REDUCE_MS = int(os.getenv("DEADLINE_RETRIEVAL_REDUCE_MS", "6000"))  # Less left -> fewer chunks
+    DEADLINE_RETRIEVAL_SKIP_MS = int(os.getenv("DEADLINE_RETRIEVAL_SKIP_MS", "3000"))  # Less left -> no retrieval
+    DEADLINE_REDUCED_TOP_K = int(os.getenv("DEADLINE_REDUCED_TOP_K", "1"))  # Chunks retrieved when reduced
+    DEADLINE_FIRST_TOKEN_MS = int(os.getenv("DEADLINE_FIRST_TOKEN_MS", "800"))  # First-token wait assumed until measured
+    DEADLINE_LLM_TOKENS_PER_SECOND = float(os.getenv("DEADLINE_LLM_TOKENS_PER_SECOND", "40"))  # For capping max_tokens
+    DEADLINE_MIN_TOKENS = int(os.getenv("DEADLINE_MIN_TOKENS", "64"))  # Never cap max_tokens below this
+    DEADLINE_TTS_RESERVE_MS = int(os.getenv("DEADLINE_TTS_RESERVE_MS", "1500"))  # Kept for TTS; less left -> text only
+    
+    # ============ Load Control Configuration ============
+    # Under load, step down through tiers (fast STT -> fewer chunks -> short answers -> text only) and back up
+    LOAD_CONTROL_ENABLED = os.getenv("LOAD_CONTROL_ENABLED", "true").lower() == "true"
+    LOAD_CONTROL_INTERVAL_SECONDS = float(os.getenv("LOAD_CONTROL_INTERVAL_SECONDS", "5"))  # How often to re-evaluate
+    LOAD_QUEUE_HIGH = int(os.getenv("LOAD_QUEUE_HIGH", "4"))  # /ask requests in flight that count as overloaded
+    LOAD_LATENCY_TARGET_S = float(os.getenv("LOAD_LATENCY_TARGET_S", "8"))  # Median answer time that counts as overloaded
+    LOAD_WINDOW_SECONDS = float(os.getenv("LOAD_WINDOW_SECONDS", "60"))  # Latencies older than this are ignored
+    LOAD_RECOVER_RATIO = float(os.getenv("LOAD_RECOVER_RATIO", "0.5"))  # Calm = load below this share of the limits
+    LOAD_RECOVER_INTERVALS = int(os.getenv("LOAD_RECOVER_INTERVALS", "3"))  # Calm checks in a row before stepping up
+    LOAD_TIERS_JSON = os.getenv("LOAD_TIERS_JSON", "")  # Custom tiers, e.g. [{"name": "normal"}, {"name": "lite", "top_k": 1}]
+    
+    # ============ Prompt Budget Configuration ============
+    PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "2000"))  # Tokens shared by chat history + study materials
+    HISTORY_TOKEN_SHARE = float(os.getenv("HISTORY_TOKEN_SHARE", "0.35"))  # Most of the budget history may take
+    CONTEXT_DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.8"))  # Word overlap that marks a chunk as a repeat
+    TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")  # tiktoken encoding used to count tokens
+    TOKENIZER_HF_MODEL = os.getenv("TOKENIZER_HF_MODEL", "")  # Optional HuggingFace tokenizer matching the LLM exactly
+    
+    # ============ Answer Cache Configuration ============
+    ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"  # Reuse answers to repeated questions
+    ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))  # Cosine similarity needed to count as the same question
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "500"))  # Number of answers to remember
+    ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))  # Forget answers after a day
+    PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", "200"))  # Simplify/examples responses to remember
     
     # ============ Memory Configuration ============
     MEMORY_MAX_TOKENS = int(os.getenv("MEMORY_MAX_TOKENS", "1000"))  # Limit how much chat history AI remembers
+    MEMORY_MAX_SESSIONS = int(os.getenv("MEMORY_MAX_SESSIONS", "10000"))  # Most student conversations kept at once
+    MEMORY_SESSION_TTL_SECONDS = int(os.getenv("MEMORY_SESSION_TTL_SECONDS", "3600"))  # Forget a conversation after this long idle
+    MEMORY_MAX_TOTAL_CHARS = int(os.getenv("MEMORY_MAX_TOTAL_CHARS", "50000000"))  # Cap on all conversations together (~50 MB)
+    MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "memory")  # "memory" (lost on restart) or "sqlite" (durable, shared by workers)
+    MEMORY_DB_PATH = Path(os.getenv("MEMORY_DB_PATH", "./data/memory.db"))  # SQLite file for conversations
+    MEMORY_FLUSH_INTERVAL_S = float(os.getenv("MEMORY_FLUSH_INTERVAL_S", "0.2"))  # Longest a write waits to be batched
+    MEMORY_DB_KEEP_TURNS = int(os.getenv("MEMORY_DB_KEEP_TURNS", "50"))  # Turns kept on disk per conversation
+    MEMORY_DB_RETENTION_DAYS = int(os.getenv("MEMORY_DB_RETENTION_DAYS", "30"))  # Delete turns older than this
+    MEMORY_MODE = os.getenv("MEMORY_MODE", "window")  # "window" drops old turns, "summary" folds them into a running summary
+    MEMORY_SUMMARY_MAX_TOKENS = int(os.getenv("MEMORY_SUMMARY_MAX_TOKENS", "200"))  # Length limit of the running summary
+    MEMORY_SUMMARY_WORKERS = int(os.getenv("MEMORY_SUMMARY_WORKERS", "2"))  # Background threads writing summaries
+    MEMORY_SUMMARY_MAX_PENDING = int(os.getenv("MEMORY_SUMMARY_MAX_PENDING", "20"))  # Trimmed turns kept waiting if summaries fail
     
     # ============ Helper Methods ============
     @classmethod  # Define a class method (doesn't need an instance)
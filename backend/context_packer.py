@@ -0,0 +1,146 @@
+"""
+Context Packer for EchoLearn AI - This file builds the "Study Materials" block for the AI
+Merges overlapping chunks, drops near-duplicates and fills a token budget - Keeps prompts small and fast
+"""
+
+from typing import Dict, List, Optional  # Import types for organization
+import logging  # Import logging for tracking packing decisions
+
+from config import Config  # Import project settings
+from token_counter import TokenCounter  # Import the tool that counts tokens like the AI does
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for the context packer
+
+
+class ContextPacker:  # Define the class that assembles retrieved chunks into one context
+    """Assemble retrieved chunks into a deduplicated, token-budgeted context"""
+
+    def __init__(  # Initialize packing settings
+        self,
+        duplicate_threshold: float = None,
+        min_overlap_chars: int = 20,
+        token_counter: Optional[TokenCounter] = None
+    ):
+        """
+        Initialize Context Packer
+        """
+        self.duplicate_threshold = duplicate_threshold or Config.CONTEXT_DUPLICATE_THRESHOLD  # Word-overlap ratio that counts as a duplicate
+        self.min_overlap_chars = min_overlap_chars  # Shortest shared text that counts as an overlap
+        self.max_overlap_chars = Config.CHUNK_OVERLAP * 2  # Chunks never share more than the chunker's overlap
+        self.token_counter = token_counter or TokenCounter()
+
+    def pack(self, results: List[Dict], token_budget: Optional[int] = None) -> Dict:  # Main packing function
+        """
+        Build the context text from retrieval results within a token budget
+        """
+        if not results:
+            return {"context": "", "context_tokens": 0, "num_blocks": 0, "merged": 0, "dropped": 0, "truncated": False}
+
+        blocks = self._merge_chunks(results)  # Step 1: glue neighbouring pieces of the same document together
+        merged = len(results) - len(blocks)
+
+        blocks, dropped = self._drop_duplicates(blocks)  # Step 2: skip pieces that say the same thing again
+
+        # Step 3: fill the budget, best-ranked blocks first
+        blocks.sort(key=lambda block: block["rank"])
+        context_parts = []
+        used_tokens = 0
+        truncated = False
+
+        for i, block in enumerate(blocks, 1):
+            header = f"[Source {i}: {block['source']}]"
+            text = block["text"]
+            block_tokens = self.token_counter.count(header + "\n" + text + "\n")
+
+            if token_budget is not None and used_tokens + block_tokens > token_budget:
+                remaining = token_budget - used_tokens - self.token_counter.count(header) - 2
+                if remaining < 50:  # Too little room left for a useful piece
+                    dropped += len(blocks) - i + 1
+                    break
+                text = self.token_counter.truncate(text, remaining)  # Keep the start of the block
+                block_tokens = self.token_counter.count(header + "\n" + text + "\n")
+                truncated = True
+
+            context_parts.extend([header, text, ""])  # Same layout as before: label, text, blank line
+            used_tokens += block_tokens
+            if truncated:  # Budget is now full
+                dropped += len(blocks) - i
+                break
+
+        context = "\n".join(context_parts)
+        return {
+            "context": context,
+            "context_tokens": self.token_counter.count(context),
+            "num_blocks": len(context_parts) // 3,
+            "merged": merged,
+            "dropped": dropped,
+            "truncated": truncated
+        }
+
+    def _merge_chunks(self, results: List[Dict]) -> List[Dict]:  # Glue overlapping neighbours together
+        """Merge adjacent or overlapping chunks that come from the same source"""
+        ordered = sorted(
+            results,
+            key=lambda r: (r["metadata"].get("source", "Unknown"), r.get("chunk_id", r["rank"]))
+        )
+
+        blocks = []
+        for result in ordered:
+            source = result["metadata"].get("source", "Unknown")
+            chunk_id = result.get("chunk_id")
+            previous = blocks[-1] if blocks else None
+
+            if previous and previous["source"] == source:
+                adjacent = chunk_id is not None and previous["last_chunk_id"] is not None \
+                    and chunk_id - previous["last_chunk_id"] == 1
+                overlap = self._overlap_length(previous["text"], result["text"])
+                if adjacent or overlap >= self.min_overlap_chars:
+                    joiner = "" if overlap else " "
+                    previous["text"] = previous["text"] + joiner + result["text"][overlap:]
+                    previous["last_chunk_id"] = chunk_id
+                    previous["rank"] = min(previous["rank"], result["rank"])  # Keep the best rank
+                    continue
+
+            blocks.append({
+                "source": source,
+                "text": result["text"],
+                "rank": result["rank"],
+                "last_chunk_id": chunk_id
+            })
+        return blocks
+
+    def _overlap_length(self, first: str, second: str) -> int:  # Find text repeated at the boundary
+        """Length of the longest suffix of first that is also a prefix of second"""
+        longest = min(len(first), len(second), self.max_overlap_chars)
+        for size in range(longest, self.min_overlap_chars - 1, -1):
+            if first.endswith(second[:size]):
+                return size
+        return 0
+
+    def _drop_duplicates(self, blocks: List[Dict]):  # Skip blocks that repeat one we already kept
+        """Drop blocks whose word shingles mostly match a better-ranked block"""
+        kept, kept_shingles, dropped = [], [], 0
+        for block in sorted(blocks, key=lambda b: b["rank"]):  # Better-ranked blocks win
+            shingles = self._shingles(block["text"])
+            if any(self._similarity(shingles, other) >= self.duplicate_threshold for other in kept_shingles):
+                dropped += 1
+                continue
+            kept.append(block)
+            kept_shingles.append(shingles)
+        return kept, dropped
+
+    @staticmethod
+    def _shingles(text: str, size: int = 3) -> set:
+        """Set of overlapping 3-word phrases (robust to small wording differences)"""
+        words = text.lower().split()
+        if len(words) < size:
+            return {" ".join(words)}
+        return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+    @staticmethod
+    def _similarity(first: set, second: set) -> float:
+        """Share of the smaller shingle set that also appears in the other set"""
+        if not first or not second:
+            return 0.0
+        return len(first & second) / min(len(first), len(second))
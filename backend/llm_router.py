@@ -0,0 +1,407 @@
+"""
+LLM Router for EchoLearn AI - This file decides which AI company answers each request
+Holds several OpenAI-compatible providers, hedges slow requests and fails over on errors - Fewer canned apologies
+"""
+
+from typing import Dict, Iterator, List, Optional  # Import types for organization
+import queue  # Import queue for passing tokens from worker threads back to the caller
+import random  # Import random for backoff jitter
+import threading  # Import threading to run a primary and a hedged request side by side
+import logging  # Import logging for tracking routing decisions
+import time  # Import time for deadlines and backoff
+
+import openai  # Import the openai package for its error types
+from openai import OpenAI  # Import OpenAI client (works for every OpenAI-compatible provider)
+
+from config import Config  # Import project settings
+from metrics import LatencyTracker, metrics  # Import latency tracking for the p95 hedge deadline
+from llm_scheduler import LLMScheduler, ProviderBudget  # Import rate-limit budgets and the fair queue
+from token_counter import TokenCounter  # Import token counting for budget reservations
+from request_context import CancelToken, RequestCancelled  # Import cancellation of abandoned requests
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for the router
+
+
+class ProviderUnavailableError(Exception):  # Raised when every provider failed
+    """All configured LLM providers failed or are cooling down"""
+
+
+class LLMProvider:  # One OpenAI-compatible backend (OpenAI, Groq, a local server...)
+    """Client, model and latency history for one LLM provider"""
+
+    def __init__(self, name: str, api_key: str, model: str, base_url: Optional[str] = None):  # Initialize the provider
+        """
+        Initialize LLM Provider
+        """
+        self.name = name  # e.g. "groq"
+        self.model = model  # e.g. "llama-3.1-8b-instant"
+        # max_retries=0: the router does its own retries, spread across providers
+        self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0, timeout=Config.LLM_REQUEST_TIMEOUT)
+        self.first_token_latency = LatencyTracker()  # How long this provider takes to start answering
+        self.budget = ProviderBudget(*Config.LLM_RATE_LIMITS.get(name, (0, 0)))  # RPM/TPM, synced from headers
+        self.failures = 0  # Errors seen from this provider
+
+    @classmethod
+    def from_config(cls, name: str) -> Optional["LLMProvider"]:  # Build a provider from the settings
+        """Create a provider from Config, or None if its API key is missing"""
+        api_key = Config.LLM_API_KEYS.get(name, "")
+        if name not in Config.LLM_BASE_URLS:
+            raise ValueError(f"Unsupported LLM provider: {name}")
+        if not api_key:
+            return None
+        return cls(name, api_key, Config.LLM_MODELS.get(name, ""), Config.LLM_BASE_URLS[name])
+
+    def is_cooling_down(self) -> bool:
+        """Check whether the provider recently asked us to back off"""
+        return self.budget.is_paused()
+
+
+class _Attempt:  # One streaming request to one provider, running in its own thread
+    """A single streaming call whose events are pushed into a shared queue"""
+
+    def __init__(self, router: "LLMRouter", provider: LLMProvider, request: Dict, events: "queue.Queue",
+                 reserved: int, prompt_tokens: int):
+        self.router = router
+        self.provider = provider
+        self.request = request  # Keyword arguments for chat.completions.create
+        self.events = events  # Shared queue: (attempt, kind, payload)
+        self.reserved = reserved  # Tokens taken from the provider's budget for this call
+        self.prompt_tokens = prompt_tokens  # Part of the reservation that is the prompt
+        self.cancelled = threading.Event()  # Set when another attempt won
+        self.started = time.time()
+        self.first_token = False  # Set once a token arrived (its latency is recorded then)
+        self.finished = False  # Set when the call returned or failed
+        self.stream = None  # The open response stream (closed on cancel to stop waiting for tokens)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):  # Worker thread: stream tokens into the shared queue
+        stream = None
+        pieces = []
+        used = 0  # Tokens the provider will bill (nothing if the request was rejected)
+        try:
+            raw = self.provider.client.chat.completions.with_raw_response.create(
+                model=self.provider.model, stream=True, **self.request
+            )
+            self.provider.budget.sync_headers(raw.headers)  # The provider's own view of our quota
+            used = self.prompt_tokens
+            stream = self.stream = raw.parse()
+            if self.cancelled.is_set():  # Lost the race while the request was being sent - hang up now
+                return
+            for chunk in stream:
+                if self.cancelled.is_set():  # Lost the race (or the caller went away) - stop paying for tokens
+                    break
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if not pieces:
+                        self.first_token = True
+                        self.provider.first_token_latency.record(time.time() - self.started)
+                    pieces.append(chunk.choices[0].delta.content)
+                    self.events.put((self, "token", pieces[-1]))
+            self.events.put((self, "done", None))
+        except Exception as e:
+            response = getattr(e, "response", None)
+            if response is not None:  # 429s carry the rate-limit headers too
+                self.provider.budget.sync_headers(response.headers)
+            if not self.cancelled.is_set():  # Errors from closing a cancelled stream are expected
+                self.events.put((self, "error", e))
+        finally:
+            self.finished = True
+            if pieces:
+                used += self.router.token_counter.count("".join(pieces))
+            self.provider.budget.settle(self.reserved, used)  # Return what max_tokens over-reserved
+            self.router.scheduler.notify()  # Queued requests may fit now
+            if stream is not None:
+                try:
+                    stream.close()  # Close the HTTP response so the provider stops generating
+                except Exception:
+                    pass
+
+    def cancel(self):
+        """
+        Stop the attempt: close its stream (even before the first chunk arrives) and, if it was still
+        waiting for a first token, record the time waited so far as a lower bound of its latency
+        (otherwise slow attempts that lose a hedge race would never count and the hedge delay would shrink)
+        """
+        if self.cancelled.is_set():
+            return
+        self.cancelled.set()
+        if not self.first_token and not self.finished:
+            self.provider.first_token_latency.record(time.time() - self.started)
+        stream = self.stream
+        if stream is not None:
+            try:
+                stream.close()  # Wakes the thread if it is blocked waiting for the first chunk
+            except Exception:
+                pass
+
+
+class LLMRouter:  # Define the provider router
+    """Route chat completions across providers with hedging and failover"""
+
+    def __init__(self, providers: Optional[List[LLMProvider]] = None):  # Initialize the router
+        """
+        Initialize LLM Router
+        """
+        if providers is None:  # Build from settings: primary first, then the fallbacks
+            names = [Config.LLM_PROVIDER] + [
+                name for name in Config.LLM_FALLBACK_PROVIDERS if name != Config.LLM_PROVIDER
+            ]
+            providers = []
+            for name in names:
+                provider = LLMProvider.from_config(name)
+                if provider is None:
+                    if name == Config.LLM_PROVIDER:  # The primary provider must work
+                        raise ValueError(f"{name} API key not found in configuration")
+                    logger.warning(f"Skipping fallback LLM provider '{name}' (no API key)")
+                    continue
+                providers.append(provider)
+
+        if not providers:
+            raise ValueError("No LLM providers configured")
+
+        self.providers = providers  # Primary first
+        self.hedging = Config.LLM_HEDGE_ENABLED and len(providers) > 1  # Need a second provider to hedge
+        self.hedges_fired = 0  # Times a duplicate request was sent
+        self.hedges_won = 0  # Times the duplicate answered first
+        self.failovers = 0  # Times we switched provider after an error
+        self.scheduler = LLMScheduler()  # Keeps requests inside the providers' rate limits
+        self.token_counter = TokenCounter()  # Estimates request size for the token budgets
+
+        logger.info(
+            f"LLMRouter providers: {[p.name for p in providers]} (hedging {'on' if self.hedging else 'off'})"
+        )
+
+    @property
+    def primary(self) -> LLMProvider:
+        """The first-choice provider"""
+        return self.providers[0]
+
+    def complete(self, messages: List[Dict], **kwargs) -> str:  # Get a whole answer
+        """
+        Generate a full response (streamed internally so hedging can use the first token)
+        """
+        return "".join(self.stream(messages, **kwargs)).strip()
+
+    def stream(  # Get an answer piece by piece
+        self,
+        messages: List[Dict],
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        session_id: str = "default",
+        cancel: Optional[CancelToken] = None
+    ) -> Iterator[str]:
+        """
+        Stream response text, hedging to a secondary provider when the first token is late
+        and failing over to the next provider on 429/5xx/connection errors
+        Waits in the per-session fair queue until a provider has rate-limit budget
+        Raises RequestCancelled as soon as cancel fires (the HTTP streams are closed)
+        Gives up waiting for the first token at cancel's deadline (ProviderUnavailableError)
+        """
+        request = {
+            "messages": messages,
+            "temperature": Config.LLM_TEMPERATURE if temperature is None else temperature,
+            "max_tokens": max_tokens or Config.LLM_MAX_TOKENS
+        }
+        prompt_tokens = self.token_counter.count_messages(messages)
+        reserved = prompt_tokens + request["max_tokens"]  # Worst case until the answer's real length is known
+
+        events: "queue.Queue" = queue.Queue()  # Every attempt reports here
+        attempts: List[_Attempt] = []
+        candidates = self._ordered_providers()  # Healthy providers first
+        retries = 0
+        winner = None
+        first_token = None
+        deadline = cancel.deadline if cancel else None  # The whole request's latency budget
+
+        # Wait for quota; the provider with room (in preference order) goes first
+        chosen = self.scheduler.acquire(session_id, reserved, [p.budget for p in candidates], cancel)
+        candidates.insert(0, candidates.pop(chosen))
+        if cancel and cancel.cancelled:  # Cancelled just after being admitted - no call made at all
+            candidates[0].budget.settle(reserved, 0)  # Give the reservation back
+            self.scheduler.notify()
+            cancel.check()
+
+        def start(provider: LLMProvider) -> _Attempt:
+            attempt = _Attempt(self, provider, request, events, reserved, prompt_tokens)
+            attempts.append(attempt)
+            return attempt
+
+        if cancel:  # Wake the loops below even while they wait for a first token
+            cancel.add_callback(lambda: events.put((None, "cancelled", None)))
+
+        try:
+            primary = start(candidates.pop(0))
+            hedge_at = self._hedge_deadline(primary.provider) if self.hedging and candidates else None
+            live = 1  # Attempts that may still answer
+
+            while winner is None:  # Wait for the first token from any attempt
+                timeout = max(0.0, hedge_at - time.time()) if hedge_at else Config.LLM_REQUEST_TIMEOUT
+                if deadline is not None:
+                    timeout = min(timeout, max(0.0, deadline - time.time()))
+                try:
+                    attempt, kind, payload = events.get(timeout=timeout)
+                except queue.Empty:
+                    if deadline is not None and time.time() >= deadline:  # No answer worth waiting for anymore
+                        cancel.degrade("llm_deadline_exceeded")
+                        raise ProviderUnavailableError("LLM did not answer before the request deadline")
+                    if hedge_at is None:  # Nothing at all within the request timeout
+                        error = ProviderUnavailableError("LLM request timed out")
+                        for attempt in attempts:
+                            if not attempt.cancelled.is_set():  # Still silent - count it against its provider
+                                self._record_failure(attempt.provider, error)
+                        raise error
+                    hedge_at = None  # Fire the hedge only once per request
+                    if candidates[0].budget.wait_time(reserved) > 0:  # A hedge must not eat rate-limited quota
+                        continue
+                    candidates[0].budget.take(reserved)
+                    hedge = start(candidates.pop(0))
+                    live += 1
+                    self.hedges_fired += 1
+                    metrics.increment("llm_hedges_fired")
+                    logger.info(f"Hedging: {primary.provider.name} slow, also asking {hedge.provider.name}")
+                    continue
+
+                if kind == "cancelled":  # The caller no longer wants the answer
+                    raise RequestCancelled(cancel.reason)
+                if attempt.cancelled.is_set():  # Event from an attempt we already gave up on
+                    continue
+
+                if kind in ("token", "done"):  # This attempt answered first
+                    winner, first_token = attempt, payload
+                    break
+
+                # kind == "error": this attempt failed before producing anything
+                live -= 1
+                attempt.cancel()
+                self._record_failure(attempt.provider, payload)
+                if live > 0:  # Another attempt (the hedge or the primary) is still running
+                    continue
+                if not self._is_retryable(payload) or retries >= Config.LLM_MAX_RETRIES:
+                    raise payload
+
+                # Fail over: back off, then try the next provider (cycling back to the start if needed)
+                retries += 1
+                self.failovers += 1
+                metrics.increment("llm_failovers")
+                if not candidates:
+                    candidates = self._ordered_providers()
+                time.sleep(self._backoff_delay(retries, candidates[0]))
+                # Queue again for budget (a rate-limited provider waits out its Retry-After here)
+                chosen = self.scheduler.acquire(session_id, reserved, [p.budget for p in candidates], cancel)
+                if cancel and cancel.cancelled:
+                    candidates[chosen].budget.settle(reserved, 0)
+                    self.scheduler.notify()
+                    cancel.check()
+                primary = start(candidates.pop(chosen))
+                live = 1
+                hedge_at = self._hedge_deadline(primary.provider) if self.hedging and candidates else None
+                logger.warning(f"Failing over to {primary.provider.name} (retry {retries})")
+
+            # Cancel the losers so they stop using quota
+            for attempt in attempts:
+                if attempt is not winner:
+                    attempt.cancel()
+            if winner is not primary:
+                self.hedges_won += 1
+
+            if first_token is None:  # Finished without any text
+                return
+            yield first_token
+
+            while True:  # Pass on the rest of the winner's tokens
+                try:
+                    attempt, kind, payload = events.get(timeout=Config.LLM_REQUEST_TIMEOUT)
+                except queue.Empty:  # The stream stalled mid-answer
+                    error = ProviderUnavailableError(f"{winner.provider.name} stopped sending tokens mid-answer")
+                    self._record_failure(winner.provider, error)
+                    raise error
+                if kind == "cancelled":
+                    raise RequestCancelled(cancel.reason)
+                if attempt is not winner:
+                    continue
+                if kind == "token":
+                    yield payload
+                elif kind == "done":
+                    return
+                else:  # Failed mid-answer: nothing sensible to fail over to
+                    self._record_failure(winner.provider, payload)
+                    raise payload
+        finally:
+            for attempt in attempts:  # Caller stopped early or an error happened - stop everything
+                attempt.cancel()
+
+    def expected_first_token(self) -> float:  # Used to size max_tokens for a request deadline
+        """Typical (p50) first-token latency of the primary provider, or DEADLINE_FIRST_TOKEN_MS until measured"""
+        tracker = self.primary.first_token_latency
+        if tracker.count < Config.LLM_HEDGE_MIN_SAMPLES:
+            return Config.DEADLINE_FIRST_TOKEN_MS / 1000
+        return tracker.percentile(50)
+
+    def _ordered_providers(self) -> List[LLMProvider]:
+        """Providers in preference order, those cooling down after a 429 last"""
+        return sorted(self.providers, key=lambda p: p.is_cooling_down())  # Stable sort keeps primary first
+
+    def _hedge_deadline(self, provider: LLMProvider) -> float:
+        """Time at which to send a hedged duplicate: the provider's p95 first-token latency"""
+        tracker = provider.first_token_latency
+        if tracker.count < Config.LLM_HEDGE_MIN_SAMPLES:  # Not enough history yet
+            delay = Config.LLM_HEDGE_DEFAULT_DELAY_S
+        else:
+            delay = tracker.percentile(Config.LLM_HEDGE_PERCENTILE)
+        delay = min(max(delay, Config.LLM_HEDGE_MIN_DELAY_S), Config.LLM_HEDGE_MAX_DELAY_S)
+        return time.time() + delay
+
+    def _record_failure(self, provider: LLMProvider, error: Exception):
+        """Count a failure and honour Retry-After on rate limits"""
+        provider.failures += 1
+        metrics.increment(f"llm_errors_{provider.name}")
+        logger.warning(f"LLM provider {provider.name} failed: {error}")
+        if isinstance(error, openai.RateLimitError):
+            provider.budget.pause(self._retry_after(error, default=Config.LLM_BACKOFF_BASE_S * 4))
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """429, 5xx, timeouts and connection problems are worth retrying elsewhere"""
+        if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code >= 500
+        return isinstance(error, ProviderUnavailableError)
+
+    @staticmethod
+    def _retry_after(error: Exception, default: float) -> float:
+        """Read the Retry-After header from a provider error, if there is one"""
+        response = getattr(error, "response", None)
+        try:
+            return float(response.headers.get("retry-after", default))
+        except (AttributeError, TypeError, ValueError):
+            return default
+
+    @staticmethod
+    def _backoff_delay(retry: int, next_provider: LLMProvider) -> float:
+        """Exponential backoff with jitter, waiting out the next provider's rate-limit cooldown if it has one"""
+        delay = Config.LLM_BACKOFF_BASE_S * (2 ** (retry - 1)) * random.uniform(0.5, 1.0)
+        if next_provider.is_cooling_down():
+            delay = max(delay, next_provider.budget.paused_until - time.time())
+        return min(delay, Config.LLM_BACKOFF_MAX_S)
+
+    def get_stats(self) -> Dict:  # Report for /metrics
+        """Get routing statistics"""
+        return {
+            "providers": {
+                p.name: {
+                    "model": p.model,
+                    "failures": p.failures,
+                    "cooling_down": p.is_cooling_down(),
+                    "budget": p.budget.get_stats(),
+                    "first_token_latency": p.first_token_latency.get_stats()
+                }
+                for p in self.providers
+            },
+            "hedging": self.hedging,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "failovers": self.failovers,
+            "scheduler": self.scheduler.get_stats()
+        }
@@ -0,0 +1,304 @@
+"""
+LLM Scheduler for EchoLearn AI - This file keeps AI requests inside the provider's rate limits
+Token buckets for requests/tokens per minute (synced from response headers) and a fair per-session queue
+"""
+
+from collections import OrderedDict, deque  # Import ordered containers for the round-robin queue
+from typing import Dict, List, Mapping, Optional  # Import types for organization
+import re  # Import re for reading reset times like "2m59.56s"
+import threading  # Import threading because many requests wait for quota at once
+import logging  # Import logging for tracking queueing
+import time  # Import time for refill math and wait times
+
+from config import Config  # Import project settings
+from metrics import LatencyTracker, metrics  # Import latency tracking for queue wait times
+from request_context import CancelToken, RequestCancelled  # Import cancellation so a dropped request leaves the queue
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for the scheduler
+
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)?")  # One piece of "1h2m3.5s" / "20ms" / "7"
+
+
+class QueueTimeoutError(Exception):  # Raised when quota did not free up in time
+    """A request waited longer than LLM_QUEUE_MAX_WAIT_S for rate-limit budget"""
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:  # Read a reset header
+    """Convert a reset value such as "2m59.56s", "7.66s", "20ms" or "3" to seconds"""
+    if not value:
+        return None
+    seconds = 0.0
+    found = False
+    for number, unit in DURATION_PART.findall(value):
+        found = True
+        seconds += float(number) * {"ms": 0.001, "h": 3600, "m": 60}.get(unit, 1)
+    return seconds if found else None
+
+
+class TokenBucket:  # One budget that refills over time (e.g. 6000 tokens per minute)
+    """Token bucket that refills continuously; a capacity of 0 means unlimited"""
+
+    def __init__(self, capacity: float, period: float = 60.0):  # Initialize the bucket
+        """
+        Initialize Token Bucket
+        """
+        self.capacity = capacity  # Most the bucket can hold
+        self.period = period  # Seconds to refill from empty
+        self.rate = capacity / period if capacity else 0.0  # Refill per second
+        self.level = capacity  # What is left right now (may go negative: borrowed by failovers)
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return not self.capacity
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:  # How long until "amount" is available
+        """Seconds until the bucket holds amount (0 if it already does)"""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)  # A request bigger than the bucket only needs a full bucket
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate if self.rate else float("inf")
+
+    def take(self, amount: float):  # Spend from the bucket
+        """Remove amount from the bucket"""
+        if not self.unlimited:
+            self._refill()
+            self.level -= amount
+
+    def give_back(self, amount: float):  # Return an over-estimate
+        """Return unused reservation to the bucket"""
+        if not self.unlimited:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], reset: Optional[float]):
+        """Correct the bucket from the provider's own numbers"""
+        if limit and limit != self.capacity:
+            if self.unlimited:  # First real limit we hear about - start with a full bucket
+                self.level = limit
+            else:  # Our starting guess was off - shift the level by the difference
+                self.level += limit - self.capacity
+            self.capacity = limit
+            self.rate = limit / self.period
+        if self.unlimited or remaining is None:
+            return
+        self._refill()
+        # Headers lag requests we already sent (responses arrive out of order), so they may only lower the level
+        self.level = min(self.level, remaining)
+        if reset and reset > 0 and remaining < self.capacity:
+            # The provider refills to full by the reset time; this also handles per-day request limits
+            self.rate = (self.capacity - remaining) / reset
+
+
+class ProviderBudget:  # Requests-per-minute and tokens-per-minute for one provider
+    """Rate-limit budget of one provider, kept in step with its x-ratelimit-* headers"""
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):  # Initialize the budget
+        """
+        Initialize Provider Budget
+        """
+        self.requests = TokenBucket(requests_per_minute)  # RPM bucket
+        self.tokens = TokenBucket(tokens_per_minute)  # TPM bucket
+        self.paused_until = 0.0  # Set after a 429 (honours Retry-After)
+        self._lock = threading.Lock()  # Attempts update the budget from their own threads
+
+    def is_paused(self) -> bool:
+        """Check whether the provider recently asked us to back off"""
+        return time.time() < self.paused_until
+
+    def wait_time(self, tokens: int) -> float:  # How long until a request of this size may be sent
+        """Seconds until one more request of the given token size fits the budget"""
+        with self._lock:
+            return max(
+                self.paused_until - time.time(),
+                self.requests.wait_time(1),
+                self.tokens.wait_time(tokens),
+                0.0
+            )
+
+    def take(self, tokens: int):  # Reserve budget for a request
+        """Reserve one request and an estimated number of tokens"""
+        with self._lock:
+            self.requests.take(1)
+            self.tokens.take(tokens)
+
+    def settle(self, reserved: int, used: int):  # Fix the reservation once the real size is known
+        """Adjust the token bucket by the difference between reserved and used tokens"""
+        with self._lock:
+            if used < reserved:
+                self.tokens.give_back(reserved - used)
+            else:
+                self.tokens.take(used - reserved)
+
+    def pause(self, seconds: float):  # Stop sending for a while (after a 429)
+        """Block this provider for the given number of seconds"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.time() + seconds)
+
+    def sync_headers(self, headers: Mapping[str, str]):  # Read x-ratelimit-* headers
+        """Update both buckets from OpenAI/Groq-style rate-limit headers"""
+        def number(name):
+            try:
+                return float(headers.get(name))
+            except (TypeError, ValueError):
+                return None
+
+        with self._lock:
+            self.requests.sync(
+                number("x-ratelimit-limit-requests"),
+                number("x-ratelimit-remaining-requests"),
+                parse_duration(headers.get("x-ratelimit-reset-requests"))
+            )
+            self.tokens.sync(
+                number("x-ratelimit-limit-tokens"),
+                number("x-ratelimit-remaining-tokens"),
+                parse_duration(headers.get("x-ratelimit-reset-tokens"))
+            )
+
+    def get_stats(self) -> Dict:  # Report for /metrics
+        """Get current budget levels"""
+        with self._lock:
+            self.requests._refill()
+            self.tokens._refill()
+            return {
+                "requests_available": None if self.requests.unlimited else round(self.requests.level, 1),
+                "requests_capacity": self.requests.capacity or None,
+                "tokens_available": None if self.tokens.unlimited else round(self.tokens.level),
+                "tokens_capacity": self.tokens.capacity or None,
+                "paused": self.is_paused()
+            }
+
+
+class LLMScheduler:  # Define the fair queue in front of the providers
+    """Admit LLM requests when budget allows, serving waiting sessions round-robin"""
+
+    def __init__(self, max_wait: float = None):  # Initialize the scheduler
+        """
+        Initialize LLM Scheduler
+        """
+        self.max_wait = max_wait or Config.LLM_QUEUE_MAX_WAIT_S  # Longest a request may wait
+        self.queues: "OrderedDict[str, deque]" = OrderedDict()  # session -> waiting tickets (first session has the turn)
+        self._cond = threading.Condition()  # Wakes waiters when the queue or budget changes
+        self.wait_times = LatencyTracker()  # How long requests waited for quota
+        self.admitted = 0  # Requests sent
+        self.queued = 0  # Requests that had to wait
+        self.timeouts = 0  # Requests that gave up waiting
+        self.max_depth = 0  # Longest queue seen
+
+    def acquire(
+        self,
+        session_id: str,
+        tokens: int,
+        budgets: List[ProviderBudget],
+        cancel: Optional[CancelToken] = None
+    ) -> int:  # Wait for our turn
+        """
+        Block until this request may be sent, reserve its budget and return
+        the index of the budget (provider) that admitted it (raises RequestCancelled
+        without reserving anything if the request is cancelled while it waits, and
+        QueueTimeoutError once LLM_QUEUE_MAX_WAIT_S or the request's deadline passes)
+        """
+        ticket = object()  # Identifies this request in its session's queue
+        start = time.monotonic()
+        deadline = start + self.max_wait
+        remaining = cancel.remaining() if cancel else None
+        late = remaining is not None and remaining < self.max_wait  # The request's own budget runs out first
+        if late:
+            deadline = start + max(remaining, 0.0)
+        waited = False
+        if cancel:
+            cancel.add_callback(self.notify)  # Wake the wait below as soon as the request is cancelled
+
+        with self._cond:
+            self.queues.setdefault(session_id, deque()).append(ticket)
+            self.max_depth = max(self.max_depth, self.depth())
+            try:
+                while True:
+                    if cancel and cancel.cancelled:  # Leave the queue before taking any budget
+                        raise RequestCancelled(cancel.reason)
+                    timeout = deadline - time.monotonic()
+                    if self._has_turn(session_id, ticket):
+                        waits = [budget.wait_time(tokens) for budget in budgets]
+                        ready = [i for i, wait in enumerate(waits) if wait <= 0]
+                        if ready:  # First provider (in preference order) with room
+                            chosen = ready[0]
+                            budgets[chosen].take(tokens)
+                            self._advance(session_id)
+                            break
+                        timeout = min(timeout, min(waits))  # Sleep until the soonest refill
+                    if deadline - time.monotonic() <= 0:
+                        self.timeouts += 1
+                        metrics.increment("llm_queue_timeouts")
+                        if late:
+                            cancel.degrade("llm_queue_deadline_exceeded")
+                            raise QueueTimeoutError("Request deadline passed while waiting for LLM rate-limit budget")
+                        raise QueueTimeoutError(f"Waited {self.max_wait:.0f}s for LLM rate-limit budget")
+                    waited = True
+                    self._cond.wait(timeout=max(timeout, 0.01))
+            except BaseException:
+                self._remove(session_id, ticket)
+                raise
+            finally:
+                self._cond.notify_all()  # The next request may now have the turn
+
+        elapsed = time.monotonic() - start
+        self.admitted += 1
+        if waited:
+            self.queued += 1
+            logger.info(f"LLM request for session {session_id} waited {elapsed:.2f}s for quota")
+        self.wait_times.record(elapsed)
+        metrics.observe("llm_queue_wait", elapsed)
+        return chosen
+
+    def notify(self):  # Budget was returned - let waiters re-check
+        """Wake waiting requests (call after budget was given back)"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def depth(self) -> int:
+        """Number of requests currently waiting"""
+        return sum(len(queue) for queue in self.queues.values())
+
+    def _has_turn(self, session_id: str, ticket: object) -> bool:  # Caller holds the lock
+        """True if this ticket is first in the session whose turn it is"""
+        first_session = next(iter(self.queues), None)
+        return first_session == session_id and self.queues[session_id][0] is ticket
+
+    def _advance(self, session_id: str):  # Caller holds the lock
+        """Remove the admitted ticket and pass the turn to the next session"""
+        queue = self.queues[session_id]
+        queue.popleft()
+        if queue:
+            self.queues.move_to_end(session_id)  # Round-robin: this session goes to the back of the line
+        else:
+            del self.queues[session_id]
+
+    def _remove(self, session_id: str, ticket: object):  # Caller holds the lock
+        """Drop a ticket that gave up waiting"""
+        queue = self.queues.get(session_id)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self.queues[session_id]
+
+    def get_stats(self) -> Dict:  # Report for /metrics
+        """Get queue statistics"""
+        with self._cond:
+            return {
+                "queue_depth": self.depth(),
+                "sessions_waiting": len(self.queues),
+                "max_queue_depth": self.max_depth,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "timeouts": self.timeouts,
+                "wait_time": self.wait_times.get_stats()
+            }
@@ -0,0 +1,130 @@
+"""
+Load Controller for EchoLearn AI - This file keeps answers fast when many students ask at once
+Watches in-flight requests and recent stage latencies, and steps quality down through tiers (and back up when it is quiet)
+"""
+
+from collections import deque  # Import deque for the sliding window of recent answers
+from typing import Callable, Deque, Dict, List, Optional, Tuple  # Import types for organization
+import json  # Import json for custom tiers
+import threading  # Import threading for the background evaluator
+import logging  # Import logging for tracking tier changes
+import time  # Import time for the sliding window
+
+from config import Config  # Import project settings
+from metrics import metrics  # Import the shared performance-numbers registry
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for the load controller
+
+STAGES = ("transcription_time", "agent_time", "synthesis_time", "total_time")  # From the /ask timing block
+
+# Each tier keeps the cuts of the one before it: cheaper STT search, fewer chunks, shorter answers, no audio
+DEFAULT_TIERS: List[Dict] = [
+    {"name": "normal"},
+    {"name": "fast_stt", "stt_profile": Config.STT_PROFILE_FAST},
+    {"name": "fewer_chunks", "stt_profile": Config.STT_PROFILE_FAST, "top_k": 1},
+    {"name": "short_answers", "stt_profile": Config.STT_PROFILE_FAST, "top_k": 1, "max_tokens": 200},
+    {"name": "text_only", "stt_profile": Config.STT_PROFILE_FAST, "top_k": 1, "max_tokens": 200, "text_only": True},
+]
+
+
+class LoadController:  # Define the quality dial
+    """Pick a degradation tier from queue depth and recent latencies, with hysteresis"""
+
+    def __init__(  # Initialize the controller
+        self,
+        depth_fn: Callable[[], int],
+        tiers: Optional[List[Dict]] = None,
+        interval: float = None
+    ):
+        """
+        Initialize Load Controller
+        """
+        self.depth_fn = depth_fn  # Requests currently being answered
+        self.tiers = tiers or json.loads(Config.LOAD_TIERS_JSON or "null") or DEFAULT_TIERS
+        self.interval = interval or Config.LOAD_CONTROL_INTERVAL_SECONDS
+        self.tier = 0  # Index into self.tiers (0 = full quality)
+        self.changed = time.time()  # When the tier last changed
+        self.steps_down = 0
+        self.steps_up = 0
+        self._calm = 0  # Consecutive calm evaluations (stepping up needs several)
+        self._pressure = 0.0  # Last evaluation's load / target
+        self._samples: Deque[Tuple[float, Dict[str, float]]] = deque()  # (finished at, stage timings)
+        self._lock = threading.Lock()
+
+        if Config.LOAD_CONTROL_ENABLED:
+            self._worker = threading.Thread(target=self._run, name="load-controller", daemon=True)
+            self._worker.start()
+
+    def current(self) -> Dict:  # Settings for a request starting now
+        """The active tier's settings (e.g. {"name": "fewer_chunks", "top_k": 1, ...})"""
+        with self._lock:
+            return self.tiers[self.tier]
+
+    def record(self, timing: Dict):  # Called with each answered request's timing block
+        """Add one answer's stage latencies to the sliding window"""
+        sample = {stage: timing[stage] for stage in STAGES if timing.get(stage) is not None}
+        with self._lock:
+            self._samples.append((time.time(), sample))
+
+    def _recent(self, stage: str) -> Optional[float]:  # Median of the window (call with the lock held)
+        values = sorted(sample[stage] for _, sample in self._samples if stage in sample)
+        return round(values[len(values) // 2], 2) if values else None
+
+    def evaluate(self) -> int:  # One control step (runs every LOAD_CONTROL_INTERVAL_SECONDS)
+        """Step one tier down when overloaded, one up after LOAD_RECOVER_INTERVALS calm checks"""
+        depth = self.depth_fn()
+        with self._lock:
+            cutoff = time.time() - Config.LOAD_WINDOW_SECONDS
+            while self._samples and self._samples[0][0] < cutoff:  # Only recent answers count
+                self._samples.popleft()
+            latency = self._recent("total_time") or 0.0
+            self._pressure = max(depth / Config.LOAD_QUEUE_HIGH, latency / Config.LOAD_LATENCY_TARGET_S)
+
+            previous = self.tier
+            if self._pressure >= 1 and self.tier < len(self.tiers) - 1:
+                self.tier += 1
+                self.steps_down += 1
+                self._calm = 0
+            elif self._pressure < Config.LOAD_RECOVER_RATIO and self.tier > 0:
+                self._calm += 1
+                if self._calm >= Config.LOAD_RECOVER_INTERVALS:
+                    self.tier -= 1
+                    self.steps_up += 1
+                    self._calm = 0
+            else:
+                self._calm = 0
+
+            if self.tier != previous:
+                self.changed = time.time()
+                self._samples.clear()  # Latencies measured at the old tier would push it further
+                logger.warning(
+                    f"Load tier {self.tiers[previous]['name']} -> {self.tiers[self.tier]['name']} "
+                    f"(in flight {depth}, median answer {latency:.1f}s)"
+                )
+                metrics.increment("load_tier_changes")
+            return self.tier
+
+    def _run(self):  # Background thread: evaluate on a schedule
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.evaluate()
+            except Exception as e:  # Never let the controller die
+                logger.error(f"Load evaluation failed: {e}")
+
+    def get_stats(self) -> Dict:  # Report for /health and /metrics
+        """Get the current tier and the signals behind it"""
+        with self._lock:
+            return {
+                "enabled": Config.LOAD_CONTROL_ENABLED,
+                "tier": self.tier,
+                "tier_name": self.tiers[self.tier]["name"],
+                "settings": self.tiers[self.tier],
+                "pressure": round(self._pressure, 2),
+                "in_flight": self.depth_fn(),
+                "recent_latency": {stage: self._recent(stage) for stage in STAGES},  # Medians over LOAD_WINDOW_SECONDS
+                "since": round(time.time() - self.changed, 1),
+                "steps_down": self.steps_down,
+                "steps_up": self.steps_up
+            }
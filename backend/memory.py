@@ -3,11 +3,15 @@ Conversation Memory for EchoLearn AI - This file helps the AI remember the chat
 Manages chat history and context across multiple turns - Like a person remembering what you said first
 """
 
-from typing import List, Dict, Optional  # Import types for organization
+from collections import OrderedDict  # Import OrderedDict for least-recently-used session eviction
+from typing import Callable, List, Dict, Optional, Tuple  # Import types for organization
 from datetime import datetime  # Import datetime for timestamping chat sessions
+import threading  # Import threading because one student's requests can overlap
 import logging  # Import logging for tracking memory activity
+import time  # Import time for idle-session expiry
 
 from config import Config  # Import project settings
+from token_counter import TokenCounter  # Import token counting for the history budget
 
 logging.basicConfig(level=logging.INFO)  # Setup standard log reports
 logger = logging.getLogger(__name__)  # Create a logger for the memory tool
@@ -16,17 +20,45 @@ logger = logging.getLogger(__name__)  # Create a logger for the memory tool
 class ConversationMemory:  # Define a class for managing chat history
     """Manage conversation history and context"""
     
-    def __init__(self, max_tokens: int = None, max_turns: int = 5):  # Initialize memory settings
+    def __init__(  # Initialize memory settings
+        self,
+        max_tokens: int = None,
+        max_turns: int = 5,
+        session_id: Optional[str] = None,
+        on_resize: Optional[Callable[[int], None]] = None,
+        backend=None,
+        summarizer=None,
+        prompt_budget: int = None
+    ):
         """
         Initialize Conversation Memory
+        on_resize is called with the change in stored characters (used by SessionMemoryStore)
+        backend (e.g. SQLiteMemoryBackend) receives every append/clear for durable storage
+        summarizer (MemorySummarizer) folds trimmed turns into a running summary instead of dropping them
+        prompt_budget is the token share the history gets in the prompt (with a summarizer, turns that would
+        not fit next to the summary are folded, so summary + shown turns always cover the whole conversation)
         """
         self.max_tokens = max_tokens or Config.MEMORY_MAX_TOKENS  # Set limit on total words (tokens) to remember
+        self.prompt_budget = prompt_budget or int(Config.PROMPT_TOKEN_BUDGET * Config.HISTORY_TOKEN_SHARE)
         self.max_turns = max_turns  # Set limit on number of back-and-forth messages to remember (shorter = faster)
         
         self.history: List[Dict] = []  # Create an empty list to store the chat turns
-        self.current_session_id = self._generate_session_id()  # Create a unique ID for this chat session
+        self.current_session_id = session_id or self._generate_session_id()  # Create a unique ID for this chat session
+        self.size_chars = 0  # Characters currently stored (for the store's global memory cap)
+        self.on_resize = on_resize
+        self.backend = backend  # Durable copy of the history (None = memory only)
+        self.summarizer = summarizer  # Background summary writer (None = old turns are simply forgotten)
+        self.summary = ""  # Running summary of turns that no longer fit
+        self.summary_tokens = 0  # Tokens the summary takes in the prompt (with its label)
+        self.pending_fold: List[Dict] = []  # Trimmed turns waiting to be folded into the summary
+        self.fold_generation = 0  # Bumped on clear so an in-flight summary of the old chat is discarded
+        self.token_counter = TokenCounter()  # Same tokenizer as the prompt budget
+        self.history_chars = 0  # Running total of characters in history (kept up to date on every change)
+        self.history_tokens = 0  # Running total of tokens in history (each message is counted once)
+        self._renders: Dict[Tuple, str] = {}  # (num_turns, format, token_budget) -> formatted history
+        self._lock = threading.RLock()  # Two requests from one student must not interleave their updates
         
-        logger.info(f"ConversationMemory initialized: max_tokens={self.max_tokens}, max_turns={self.max_turns}")
+        logger.debug(f"ConversationMemory initialized: max_tokens={self.max_tokens}, max_turns={self.max_turns}")
     
     def add_interaction(  # Function to add a new question and answer to memory
         self,
@@ -43,11 +75,18 @@ class ConversationMemory:  # Define a class for managing chat history
             "assistant": assistant_response,  # Store AI reply
             "metadata": metadata or {}  # Store any extra info (like source names)
         }
+        self._count_tokens(interaction)  # Tokenize once, outside the lock
         
-        self.history.append(interaction)  # Add the package to our history list
-        
-        # Trim history if it's getting too long (to save costs and keep AI efficient)
-        self._trim_history()
+        with self._lock:
+            self.history.append(interaction)  # Add the package to our history list
+            self.history_chars += len(user_message) + len(assistant_response)
+            self.history_tokens += interaction["tokens"]
+            
+            # Trim history if it's getting too long (to save costs and keep AI efficient)
+            self._trim_history()
+            
+            if self.backend:  # Queue the durable write (does not wait for the disk)
+                self.backend.append(self.current_session_id, interaction)
         
         logger.debug(f"Added interaction. History now has {len(self.history)} turns")
     
@@ -55,33 +94,91 @@ class ConversationMemory:  # Define a class for managing chat history
         """
         Get conversation history
         """
-        if num_turns is None:  # If user wants everything
-            return self.history.copy()  # Return a copy of the full list
-        
-        return self.history[-num_turns:] if num_turns > 0 else []  # Return only the last few turns
+        with self._lock:
+            if num_turns is None:  # If user wants everything
+                return self.history.copy()  # Return a copy of the full list
+            
+            return self.history[-num_turns:] if num_turns > 0 else []  # Return only the last few turns
     
     def get_formatted_history(  # Function to turn history into a neat string for the AI to read
         self,
         num_turns: Optional[int] = None,
-        format: str = "text"
+        format: str = "text",
+        token_budget: Optional[int] = None
     ) -> str:
         """
         Get formatted conversation history
+        Starts with the running summary (if any); with token_budget, only the newest turns that fit are included
+        Results are cached until the history or summary changes
         """
-        history = self.get_history(num_turns)  # Get the history data first
+        key = (num_turns, format, token_budget)
+        with self._lock:
+            cached = self._renders.get(key)
+            if cached is not None:  # Nothing changed since the last request
+                return cached
+            history = self.get_history(num_turns)  # Get the history data first
+            summary = self.summary
+            renders = self._renders  # Replaced (not cleared) on change, so a stale render cannot be stored
         
-        if not history:  # If history is empty
+        if not history and not summary:  # If history is empty
             return ""  # Return nothing
         
-        if format == "text":  # Choice 1: Plain text
-            return self._format_as_text(history)
-        elif format == "markdown":  # Choice 2: Markdown style (with bolding)
+        header = self._format_summary(summary, format)
+        if token_budget is not None:  # Keep the newest turns that fit next to the summary
+            history = self._fit_budget(history, header, format, token_budget)
+        
+        body = self._format(history, format) if history else ""
+        rendered = (header + body).strip()
+        renders[key] = rendered
+        return rendered
+    
+    def _format(self, history: List[Dict], format: str) -> str:  # Pick the formatter
+        """Format turns in the requested style"""
+        if format == "markdown":  # Choice 2: Markdown style (with bolding)
             return self._format_as_markdown(history)
         elif format == "chat":  # Choice 3: Chat style (Role: Message)
             return self._format_as_chat(history)
-        else:  # Default to text
+        else:  # Choice 1 and default: Plain text
             return self._format_as_text(history)
     
+    @staticmethod
+    def _format_summary(summary: str, format: str) -> str:  # Label the running summary
+        """Format the running summary as a header block"""
+        if not summary:
+            return ""
+        if format == "markdown":
+            return f"### Earlier in this conversation\n{summary}\n\n"
+        return f"Summary of earlier conversation: {summary}\n\n"
+    
+    def _fit_budget(self, history: List[Dict], header: str, format: str, token_budget: int) -> List[Dict]:
+        """Newest turns whose formatted size fits in the budget left after the summary"""
+        used = self.token_counter.count(header)
+        overhead = self._turn_overhead(format) + 1  # Role labels, +1 for the joining newline
+        kept = []
+        for interaction in reversed(history):  # Newest first (message tokens were counted when it was added)
+            cost = self._count_tokens(interaction) + overhead
+            if used + cost > token_budget:
+                break
+            kept.insert(0, interaction)
+            used += cost
+        return kept
+    
+    def _count_tokens(self, interaction: Dict) -> int:  # Tokenize a turn the first time it is needed
+        """Tokens in a turn's two messages (stored on the turn, so each message is counted only once)"""
+        if "tokens" not in interaction:
+            interaction["tokens"] = (
+                self.token_counter.count(interaction["user"]) + self.token_counter.count(interaction["assistant"])
+            )
+        return interaction["tokens"]
+    
+    _overheads: Dict[str, int] = {}  # format -> tokens added around one turn by its labels
+    
+    def _turn_overhead(self, format: str) -> int:
+        """Tokens the formatting labels ("User:", "**Tutor**:", ...) add to one turn"""
+        if format not in self._overheads:
+            self._overheads[format] = self.token_counter.count(self._format([{"user": "", "assistant": ""}], format))
+        return self._overheads[format]
+    
     def _format_as_text(self, history: List[Dict]) -> str:  # Helper for text formatting
         """Format history as plain text"""
         lines = []  # List for lines of string
@@ -109,65 +206,133 @@ class ConversationMemory:  # Define a class for managing chat history
             messages.append(f"Assistant: {interaction['assistant']}")  # Standard Role name
         return "\n".join(messages)  # Combine
     
-    def _trim_history(self):  # Internal helper to cut off old memories
-        """Trim history to stay within limits"""
-        # Trim by number of turns first (keep only the last X chats)
-        if len(self.history) > self.max_turns:
-            self.history = self.history[-self.max_turns:]
-            logger.debug(f"Trimmed history to {self.max_turns} turns")
-        
-        # Trim by approximate token count (AI models have a memory limit)
-        total_chars = sum(
-            len(h['user']) + len(h['assistant'])
-            for h in self.history
-        )
-        approx_tokens = total_chars // 4  # Rough math: 4 characters per token
+    def _trim_history(self, fold: bool = True):  # Internal helper to cut off old memories (caller holds the lock)
+        """Trim history to stay within limits (trimmed turns go to the summarizer if there is one)"""
+        removed_turns = []
         
-        while approx_tokens > self.max_tokens and len(self.history) > 1:  # While memory is too full
-            # Remove oldest message until size is okay
+        # Trim by number of turns first (keep only the last X chats), then by token count (AI models have a memory limit)
+        while len(self.history) > self.max_turns or (
+            len(self.history) > 1 and (self.history_tokens > self.max_tokens or self._over_prompt_budget())
+        ):
             removed = self.history.pop(0)  # Remove very first item
-            total_chars -= len(removed['user']) + len(removed['assistant'])  # Subtract its size
-            approx_tokens = total_chars // 4  # Recalculate
-            logger.debug(f"Trimmed oldest interaction (approx tokens: {approx_tokens})")
+            removed_turns.append(removed)
+            self.history_chars -= len(removed['user']) + len(removed['assistant'])  # Subtract its size
+            self.history_tokens -= removed["tokens"]
+        if removed_turns:
+            logger.debug(f"Trimmed {len(removed_turns)} old interactions (tokens now: {self.history_tokens})")
+        
+        if fold and removed_turns and self.summarizer:  # Fold them into the summary in the background
+            self.pending_fold.extend(removed_turns)
+            del self.pending_fold[:-Config.MEMORY_SUMMARY_MAX_PENDING]  # Bound the backlog if the LLM keeps failing
+            self.summarizer.schedule(self)
+        
+        self._set_size(self.history_chars + len(self.summary))
+    
+    def _over_prompt_budget(self) -> bool:  # Internal helper (caller holds the lock)
+        """Summary mode: would the summary plus every kept turn overflow the prompt's history budget?"""
+        if not self.summarizer:  # Without a summary, turns the prompt skips are simply not shown
+            return False
+        overhead = self._turn_overhead("chat") + 1  # Same cost the prompt's budget fitting uses
+        return self.summary_tokens + self.history_tokens + overhead * len(self.history) > self.prompt_budget
+    
+    def _set_summary(self, summary: str):  # Internal helper (caller holds the lock)
+        self.summary = summary
+        self.summary_tokens = self.token_counter.count(self._format_summary(summary, "chat")) if summary else 0
+    
+    def _set_size(self, size_chars: int):  # Internal helper (caller holds the lock)
+        """Record the stored size, drop cached renders and report the change to the owning store"""
+        self._renders = {}  # Every change goes through here
+        delta = size_chars - self.size_chars
+        self.size_chars = size_chars
+        if delta and self.on_resize:
+            self.on_resize(delta)
     
     def clear_history(self):  # Function to forget everything immediately
         """Clear all conversation history"""
-        self.history = []  # Reset list to empty
+        with self._lock:
+            self.history = []  # Reset list to empty
+            self.history_chars = 0
+            self.history_tokens = 0
+            self._set_summary("")
+            self.pending_fold = []
+            self.fold_generation += 1  # A summary being written right now belongs to the old chat
+            self._set_size(0)
+            if self.backend:
+                self.backend.clear(self.current_session_id)
         logger.info("Conversation history cleared")
     
+    def restore(self, history: List[Dict], summary: str = ""):  # Put back history loaded from storage
+        """Replace the in-memory history (e.g. with turns loaded from the database)"""
+        for interaction in history:
+            self._count_tokens(interaction)  # Tokenize outside the lock
+        with self._lock:
+            self.history = list(history)
+            self.history_chars = sum(len(h['user']) + len(h['assistant']) for h in self.history)
+            self.history_tokens = sum(h["tokens"] for h in self.history)
+            self._set_summary(summary)
+            self._trim_history(fold=False)  # Already-stored turns are not new evictions
+    
+    def take_pending_fold(self):  # Called by the summarizer
+        """Snapshot the turns waiting to be summarized, the current summary and the clear-generation"""
+        with self._lock:
+            return list(self.pending_fold), self.summary, self.fold_generation
+    
+    def has_pending_fold(self) -> bool:
+        """Check whether trimmed turns are still waiting for the summarizer"""
+        with self._lock:
+            return bool(self.pending_fold)
+    
+    def apply_summary(self, summary: str, folded: List[Dict], generation: int) -> bool:  # Called by the summarizer
+        """Install a new running summary that absorbed the folded turns (as returned by take_pending_fold)"""
+        with self._lock:
+            if generation != self.fold_generation:  # History was cleared meanwhile - discard
+                return False
+            self._set_summary(summary)
+            folded_ids = {id(turn) for turn in folded}  # By identity: the backlog bound may have dropped some meanwhile
+            self.pending_fold = [turn for turn in self.pending_fold if id(turn) not in folded_ids]
+            self._trim_history()  # A longer summary leaves less room for turns - fold the oldest too
+            if self.backend:
+                self.backend.save_summary(self.current_session_id, summary)
+            return True
+    
     def get_last_question(self) -> Optional[str]:  # Helper to get only the latest question
         """Get the last user question"""
-        if not self.history:  # If no history
-            return None
-        return self.history[-1]["user"]  # Return the user field of the last item
+        with self._lock:
+            if not self.history:  # If no history
+                return None
+            return self.history[-1]["user"]  # Return the user field of the last item
     
     def get_last_response(self) -> Optional[str]:  # Helper to get only the latest reply
         """Get the last assistant response"""
-        if not self.history:  # If no history
-            return None
-        return self.history[-1]["assistant"]  # Return the assistant field of the last item
+        with self._lock:
+            if not self.history:  # If no history
+                return None
+            return self.history[-1]["assistant"]  # Return the assistant field of the last item
     
     def get_summary(self) -> Dict:  # Function to get stats about the current chat
         """
         Get a summary of the conversation
         """
-        if not self.history:  # If empty
+        history = self.get_history()  # Consistent copy (another request may be adding a turn)
+        if not history:  # If empty
             return {
                 "num_turns": 0,
                 "session_id": self.current_session_id
             }
         
         # Calculate total characters spent
-        total_user_chars = sum(len(h['user']) for h in self.history)
-        total_assistant_chars = sum(len(h['assistant']) for h in self.history)
+        total_user_chars = sum(len(h['user']) for h in history)
+        total_assistant_chars = sum(len(h['assistant']) for h in history)
         
         return {  # Return summary report
-            "num_turns": len(self.history),  # Total messages exchanged
+            "num_turns": len(history),  # Total messages exchanged
             "session_id": self.current_session_id,  # Current chat ID
             "total_user_chars": total_user_chars,  # Total typing from user
             "total_assistant_chars": total_assistant_chars,  # Total typing from AI
-            "first_question": self.history[0]["user"][:50] + "..." if self.history else None,  # Start of first question
-            "last_question": self.get_last_question()  # Exact last question
+            "total_tokens": sum(h["tokens"] for h in history),  # What the history costs in the prompt
+            "first_question": history[0]["user"][:50] + "...",  # Start of first question
+            "last_question": history[-1]["user"],  # Exact last question
+            "earlier_summary": self.summary or None  # Running summary of turns no longer kept word for word
         }
     
     def start_new_session(self):  # Reset everything for a fresh start
@@ -182,6 +347,132 @@ class ConversationMemory:  # Define a class for managing chat history
         return datetime.now().strftime("%Y%m%d_%H%M%S")  # e.g. 20231027_153005
 
 
+class SessionMemoryStore:  # Define the holder of every student's own memory
+    """ConversationMemory per session, with LRU eviction, idle expiry and a global size cap"""
+    
+    def __init__(  # Initialize store limits
+        self,
+        max_sessions: int = None,
+        idle_ttl_seconds: int = None,
+        max_total_chars: int = None,
+        backend=None,
+        summarizer=None
+    ):
+        """
+        Initialize Session Memory Store
+        With a backend (e.g. SQLiteMemoryBackend) this is a hot cache in front of durable storage
+        With a summarizer (MemorySummarizer) every conversation keeps a running summary of trimmed turns
+        """
+        self.max_sessions = max_sessions or Config.MEMORY_MAX_SESSIONS  # Most conversations kept at once
+        self.idle_ttl_seconds = idle_ttl_seconds or Config.MEMORY_SESSION_TTL_SECONDS  # Forget after this long idle
+        self.max_total_chars = max_total_chars or Config.MEMORY_MAX_TOTAL_CHARS  # Cap on all histories together
+        
+        self.sessions: "OrderedDict[str, ConversationMemory]" = OrderedDict()  # session -> memory (least recent first)
+        self.last_used: Dict[str, float] = {}  # session -> last access time
+        self.total_chars = 0  # Characters stored across all sessions
+        self.backend = backend  # Durable storage (None = conversations live only in this process)
+        self.summarizer = summarizer  # Shared background summary writer (None = trimmed turns are dropped)
+        self._lock = threading.Lock()  # Protect the map (each memory has its own lock for its history)
+        
+        self.evicted_idle = 0  # Sessions forgotten after being idle too long
+        self.evicted_lru = 0  # Sessions forgotten to stay under the caps
+    
+    def get(self, session_id: str) -> ConversationMemory:  # Get (or create) a student's memory
+        """Get the memory for a session, creating it if needed"""
+        with self._lock:
+            self._expire_idle()
+            memory = self.sessions.get(session_id)
+            created = memory is None
+            if created:
+                memory = ConversationMemory(session_id=session_id, backend=self.backend, summarizer=self.summarizer)
+                memory.on_resize = lambda delta, m=memory: self._on_resize(m, delta)
+                self.sessions[session_id] = memory
+            self.sessions.move_to_end(session_id)  # Most recently used goes last
+            self.last_used[session_id] = time.time()
+            self._enforce_caps(keep=session_id)
+        
+        # Load outside the store lock (restoring takes the memory's own lock)
+        if self.backend and (created or self.backend.is_stale(session_id)):
+            # Returning student, a restart, or another worker answered them since
+            memory.restore(self.backend.load(session_id, memory.max_turns), self.backend.load_summary(session_id))
+        return memory
+    
+    def peek(self, session_id: str) -> Optional[ConversationMemory]:  # Look without creating
+        """Get the memory for a session if it exists"""
+        with self._lock:
+            return self.sessions.get(session_id)
+    
+    def find(self, session_id: str) -> Optional[ConversationMemory]:  # Look without creating an empty session
+        """Get the memory for a session if it has one (in the hot cache or in durable storage)"""
+        memory = self.peek(session_id)
+        if self.backend and (memory is not None or self.backend.exists(session_id)):
+            return self.get(session_id)  # Loads it after a restart or idle eviction (or if another worker changed it)
+        return memory
+    
+    def clear(self, session_id: str):  # Forget one student's conversation
+        """Clear one session's history (in the hot cache and in durable storage)"""
+        memory = self.peek(session_id)
+        if memory:
+            memory.clear_history()
+        elif self.backend:  # Only stored (after a restart or idle eviction) - the next get() would restore it
+            self.backend.clear(session_id)
+    
+    def _on_resize(self, memory: ConversationMemory, delta: int):  # Called by a memory when its size changes
+        """Keep the global size total up to date"""
+        with self._lock:
+            if self.sessions.get(memory.current_session_id) is memory:  # Ignore memories already evicted
+                self.total_chars += delta
+    
+    def _expire_idle(self):  # Internal helper (caller holds the lock)
+        """Drop sessions idle for longer than the TTL (oldest are at the front)"""
+        cutoff = time.time() - self.idle_ttl_seconds
+        while self.sessions:
+            oldest = next(iter(self.sessions))
+            if self.last_used[oldest] > cutoff:
+                break
+            self._evict(oldest)
+            self.evicted_idle += 1
+    
+    def _enforce_caps(self, keep: str):  # Internal helper (caller holds the lock)
+        """Evict least recently used sessions while over the session or size cap"""
+        while len(self.sessions) > 1 and (
+            len(self.sessions) > self.max_sessions or self.total_chars > self.max_total_chars
+        ):
+            oldest = next(iter(self.sessions))
+            if oldest == keep:
+                break
+            self._evict(oldest)
+            self.evicted_lru += 1
+    
+    def _evict(self, session_id: str):  # Internal helper (caller holds the lock)
+        """Remove one session from the store"""
+        memory = self.sessions.pop(session_id)
+        self.last_used.pop(session_id, None)
+        self.total_chars -= memory.size_chars
+    
+    def close(self):  # Server shutdown
+        """Stop the summarizer and flush durable storage"""
+        if self.summarizer:
+            self.summarizer.shutdown()
+        if self.backend:
+            self.backend.close()
+    
+    def get_stats(self) -> Dict:  # Report for /metrics
+        """Get store statistics"""
+        with self._lock:
+            stats = {
+                "sessions": len(self.sessions),
+                "total_chars": self.total_chars,
+                "evicted_idle": self.evicted_idle,
+                "evicted_lru": self.evicted_lru
+            }
+        if self.backend:
+            stats["storage"] = self.backend.get_stats()
+        if self.summarizer:
+            stats["summarizer"] = self.summarizer.get_stats()
+        return stats
+
+
 if __name__ == "__main__":  # Code for manual testing
     # Example usage
     memory = ConversationMemory(max_tokens=500, max_turns=5)  # Init memory
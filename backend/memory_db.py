@@ -0,0 +1,282 @@
+"""
+Memory Database for EchoLearn AI - This file saves conversations to disk so they survive restarts
+SQLite (WAL mode) with a write-behind queue - Requests never wait for the disk, and several workers can share it
+"""
+
+from datetime import datetime, timedelta  # Import datetime for the retention cutoff
+from pathlib import Path  # Import Path for the database location
+from typing import Dict, List, Optional, Tuple  # Import types for organization
+import json  # Import json for storing interaction metadata
+import queue  # Import queue for the write-behind buffer
+import sqlite3  # Import sqlite3 for the database itself
+import threading  # Import threading for the background writer
+import logging  # Import logging for tracking database activity
+import time  # Import time for batching and flush timeouts
+
+from config import Config  # Import project settings
+from metrics import LatencyTracker  # Import latency tracking for batch write times
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for the memory database
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    user TEXT NOT NULL,
+    assistant TEXT NOT NULL,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_turns_session ON turns (session_id, id);
+CREATE TABLE IF NOT EXISTS session_summaries (
+    session_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS session_versions (
+    session_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+
+class SQLiteMemoryBackend:  # Define the durable store behind the in-memory conversations
+    """Persist conversation turns to SQLite through a batched write-behind queue"""
+
+    def __init__(  # Initialize the database
+        self,
+        db_path: Optional[Path] = None,
+        flush_interval: float = None,
+        batch_size: int = 200,
+        keep_turns: int = None
+    ):
+        """
+        Initialize SQLite Memory Backend
+        """
+        self.db_path = Path(db_path or Config.MEMORY_DB_PATH)  # Where the database file lives
+        self.flush_interval = flush_interval or Config.MEMORY_FLUSH_INTERVAL_S  # Longest a write waits for company
+        self.batch_size = batch_size  # Most writes per transaction
+        self.keep_turns = keep_turns or Config.MEMORY_DB_KEEP_TURNS  # Turns kept on disk per session
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()  # One reader connection per thread (sqlite3 connections are not shared)
+        self._setup()
+
+        self.queue: "queue.Queue" = queue.Queue()  # Writes waiting for the background writer
+        self.pending: Dict[str, int] = {}  # session -> writes not yet on disk
+        self.known_versions: Dict[str, int] = {}  # session -> version this process last wrote or loaded
+        self._lock = threading.Lock()  # Protect pending/known_versions
+
+        self.written = 0  # Operations written to disk
+        self.batches = 0  # Transactions committed
+        self.failures = 0  # Batches that failed to write
+        self.batch_latency = LatencyTracker()  # How long each transaction took
+
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, name="memory-writer", daemon=True)
+        self._writer.start()
+
+        logger.info(f"SQLite memory backend ready at {self.db_path}")
+
+    def _connect(self) -> sqlite3.Connection:  # Open a connection with the right settings
+        """Open a WAL-mode connection (readers never block the writer)"""
+        conn = sqlite3.connect(str(self.db_path), timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")  # Readers and one writer at the same time, across processes
+        conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL and much faster than FULL
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:  # This thread's reading connection
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def _setup(self):  # Create tables and drop very old turns
+        """Create the schema and apply the retention period"""
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+            cutoff = (datetime.now() - timedelta(days=Config.MEMORY_DB_RETENTION_DAYS)).isoformat()
+            removed = conn.execute("DELETE FROM turns WHERE timestamp < ?", (cutoff,)).rowcount
+            conn.commit()
+            if removed:
+                logger.info(f"Removed {removed} conversation turns older than {Config.MEMORY_DB_RETENTION_DAYS} days")
+        finally:
+            conn.close()
+
+    def append(self, session_id: str, interaction: Dict):  # Queue one new turn
+        """Queue an interaction to be written (returns immediately)"""
+        self._enqueue(("append", session_id, interaction))
+
+    def clear(self, session_id: str):  # Queue deleting a conversation
+        """Queue clearing a session's stored history"""
+        self._enqueue(("clear", session_id, None))
+
+    def save_summary(self, session_id: str, summary: str):  # Queue saving the running summary
+        """Queue replacing a session's running summary"""
+        self._enqueue(("summary", session_id, summary))
+
+    def _enqueue(self, op: Tuple):
+        with self._lock:
+            self.pending[op[1]] = self.pending.get(op[1], 0) + 1
+        self.queue.put(op)
+
+    def has_pending(self, session_id: str) -> bool:
+        """Check whether this process still has unwritten changes for a session"""
+        with self._lock:
+            return self.pending.get(session_id, 0) > 0
+
+    def load(self, session_id: str, limit: int) -> List[Dict]:  # Read a conversation back
+        """Load the most recent turns of a session (oldest first)"""
+        if self.has_pending(session_id):  # Rare: evicted from the hot cache while writes were still queued
+            self.flush()
+
+        version = self.version(session_id)  # Read first: a write in between only causes one extra reload
+        rows = self._reader().execute(
+            "SELECT timestamp, user, assistant, metadata FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+            (session_id, limit)
+        ).fetchall()
+        with self._lock:
+            self.known_versions[session_id] = version
+
+        return [
+            {"timestamp": ts, "user": user, "assistant": assistant, "metadata": json.loads(meta) if meta else {}}
+            for ts, user, assistant, meta in reversed(rows)
+        ]
+
+    def load_summary(self, session_id: str) -> str:  # Read the running summary back
+        """Load a session's running summary ("" if it has none)"""
+        row = self._reader().execute(
+            "SELECT summary FROM session_summaries WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else ""
+
+    def exists(self, session_id: str) -> bool:  # Is anything stored for this conversation?
+        """Check whether a session has stored turns or a running summary"""
+        if self.has_pending(session_id):
+            self.flush()
+        conn = self._reader()
+        return bool(
+            conn.execute("SELECT 1 FROM turns WHERE session_id = ? LIMIT 1", (session_id,)).fetchone()
+            or conn.execute("SELECT 1 FROM session_summaries WHERE session_id = ?", (session_id,)).fetchone()
+        )
+
+    def version(self, session_id: str) -> int:  # How many changes the session has had (any worker)
+        """Current change counter of a session in the database"""
+        row = self._reader().execute(
+            "SELECT version FROM session_versions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def is_stale(self, session_id: str) -> bool:  # Did another worker change this conversation?
+        """True if the database has changes this process has not seen"""
+        if self.has_pending(session_id):  # Our own writes are newer than the database
+            return False
+        with self._lock:
+            known = self.known_versions.get(session_id, 0)
+        return self.version(session_id) != known
+
+    def flush(self, timeout: float = 5.0):  # Wait for queued writes
+        """Block until the queue has been written (or timeout)"""
+        deadline = time.time() + timeout
+        while self.queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.005)
+
+    def close(self):  # Finish writing and stop (server shutdown)
+        """Flush remaining writes and stop the writer thread"""
+        self.flush()
+        self._stop.set()
+        self._writer.join(timeout=5)
+        logger.info("SQLite memory backend closed")
+
+    def _write_loop(self):  # Background thread: write batches
+        """Collect queued operations into batches and write each batch in one transaction"""
+        conn = self._connect()
+        while not (self._stop.is_set() and self.queue.empty()):
+            try:
+                batch = [self.queue.get(timeout=0.2)]
+            except queue.Empty:
+                continue
+
+            deadline = time.time() + self.flush_interval  # Give other writes a moment to join this transaction
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.time())))
+                except queue.Empty:
+                    break
+
+            try:
+                self._write_batch(conn, batch)
+            except Exception as e:  # Keep serving from memory even if the disk is unhappy
+                self.failures += 1
+                logger.error(f"Failed to write {len(batch)} memory operations: {e}")
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+            finally:
+                with self._lock:
+                    for _, session_id, _ in batch:
+                        self.pending[session_id] -= 1
+                        if not self.pending[session_id]:
+                            del self.pending[session_id]
+                for _ in batch:
+                    self.queue.task_done()
+        conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Tuple]):  # One transaction
+        """Apply a batch of appends/clears, bump session versions and prune old turns"""
+        start = time.time()
+        touched = {}
+        for kind, session_id, payload in batch:
+            if kind == "append":
+                interaction = payload
+                conn.execute(
+                    "INSERT INTO turns (session_id, timestamp, user, assistant, metadata) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        session_id, interaction["timestamp"], interaction["user"], interaction["assistant"],
+                        json.dumps(interaction.get("metadata") or {})
+                    )
+                )
+            elif kind == "summary":
+                conn.execute(
+                    "INSERT OR REPLACE INTO session_summaries (session_id, summary) VALUES (?, ?)",
+                    (session_id, payload)
+                )
+            else:  # clear
+                conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+                conn.execute("DELETE FROM session_summaries WHERE session_id = ?", (session_id,))
+            touched[session_id] = touched.get(session_id, 0) + 1
+
+        for session_id, changes in touched.items():
+            conn.execute(
+                "INSERT INTO session_versions (session_id, version) VALUES (?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET version = version + excluded.version",
+                (session_id, changes)
+            )
+            conn.execute(  # Keep only the newest turns on disk
+                "DELETE FROM turns WHERE session_id = ? AND id NOT IN "
+                "(SELECT id FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?)",
+                (session_id, session_id, self.keep_turns)
+            )
+        conn.commit()
+
+        with self._lock:  # Our own writes are not "someone else's change"
+            for session_id, changes in touched.items():
+                self.known_versions[session_id] = self.known_versions.get(session_id, 0) + changes
+
+        self.written += len(batch)
+        self.batches += 1
+        self.batch_latency.record(time.time() - start)
+
+    def get_stats(self) -> Dict:  # Report for /metrics
+        """Get write-behind statistics"""
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "avg_batch_size": round(self.written / self.batches, 2) if self.batches else 0.0,
+            "failures": self.failures,
+            "batch_latency": self.batch_latency.get_stats()
+        }
@@ -0,0 +1,94 @@
+"""
+Memory Summarizer for EchoLearn AI - This file squeezes old conversation turns into a short summary
+Runs in background threads with a small LLM call - Long sessions keep their context without growing prompts
+"""
+
+from concurrent.futures import ThreadPoolExecutor  # Import a thread pool so summaries never block a request
+from typing import Callable, Dict, List  # Import types for organization
+import threading  # Import threading for the scheduled-set lock
+import logging  # Import logging for tracking summaries
+import time  # Import time for measuring summary latency
+
+from config import Config  # Import project settings
+from metrics import LatencyTracker  # Import latency tracking for summary calls
+from prompt import TutorPrompts  # Import the summary instructions
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for the summarizer
+
+
+class MemorySummarizer:  # Define the background summary writer
+    """Fold turns evicted from a ConversationMemory into its running summary, off the request path"""
+
+    def __init__(self, complete: Callable[[List[Dict]], str], max_workers: int = None):  # Initialize the summarizer
+        """
+        Initialize Memory Summarizer
+        complete(messages) -> text is the LLM call to use (e.g. LLMRouter.complete with a small max_tokens)
+        """
+        self.complete = complete
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or Config.MEMORY_SUMMARY_WORKERS, thread_name_prefix="memory-summary"
+        )
+        self.scheduled = set()  # ids of memories with a fold queued or running (one at a time per memory)
+        self._lock = threading.Lock()
+
+        self.folds = 0  # Summaries written
+        self.turns_folded = 0  # Turns absorbed into summaries
+        self.failures = 0  # LLM calls that failed (turns stay queued for the next try)
+        self.latency = LatencyTracker()
+
+    def schedule(self, memory) -> None:  # Ask for the memory's evicted turns to be folded
+        """Queue a fold for this memory unless one is already queued or running"""
+        with self._lock:
+            if id(memory) in self.scheduled:  # The running fold will pick up new turns when it finishes
+                return
+            self.scheduled.add(id(memory))
+        self.executor.submit(self._fold, memory)
+
+    def _fold(self, memory):  # Background thread: one LLM call per fold
+        """Summarize the memory's pending turns together with its current summary"""
+        succeeded = False
+        try:
+            turns, summary, generation = memory.take_pending_fold()
+            if not turns:
+                return
+
+            turns_text = "\n".join(f"Student: {t['user']}\nTutor: {t['assistant']}" for t in turns)
+            max_words = max(30, int(Config.MEMORY_SUMMARY_MAX_TOKENS * 0.75))  # Roughly 4 words per 3 tokens
+            messages = [
+                {"role": "system", "content": "You write short, factual summaries of tutoring conversations."},
+                {"role": "user", "content": TutorPrompts.format_memory_summary_prompt(summary, turns_text, max_words)}
+            ]
+
+            start = time.time()
+            try:
+                new_summary = self.complete(messages).strip()
+            except Exception as e:  # Keep the turns queued; the next eviction tries again
+                self.failures += 1
+                logger.warning(f"Memory summary failed: {e}")
+                return
+            self.latency.record(time.time() - start)
+
+            if new_summary and memory.apply_summary(new_summary, turns, generation):
+                self.folds += 1
+                self.turns_folded += len(turns)
+                succeeded = True
+        finally:
+            with self._lock:
+                self.scheduled.discard(id(memory))
+            if succeeded and memory.has_pending_fold():  # More turns were evicted while we were summarizing
+                self.schedule(memory)  # (after a failure, wait for the next eviction instead of looping)
+
+    def shutdown(self):
+        """Stop accepting work (queued folds are dropped)"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict:  # Report for /metrics
+        """Get summarizer statistics"""
+        return {
+            "folds": self.folds,
+            "turns_folded": self.turns_folded,
+            "failures": self.failures,
+            "queued": len(self.scheduled),
+            "latency": self.latency.get_stats()
+        }
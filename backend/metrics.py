@@ -0,0 +1,117 @@
+"""
+Metrics for EchoLearn AI - This file collects performance numbers from every part of the tutor
+Keeps counters, latency percentiles and component stats in one place - Served by the /metrics endpoint
+"""
+
+from collections import deque  # Import deque for a fixed-size window of recent measurements
+from typing import Callable, Dict, Optional  # Import types for organization
+import threading  # Import threading so many requests can record numbers at once
+import logging  # Import logging for reporting broken stats providers
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for metrics
+
+
+class LatencyTracker:  # Define a class that remembers recent timings
+    """Rolling window of latencies with percentile reporting"""
+
+    def __init__(self, window: int = 500):  # Initialize the tracker
+        """
+        Initialize Latency Tracker
+        """
+        self.samples = deque(maxlen=window)  # Only the most recent measurements are kept
+        self.count = 0  # Total number of measurements ever recorded
+        self._lock = threading.Lock()  # Protect the window from concurrent updates
+
+    def record(self, seconds: float):  # Save one measurement
+        """Record one latency measurement in seconds"""
+        with self._lock:
+            self.samples.append(seconds)
+            self.count += 1
+
+    def percentile(self, p: float) -> Optional[float]:  # Get e.g. the p95 latency
+        """
+        Get a percentile (0-100) of the recent latencies, or None if nothing was recorded
+        """
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))  # Nearest-rank position
+        return ordered[index]
+
+    def get_stats(self) -> Dict:  # Summary report of the recent latencies
+        """Get count, mean and p50/p95/p99 of the recent latencies"""
+        with self._lock:
+            ordered = sorted(self.samples)
+            count = self.count
+        if not ordered:
+            return {"count": count}
+
+        def pick(p):  # Nearest-rank percentile on the sorted copy
+            return round(ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))], 4)
+
+        return {
+            "count": count,
+            "mean": round(sum(ordered) / len(ordered), 4),
+            "p50": pick(50),
+            "p95": pick(95),
+            "p99": pick(99)
+        }
+
+
+class MetricsRegistry:  # One place where all components report their numbers
+    """Registry of counters, latency trackers and component stats providers"""
+
+    def __init__(self):  # Initialize the registry
+        """
+        Initialize Metrics Registry
+        """
+        self.counters: Dict[str, float] = {}  # Named counters (e.g. "coalesced_requests")
+        self.latencies: Dict[str, LatencyTracker] = {}  # Named latency trackers
+        self.providers: Dict[str, Callable[[], Dict]] = {}  # Functions that return a component's stats
+        self._lock = threading.Lock()  # Protect the counters from concurrent updates
+
+    def increment(self, name: str, amount: float = 1):  # Add to a counter
+        """Increase a named counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float):  # Record a timing
+        """Record a latency measurement under a name"""
+        with self._lock:
+            tracker = self.latencies.setdefault(name, LatencyTracker())
+        tracker.record(seconds)
+
+    def latency(self, name: str) -> LatencyTracker:  # Get (or create) a named tracker
+        """Get the latency tracker for a name"""
+        with self._lock:
+            return self.latencies.setdefault(name, LatencyTracker())
+
+    def register(self, name: str, provider: Callable[[], Dict]):  # Plug in a component's stats
+        """Register a function that returns a component's stats dictionary"""
+        self.providers[name] = provider
+
+    def snapshot(self) -> Dict:  # Collect everything into one report
+        """Get a snapshot of all counters, latencies and component stats"""
+        with self._lock:
+            counters = dict(self.counters)
+            latencies = dict(self.latencies)
+
+        components = {}
+        for name, provider in list(self.providers.items()):
+            try:
+                components[name] = provider()
+            except Exception as e:  # A broken provider must not break the whole report
+                logger.error(f"Metrics provider '{name}' failed: {e}")
+                components[name] = {"error": str(e)}
+
+        return {
+            "counters": counters,
+            "latencies": {name: tracker.get_stats() for name, tracker in latencies.items()},
+            "components": components
+        }
+
+
+# Shared registry used by the whole backend
+metrics = MetricsRegistry()
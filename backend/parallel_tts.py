@@ -0,0 +1,142 @@
+"""
+Parallel TTS for EchoLearn AI - This file speaks a long answer as several pieces at once
+Splits the text into sentence groups, synthesizes them side by side and joins the MP3 frames in order (no re-encoding)
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor  # Import the worker pools
+from pathlib import Path  # Import Path for the joined output file
+from typing import Dict, List  # Import types for organization
+import multiprocessing  # Import multiprocessing for the spawn context
+import logging  # Import logging for tracking parallel synthesis
+import time  # Import time for measuring speed
+
+from config import Config  # Import project settings
+from sentence_segmenter import SentenceSegmenter  # Import the sentence splitter used for the LLM stream
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for parallel synthesis
+
+# Layer III bitrates (kbps) by bitrate index, and sample rates by sample-rate index
+MPEG1_BITRATES = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+MPEG2_BITRATES = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}  # By version bits
+
+_worker_tts = None  # The Coqui engine inside a worker process (set by _init_coqui_worker)
+
+
+def group_sentences(text: str, max_chars: int = None) -> List[str]:  # Pieces worth one provider call each
+    """Split text into sentences, then merge neighbours into groups of up to max_chars"""
+    max_chars = max_chars or Config.TTS_PARALLEL_GROUP_CHARS
+    groups: List[str] = []
+    for sentence in SentenceSegmenter.split(text):
+        if groups and len(groups[-1]) + len(sentence) + 1 <= max_chars:
+            groups[-1] += " " + sentence
+        else:
+            groups.append(sentence)
+    return groups
+
+
+def _frame_length(data: bytes, offset: int) -> int:  # Length of the MP3 frame starting at offset (0 = not a frame)
+    if offset + 4 > len(data) or data[offset] != 0xFF or (data[offset + 1] & 0xE0) != 0xE0:
+        return 0
+    version = (data[offset + 1] >> 3) & 0x03  # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+    layer = (data[offset + 1] >> 1) & 0x03  # 1 = Layer III
+    bitrate_index = data[offset + 2] >> 4
+    rate_index = (data[offset + 2] >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return 0
+    bitrate = (MPEG1_BITRATES if version == 3 else MPEG2_BITRATES)[bitrate_index] * 1000
+    padding = (data[offset + 2] >> 1) & 0x01
+    return (144 if version == 3 else 72) * bitrate // SAMPLE_RATES[version][rate_index] + padding
+
+
+def strip_mp3_metadata(data: bytes) -> bytes:  # Keep only the audio frames
+    """
+    Remove ID3v2/ID3v1 tags and the Xing/Info/VBRI header frame, which would otherwise sit in
+    the middle of the joined file (and make players report the first piece's duration)
+    """
+    start, end = 0, len(data)
+    if data[:3] == b"ID3" and len(data) >= 10:  # ID3v2 header: size is a 28-bit "syncsafe" integer
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        start = 10 + size + (10 if data[5] & 0x10 else 0)  # Optional footer
+    if end - start >= 128 and data[end - 128:end - 125] == b"TAG":  # ID3v1 tag at the very end
+        end -= 128
+
+    length = _frame_length(data, start)
+    if length and any(marker in data[start:start + min(length, 64)] for marker in (b"Xing", b"Info", b"VBRI")):
+        start += length  # The first frame is a header frame, not audio
+    return data[start:end]
+
+
+def concat_mp3(parts: List[bytes]) -> bytes:  # MP3 frames are independent, so joining them needs no re-encoding
+    """Join MP3 files in order by concatenating their audio frames"""
+    return b"".join(strip_mp3_metadata(part) for part in parts)
+
+
+def _init_coqui_worker():  # Runs once per process
+    """Load the Coqui model in this worker before it accepts any work"""
+    global _worker_tts
+    from text_to_speech import TextToSpeech  # Imported here: only worker processes load a second model
+    _worker_tts = TextToSpeech(provider="coqui", use_cache=False, parallel=False)
+
+
+def _synthesize_coqui_part(text: str) -> bytes:  # One sentence group, in a worker process
+    return _worker_tts._synthesize_bytes(text)
+
+
+class ParallelSynthesizer:  # Define the sentence-group fan-out for one TextToSpeech engine
+    """Synthesize sentence groups concurrently (threads for remote providers, processes for Coqui)"""
+
+    def __init__(self, tts, workers: int = None):  # Initialize the worker pool
+        """
+        Initialize Parallel Synthesizer
+        """
+        self.tts = tts  # The engine whose provider does the work
+        self.workers = workers or Config.TTS_PARALLEL_WORKERS
+        self.executor: Executor
+        if tts.provider == "coqui":  # CPU-bound model - threads would share one core (the GIL)
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_coqui_worker
+            )
+        else:  # Remote providers spend their time waiting on the network
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tts-parallel")
+        self.answers = 0
+        self.parts = 0
+        self.busy_seconds = 0.0
+
+    def synthesize(self, text: str, output_path: Path) -> bool:  # Write text to output_path
+        """Synthesize text as parallel sentence groups; returns False if it is too short to split"""
+        groups = group_sentences(text)
+        if len(groups) < 2:
+            return False
+
+        start = time.time()
+        if self.tts.provider == "coqui":
+            futures = [self.executor.submit(_synthesize_coqui_part, group) for group in groups]
+        else:
+            futures = [self.executor.submit(self.tts._synthesize_bytes, group) for group in groups]
+        parts = [future.result() for future in futures]  # In text order, whichever finished first
+        Path(output_path).write_bytes(concat_mp3(parts))
+
+        elapsed = time.time() - start
+        self.answers += 1
+        self.parts += len(groups)
+        self.busy_seconds += elapsed
+        logger.info(f"Synthesized {len(groups)} sentence groups in parallel in {elapsed:.2f}s")
+        return True
+
+    def shutdown(self):
+        """Stop the worker threads/processes"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict:  # Report for /metrics
+        """Get parallel synthesis statistics"""
+        return {
+            "workers": self.workers,
+            "pool": "processes" if self.tts.provider == "coqui" else "threads",
+            "answers": self.answers,
+            "avg_parts": round(self.parts / self.answers, 2) if self.answers else 0.0,
+            "avg_time": round(self.busy_seconds / self.answers, 2) if self.answers else 0.0
+        }
@@ -0,0 +1,74 @@
+"""
+Phrase Bank for EchoLearn AI - This file keeps the tutor's fixed replies ready to play
+Pre-synthesizes constant phrases (warnings, apologies, greetings) and short "thinking" fillers - Served without a TTS call
+"""
+
+from pathlib import Path  # Import Path to check that the audio still exists
+from typing import Dict, List, Optional  # Import types for organization
+import random  # Import random for picking a filler
+import threading  # Import threading to protect the path table
+import logging  # Import logging for tracking pre-rendering
+
+from config import Config  # Import project settings
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for the phrase bank
+
+
+class PhraseBank:  # Define the store of ready-made audio
+    """Audio for fixed phrases and fillers, synthesized once per provider and voice"""
+
+    def __init__(self, tts, phrases: Dict[str, str] = None, fillers: List[str] = None):  # Initialize the bank
+        """
+        Initialize Phrase Bank
+        """
+        self.tts = tts  # The voice engine (its provider and voice are part of every file name)
+        phrases = Config.FIXED_PHRASES if phrases is None else phrases
+        fillers = Config.TTS_FILLER_PHRASES if fillers is None else fillers
+        self.phrases: Dict[str, str] = dict(phrases)  # name -> text
+        self.filler_names = [f"filler_{i}" for i in range(len(fillers))]
+        self.phrases.update(zip(self.filler_names, fillers))
+
+        self.paths: Dict[str, str] = {}  # name -> audio file
+        self._lock = threading.Lock()
+        self.served = 0  # Clips handed out without synthesizing
+
+    def prerender(self):  # Called once at startup (warmup component "phrases")
+        """Synthesize every phrase (already-cached files from an earlier run are reused)"""
+        for name in self.phrases:
+            self.get(name)
+        logger.info(f"Pre-rendered {len(self.paths)}/{len(self.phrases)} phrases")
+
+    def get(self, name: str) -> Optional[str]:  # Audio file for a phrase
+        """Return the phrase's audio path, synthesizing it the first time (None if unknown or failed)"""
+        text = self.phrases.get(name)
+        if text is None:
+            return None
+
+        with self._lock:
+            path = self.paths.get(name)
+        if path and Path(path).exists():
+            self.served += 1
+            return path
+
+        try:  # Same settings as answers, so an answer that says exactly this phrase is a cache hit too
+            path = self.tts.synthesize(text, add_pauses=True)
+        except Exception as e:
+            logger.error(f"Could not synthesize phrase '{name}': {e}")
+            return None
+        if self.tts.cache:
+            self.tts.cache.pin(path)  # Never evicted by the size limit
+        with self._lock:
+            self.paths[name] = path
+        return path
+
+    def filler(self) -> Optional[str]:  # A random "thinking" clip
+        """Return the audio path of a random filler phrase"""
+        if not self.filler_names:
+            return None
+        return self.get(random.choice(self.filler_names))
+
+    def get_stats(self) -> Dict:  # Report for /metrics
+        """Get phrase bank statistics"""
+        with self._lock:
+            return {"phrases": len(self.phrases), "rendered": len(self.paths), "served": self.served}
@@ -115,6 +115,24 @@ Rewrite this explanation to:
 
 Simplified Explanation:"""
 
+    # Memory summary prompt (Instructions for folding old turns into a short running summary)
+    MEMORY_SUMMARY_TEMPLATE = """Update the summary of a tutoring conversation with the turns below.
+
+=== Current Summary ===
+{summary}
+
+=== Turns To Add ===
+{turns}
+
+=== Instructions ===
+Write one short paragraph (at most {max_words} words) that keeps:
+1. The topics the student asked about, in order
+2. Key facts, definitions or examples the tutor gave
+3. Anything the student found confusing or asked to revisit
+Do not add new information.
+
+Updated Summary:"""
+
     @staticmethod  # Static methods don't need a class instance
     def format_rag_prompt(question: str, context: str) -> str:  # Helper to fill in the RAG script
         """
@@ -174,6 +192,17 @@ Simplified Explanation:"""
             original_text=original_text
         )
     
+    @staticmethod
+    def format_memory_summary_prompt(summary: str, turns: str, max_words: int = 120) -> str:  # Helper for memory folding
+        """
+        Format a prompt to fold old conversation turns into the running summary
+        """
+        return TutorPrompts.MEMORY_SUMMARY_TEMPLATE.format(
+            summary=summary or "(none yet)",
+            turns=turns,
+            max_words=max_words
+        )
+    
     @staticmethod
     def get_system_prompt() -> str:  # Helper to get the AI's core identity
         """Get the system prompt defining tutor personality"""
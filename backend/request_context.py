@@ -0,0 +1,127 @@
+"""
+Request Context for EchoLearn AI - This file lets a question be called off while it is being answered
+Cooperative cancellation and the latency budget shared by every stage of one /ask request - Nobody pays for an answer nobody hears
+"""
+
+from typing import Callable, Dict, List, Optional  # Import types for organization
+import threading  # Import threading because stages run in worker threads
+import logging  # Import logging for tracking cancellations
+import time  # Import time for the request deadline
+import uuid  # Import uuid for request IDs
+
+from metrics import metrics  # Import the shared performance-numbers registry
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for request handling
+
+
+def record_saved(work: str, amount: int = 1):  # e.g. record_saved("tts_segments", 3)
+    """Count work that was not done because its request was cancelled"""
+    if amount:
+        metrics.increment(f"cancel_saved_{work}", amount)
+
+
+class RequestCancelled(Exception):  # Raised by the stage that notices the cancellation
+    """The request was cancelled (the client went away or called POST /cancel/{id})"""
+
+
+class CancelToken:  # One request's "stop" flag and time budget
+    """A flag every stage checks between steps, plus callbacks that stop background work right away"""
+
+    def __init__(self, request_id: Optional[str] = None, deadline: Optional[float] = None):  # Initialize the token
+        """
+        Initialize Cancel Token
+        """
+        self.request_id = request_id or uuid.uuid4().hex
+        self.reason: Optional[str] = None  # Why it was cancelled
+        self.deadline = deadline  # time.time() by which the answer should be back (None = no budget)
+        self.reserved = 0.0  # Seconds kept back for stages after the LLM (e.g. TTS)
+        self.degraded: List[str] = []  # Shortcuts taken to meet the deadline, e.g. "retrieval_skipped"
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> bool:  # Stop the request
+        """Cancel the request and run the registered callbacks (False if it was already cancelled)"""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:  # One broken callback must not stop the others
+                logger.error(f"Cancel callback failed: {e}")
+        return True
+
+    def remaining(self) -> Optional[float]:  # Seconds left (negative once late, None = no deadline)
+        return None if self.deadline is None else self.deadline - time.time()
+
+    def degrade(self, what: str):  # Called by a stage that cut a corner to stay on time
+        """Record a degradation (reported in the response's timing block and counted in /metrics)"""
+        self.degraded.append(what)
+        metrics.increment(f"deadline_{what}")
+        remaining = self.remaining()
+        logger.info(f"Request {self.request_id[:8]}: {what} ({remaining if remaining is None else round(remaining, 2)}s left)")
+
+    def add_callback(self, callback: Callable[[], None]):  # e.g. stop a TTS pipeline
+        """Run callback when the request is cancelled (right away if it already is)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def check(self, skipped: Optional[str] = None):  # Call between stages
+        """Raise RequestCancelled if the request was cancelled, counting the stage it skipped"""
+        if self._event.is_set():
+            if skipped:
+                record_saved(skipped)
+            raise RequestCancelled(self.reason)
+
+
+class RequestRegistry:  # The requests currently being answered
+    """Cancel tokens of in-flight requests, by request ID"""
+
+    def __init__(self):  # Initialize the registry
+        """
+        Initialize Request Registry
+        """
+        self.tokens: Dict[str, CancelToken] = {}
+        self._lock = threading.Lock()
+        self.cancellations: Dict[str, int] = {}  # reason -> count
+
+    def register(self, request_id: Optional[str] = None, deadline: Optional[float] = None) -> CancelToken:
+        """Create the cancel token for a new request"""
+        token = CancelToken(request_id, deadline)
+        with self._lock:
+            self.tokens[token.request_id] = token
+        return token
+
+    def unregister(self, token: CancelToken):  # Called when a request ends
+        with self._lock:
+            if self.tokens.get(token.request_id) is token:
+                del self.tokens[token.request_id]
+
+    def cancel(self, request_id: str, reason: str) -> bool:  # From POST /cancel/{id} or the disconnect watcher
+        """Cancel an in-flight request (False if it is unknown or already finished)"""
+        with self._lock:
+            token = self.tokens.get(request_id)
+        if token is None or not token.cancel(reason):
+            return False
+        with self._lock:
+            self.cancellations[reason] = self.cancellations.get(reason, 0) + 1
+        metrics.increment("requests_cancelled")
+        logger.info(f"Request {request_id[:8]} cancelled ({reason})")
+        return True
+
+    def get_stats(self) -> Dict:  # Report for /metrics
+        """Get in-flight and cancellation counts"""
+        with self._lock:
+            return {"in_flight": len(self.tokens), "cancelled": dict(self.cancellations)}
@@ -6,11 +6,11 @@ Retrieves relevant document chunks from FAISS vector database - Like a librarian
 import faiss  # Import FAISS for fast mathematical search
 import numpy as np  # Import numpy for math operations
 from typing import List, Dict, Optional  # Import types for organization
-from sentence_transformers import SentenceTransformer  # Import AI tool to turn query into numbers
 import logging  # Import logging for tracking activity
 
 from config import Config  # Import project settings
-from build_vector_db import VectorDBBuilder  # Import tool to manage the database
+from build_vector_db import VectorDBBuilder, load_embedding_model  # Import tools to manage the database and share its model
+from context_packer import ContextPacker  # Import tool to merge, deduplicate and budget the found chunks
 
 logging.basicConfig(level=logging.INFO)  # Setup standard log reports
 logger = logging.getLogger(__name__)  # Create a logger for the retriever
@@ -35,6 +35,9 @@ class DocumentRetriever:  # Define a class specifically for finding document par
         # Lazy load embedding model
         self.embedding_model = None
         
+        # Tool that turns the raw matches into one compact context block
+        self.context_packer = ContextPacker()
+        
         # Load the saved vector database from disk
         self.db_builder = VectorDBBuilder(embedding_model=self.embedding_model_name)
         self.loaded = self.db_builder.load_index(self.db_path)  # Try to load the index files
@@ -47,15 +50,29 @@ class DocumentRetriever:  # Define a class specifically for finding document par
     def _get_model(self):
         """Lazy load the embedding model"""
         if self.embedding_model is None:
-            logger.info(f"Loading embedding model for retriever: {self.embedding_model_name}")
-            self.embedding_model = SentenceTransformer(self.embedding_model_name)
+            self.embedding_model = load_embedding_model(self.embedding_model_name)  # Same instance as the builder's
         return self.embedding_model
     
+    def embed_query(self, query: str) -> np.ndarray:  # Turn a question into numbers
+        """
+        Embed a query as a (1, dim) float32 array
+        """
+        model = self._get_model()
+        return model.encode(
+            [query],
+            convert_to_numpy=True
+        ).astype('float32')  # Convert to standard format
+    
+    def get_generation(self) -> int:  # Version number of the loaded index
+        """Get the index generation (changes whenever the index contents change)"""
+        return self.db_builder.generation
+    
     def retrieve(  # Main function to search for answers
         self,
         query: str,
         top_k: Optional[int] = None,
-        score_threshold: Optional[float] = None
+        score_threshold: Optional[float] = None,
+        query_embedding: Optional[np.ndarray] = None
     ) -> List[Dict]:
         """
         Retrieve relevant documents for a query
@@ -66,12 +83,9 @@ class DocumentRetriever:  # Define a class specifically for finding document par
         
         k = top_k or self.top_k  # Decide how many items to look for
         
-        # Turn the user's text question into a list of numbers (embedding)
-        model = self._get_model()
-        query_embedding = model.encode(
-            [query],
-            convert_to_numpy=True
-        ).astype('float32')  # Convert to standard format
+        # Turn the user's text question into a list of numbers (embedding), unless the caller already did
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
         
         # Use FAISS to mathematically find the most similar documents
         distances, indices = self.db_builder.index.search(query_embedding, k)
@@ -91,6 +105,7 @@ class DocumentRetriever:  # Define a class specifically for finding document par
             result = {
                 "text": self.db_builder.documents[doc_idx],  # The actual words found
                 "metadata": self.db_builder.metadata[doc_idx],  # Extra info about the source
+                "chunk_id": int(doc_idx),  # Position of the chunk in the index
                 "score": float(distance),  # How good the match is (lower is better)
                 "rank": idx + 1  # 1st place, 2nd place, etc.
             }
@@ -103,33 +118,36 @@ class DocumentRetriever:  # Define a class specifically for finding document par
         self,
         query: str,
         top_k: Optional[int] = None,
-        include_surrounding: bool = True
+        include_surrounding: bool = True,
+        query_embedding: Optional[np.ndarray] = None,
+        token_budget: Optional[int] = None
     ) -> Dict:
         """
         Retrieve documents with additional context
         """
-        results = self.retrieve(query, top_k)  # Get the raw matches first
+        results = self.retrieve(query, top_k, query_embedding=query_embedding)  # Get the raw matches first
         
         if not results:  # If nothing found
             return {
                 "results": [],
                 "context": "",
+                "context_tokens": 0,
                 "num_results": 0
             }
         
-        # Combine all matches into one big "Context" text for the AI to read
-        context_parts = []  # List for text chunks
-        for i, result in enumerate(results, 1):  # Loop through matches
-            source = result["metadata"].get("source", "Unknown")  # Get filename
-            context_parts.append(f"[Source {i}: {source}]")  # Add source label
-            context_parts.append(result["text"])  # Add actual text content
-            context_parts.append("")  # Add an empty line for readability
-        
-        context = "\n".join(context_parts)  # Join everything into one string
+        # Combine the matches into one "Context" text for the AI to read
+        # (overlapping neighbours are merged, repeats dropped, and the token budget respected)
+        packed = self.context_packer.pack(results, token_budget=token_budget)
+        if packed["merged"] or packed["dropped"]:
+            logger.info(
+                f"Packed context: merged {packed['merged']}, dropped {packed['dropped']}, "
+                f"{packed['context_tokens']} tokens"
+            )
         
         return {  # Return the final report
             "results": results,  # The original matches
-            "context": context,  # The combined text block
+            "context": packed["context"],  # The combined text block
+            "context_tokens": packed["context_tokens"],  # Size of the block in LLM tokens
             "num_results": len(results),  # total count
             "query": query  # The original search terms
         }
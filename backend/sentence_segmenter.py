@@ -0,0 +1,98 @@
+"""
+Sentence Segmenter for EchoLearn AI - This file cuts streaming text into sentences
+Splits LLM output into speakable sentences as it arrives - So the voice can start before the answer is done
+"""
+
+import re  # Import regular expressions for finding sentence endings
+from typing import List, Optional  # Import types for organization
+
+# A sentence ends with . ! ? (optionally followed by quotes/brackets) and then whitespace
+SENTENCE_END = re.compile(r'[.!?]+["\')\]]*\s+')
+
+# Short words that end with a dot but do NOT end a sentence
+ABBREVIATIONS = {
+    "e.g.", "i.e.", "etc.", "vs.", "mr.", "mrs.", "ms.", "dr.", "prof.",
+    "fig.", "eq.", "no.", "approx.", "st."
+}
+
+
+class SentenceSegmenter:  # Define the class for cutting text into sentences
+    """Incrementally split streamed text into complete sentences"""
+
+    def __init__(self, min_chars: int = 20):  # Initialize the segmenter
+        """
+        Initialize Sentence Segmenter
+        """
+        self.min_chars = min_chars  # Very short sentences are merged with the next one (fewer tiny audio clips)
+        self.buffer = ""  # Text received but not yet handed out as a sentence
+
+    def feed(self, delta: str) -> List[str]:  # Add new text and get back any finished sentences
+        """
+        Add a chunk of streamed text and return completed sentences
+        """
+        if not delta:  # Nothing new arrived
+            return []
+
+        self.buffer += delta  # Append the new text to what we are holding
+        sentences = []  # List for finished sentences
+        start = 0  # Where the current (unfinished) sentence starts in the buffer
+
+        for match in SENTENCE_END.finditer(self.buffer):  # Look at every possible sentence ending
+            candidate = self.buffer[start:match.end()]  # The text up to (and including) this ending
+            if self._is_abbreviation(candidate) or len(candidate.strip()) < self.min_chars:
+                continue  # Not a real ending (or too short to speak on its own) - keep reading
+            sentences.append(candidate.strip())  # Save the finished sentence
+            start = match.end()  # The next sentence starts right after this one
+
+        # Paragraph breaks also end a sentence (lists and headings often have no final dot)
+        while "\n\n" in self.buffer[start:]:
+            cut = self.buffer.index("\n\n", start)  # Position of the paragraph break
+            candidate = self.buffer[start:cut].strip()
+            if candidate:
+                sentences.append(candidate)
+            start = cut + 2
+
+        self.buffer = self.buffer[start:]  # Keep only the unfinished remainder
+        return sentences
+
+    def flush(self) -> Optional[str]:  # Get whatever is left once the stream has finished
+        """
+        Return the remaining buffered text as a final sentence
+        """
+        remainder = self.buffer.strip()  # Whatever never got a proper ending
+        self.buffer = ""  # Reset for reuse
+        return remainder or None
+
+    @staticmethod
+    def _is_abbreviation(candidate: str) -> bool:  # Check if the "ending" is really an abbreviation
+        """Check whether a candidate sentence ends on a known abbreviation"""
+        words = candidate.strip().split()
+        if not words:
+            return False
+        last_word = words[-1].lower().rstrip('"\')]')  # Ignore closing quotes/brackets
+        return last_word in ABBREVIATIONS
+
+    @classmethod
+    def split(cls, text: str, min_chars: int = 20) -> List[str]:  # Split a whole text at once
+        """
+        Split a complete text into sentences
+        """
+        segmenter = cls(min_chars=min_chars)  # Use a fresh segmenter
+        sentences = segmenter.feed(text + " ")  # Trailing space lets the last ending be detected
+        remainder = segmenter.flush()
+        if remainder:
+            sentences.append(remainder)
+        return sentences
+
+
+if __name__ == "__main__":  # Code for manual testing
+    # Example usage: feed text in small pieces the way an LLM stream arrives
+    segmenter = SentenceSegmenter()
+    stream = ["Machine learning is a way for ", "computers to learn. For example, e.g. spam ",
+              "filters learn from emails! Isn't that neat? ", "It works well."]
+
+    for piece in stream:
+        for sentence in segmenter.feed(piece):
+            print(f"Sentence ready: {sentence}")
+
+    print(f"Final: {segmenter.flush()}")
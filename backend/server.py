@@ -3,13 +3,20 @@ FastAPI Server for EchoLearn AI - This is the backend server file
 Backend API with document upload and voice query endpoints - Built with FastAPI
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form  # Import FastAPI tools for building web APIs
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request, Response, WebSocket, WebSocketDisconnect  # Import FastAPI tools for building web APIs
 from fastapi.middleware.cors import CORSMiddleware  # Import tool to allow different websites to talk to this API
-from fastapi.responses import FileResponse, JSONResponse  # Import ways to send files or data back to user
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse  # Import ways to send files or data back to user
+from fastapi.concurrency import run_in_threadpool  # Import helper to run slow blocking work off the event loop
 from contextlib import asynccontextmanager  # Import helper for the modern startup/shutdown lifespan
 from pathlib import Path  # Import Path for managing file and folder paths
 from typing import Optional  # Import Optional for variables that might be empty
 import shutil  # Import tools for copying files
+import base64  # Import base64 for embedding small audio clips in the response
+import asyncio  # Import asyncio for the live-transcription queue
+import json  # Import json for WebSocket control messages
+import numpy as np  # Import numpy for the silent warmup clip
+import re  # Import re for validating session IDs
+import uuid  # Import uuid for creating new session IDs
 import logging  # Import logging to record what the server is doing
 import time  # Import time for measuring performance or delays
 from datetime import datetime  # Import datetime for adding timestamps to logs
@@ -21,8 +28,18 @@ from text_cleaner import TextCleaner  # Import our tool to clean up messy text
 from chunker import TextChunker  # Import our tool to split big text into small pieces
 from build_vector_db import VectorDBBuilder  # Import our tool to create a searchable text database
 from tutor_agent import TutorAgent  # Import our AI Brain (the tutor agent)
-from speech_to_text import SpeechToText  # Import our tool to turn voice into text
-from text_to_speech import TextToSpeech  # Import our tool to turn text into voice
+from speech_to_text import SAMPLE_RATE, SpeechToText  # Import our tool to turn voice into text
+from stt_batcher import STTBatcher  # Import the tool that transcribes simultaneous questions together
+from stt_pool import STTOverloadedError, STTWorkerPool  # Import the worker processes for speech recognition
+from streaming_stt import AudioStreamDecoder, SpeechSegmenter  # Import the live-audio decoder and pause detector
+from text_to_speech import AUDIO_FORMATS, TextToSpeech  # Import our tool to turn text into voice
+from phrase_bank import PhraseBank  # Import the pre-synthesized fixed phrases and fillers
+from audio_stream import AudioStreamRegistry  # Import the answers that can be listened to while being spoken
+from metrics import metrics  # Import the shared performance-numbers registry
+from single_flight import SingleFlight  # Import the tool that merges identical concurrent requests
+from request_context import CancelToken, RequestCancelled, RequestRegistry  # Import cancellation of abandoned requests
+from warmup import ReadinessTracker  # Import the tracker behind /health/ready
+from load_controller import LoadController  # Import the tiered quality dial for busy moments
 
 # Setup logging
 logging.basicConfig(  # Configure how we record server messages
@@ -39,13 +56,38 @@ logger = logging.getLogger(__name__)  # Create a logger object for this specific
 vector_db_builder: Optional["VectorDBBuilder"] = None  # Placeholder for the database creator
 tutor_agent: Optional["TutorAgent"] = None  # Placeholder for the AI tutor
 stt_engine: Optional["SpeechToText"] = None  # Placeholder for the voice-to-text tool
+stt_batcher: Optional["STTBatcher"] = None  # Placeholder for the batching front of the voice-to-text tool
+stt_pool: Optional["STTWorkerPool"] = None  # Placeholder for the voice-to-text worker processes (STT_MODE=pool)
 tts_engine: Optional["TextToSpeech"] = None  # Placeholder for the text-to-voice tool
+phrase_bank: Optional[PhraseBank] = None  # Placeholder for the ready-made phrase audio
+readiness = ReadinessTracker(optional=Config.WARMUP_OPTIONAL_COMPONENTS)  # Which components are loaded (and how long each took)
+warmup_task: Optional[asyncio.Task] = None  # Background warmup (kept so it is not garbage collected)
+
+
+def build_warmup_tasks() -> dict:  # What "warm" means for each heavy component
+    """Load and dummy-run each component listed in WARMUP_COMPONENTS"""
+    def warm_embeddings():
+        tutor_agent.retriever.embed_query("What is machine learning?")  # Loads the shared model and runs it once
+        vector_db_builder._get_model()  # Same instance - just wires it into the builder
+
+    def warm_stt():
+        if stt_pool:
+            stt_pool.warmup()  # Start every worker process (each loads its own model)
+        else:
+            stt_engine.transcribe_audio(np.zeros(SAMPLE_RATE, dtype=np.float32), profile=Config.STT_PROFILE_FAST)
+
+    def warm_tts():
+        path = tts_engine.synthesize("Hello.", output_filename=f"warmup_{uuid.uuid4().hex[:8]}.mp3", add_pauses=False)
+        Path(path).unlink(missing_ok=True)
+
+    tasks = {"embeddings": warm_embeddings, "stt": warm_stt, "tts": warm_tts, "phrases": phrase_bank.prerender}
+    return {name: task for name, task in tasks.items() if name in Config.WARMUP_COMPONENTS}
 
 
 @asynccontextmanager  # Mark this as the modern startup/shutdown handler (replaces deprecated on_event)
 async def lifespan(app: FastAPI):  # Runs once when the server starts, then again on shutdown
     """Initialize services on startup"""
-    global vector_db_builder, tutor_agent, stt_engine, tts_engine  # Tell Python we are using the global variables
+    global vector_db_builder, tutor_agent, stt_engine, stt_batcher, stt_pool, tts_engine, phrase_bank, warmup_task  # Tell Python we are using the global variables
 
     logger.info("Starting EchoLearn AI Server...")  # Log that server initialization began
 
@@ -55,24 +97,50 @@ async def lifespan(app: FastAPI):  # Runs once when the server starts, then agai
         Config.ensure_directories()  # Make sure needed folders like 'uploads' exist
 
         # Initialize vector database builder
-        vector_db_builder = VectorDBBuilder()  # Set up the database tool
+        with readiness.track("vector_db"):
+            vector_db_builder = VectorDBBuilder()  # Set up the database tool
 
-        # Try to load existing index
-        if vector_db_builder.load_index():  # Check for an existing saved database
-            logger.info("Loaded existing vector database")  # Log success if found
-        else:  # If no database found
-            logger.info("No existing vector database found")  # Log that we are starting fresh
+            # Try to load existing index
+            if vector_db_builder.load_index():  # Check for an existing saved database
+                logger.info("Loaded existing vector database")  # Log success if found
+            else:  # If no database found
+                logger.info("No existing vector database found")  # Log that we are starting fresh
 
         # Initialize tutor agent
-        tutor_agent = TutorAgent(use_memory=True)  # Create the AI tutor with "memory" to remember conversation
+        with readiness.track("tutor_agent"):
+            tutor_agent = TutorAgent(use_memory=True)  # Create the AI tutor with "memory" to remember conversation
+        metrics.register("tutor_caches", tutor_agent.get_cache_stats)  # Report cache hit rates on /metrics
+        metrics.register("llm_router", tutor_agent.router.get_stats)  # Report hedging/failover counts on /metrics
+        if tutor_agent.memory_store:
+            metrics.register("sessions", tutor_agent.memory_store.get_stats)  # Report live conversations
         logger.info("Tutor agent initialized")  # Log success
 
         # Initialize speech engines
         stt_engine = SpeechToText()  # Create the tool for hearing user voice
+        if Config.STT_MODE == "pool":  # Whisper runs in worker processes; this process never loads it
+            stt_pool = STTWorkerPool()  # Workers start during warmup (or on the first question)
+            metrics.register("stt_pool", stt_pool.get_stats)
+        elif Config.STT_BATCHING_ENABLED:  # Questions uploaded at the same time share one model call
+            stt_batcher = STTBatcher(stt_engine)
+            metrics.register("stt_batcher", stt_batcher.get_stats)
         logger.info("Speech-to-text engine initialized")  # Log success
 
         tts_engine = TextToSpeech()  # Create the tool for speaking to user
         logger.info("Text-to-speech engine initialized")  # Log success
+        if tts_engine.cache:
+            metrics.register("tts_cache", tts_engine.cache.get_stats)  # Report audio reuse and evictions
+        if tts_engine.parallel:
+            metrics.register("tts_parallel", tts_engine.parallel.get_stats)  # Report sentence-group synthesis
+        phrase_bank = PhraseBank(tts_engine)  # Fixed replies and fillers (rendered during warmup)
+        metrics.register("phrases", phrase_bank.get_stats)
+
+        # Load and dummy-run the heavy models in parallel so the first student does not wait for them
+        if Config.WARMUP_ENABLED:
+            warming = run_in_threadpool(readiness.run, build_warmup_tasks())
+            if Config.WARMUP_BLOCKING:  # Do not accept requests until warm
+                await warming
+            else:  # Serve right away; /health/ready says 503 until warm
+                warmup_task = asyncio.create_task(warming)
 
         logger.info("✓ EchoLearn AI Server started successfully")  # Log that everything is ready
 
@@ -82,6 +150,13 @@ async def lifespan(app: FastAPI):  # Runs once when the server starts, then agai
 
     yield  # Hand control back to FastAPI; everything above runs on startup, below on shutdown
 
+    if tutor_agent and tutor_agent.memory_store:  # Write any queued conversation turns before exiting
+        tutor_agent.memory_store.close()
+    if stt_pool:
+        stt_pool.shutdown()
+    if tts_engine and tts_engine.parallel:
+        tts_engine.parallel.shutdown()
+
 
 # Initialize FastAPI app
 app = FastAPI(  # Create the main FastAPI application object
@@ -100,6 +175,25 @@ app.add_middleware(  # Add a "security guard" layer to our app
     allow_headers=["*"],  # Allow all types of information in request headers
 )
 
+# Identical concurrent /ask requests wait for one shared computation
+single_flight = SingleFlight()
+metrics.register("single_flight", single_flight.get_stats)
+
+# In-flight /ask requests by request ID, so they can be cancelled (client disconnect or POST /cancel/{id})
+requests_in_flight = RequestRegistry()
+metrics.register("requests", requests_in_flight.get_stats)
+
+# Steps quality down in tiers (fast STT, fewer chunks, shorter answers, text only) while too many questions are in flight
+load_controller = LoadController(lambda: requests_in_flight.get_stats()["in_flight"])
+metrics.register("load_controller", load_controller.get_stats)
+
+# Answers being spoken sentence by sentence (audio_mode="stream"), fetched from /audio/stream/{id}
+AUDIO_MODES = ("file", "stream", "inline")
+AUDIO_MIME_TYPES = {".mp3": "audio/mpeg", ".opus": "audio/ogg"}
+CONTENT_ADDRESSED = re.compile(r"tts_([0-9a-f]{32})\.\w+")  # Audio files named by a hash of their content
+audio_streams = AudioStreamRegistry()
+metrics.register("audio_streams", audio_streams.get_stats)
+
 # Document processors (the workers that prepare our files)
 pdf_loader = PDFLoader()  # Create the PDF reader worker
 notebook_loader = NotebookLoader(include_code=True, include_outputs=False)  # Create the Notebook reader worker
@@ -120,9 +214,12 @@ async def root():  # Define the root function
 @app.get("/health")  # Define an address for checking if server is healthy
 async def health_check():  # Define the health check logic
     """Health check endpoint"""
+    warmup = readiness.get_stats()
     return {  # Send back a report card of all systems
-        "status": "healthy",  # Overall status
+        "status": "healthy" if warmup["ready"] else "unhealthy" if warmup["failed"] else "warming_up",  # Overall status
         "timestamp": datetime.now().isoformat(),  # Current time
+        "components": warmup["components"],  # Load state and load time of each component
+        "load": load_controller.get_stats(),  # Current degradation tier and the load behind it
         "services": {  # Status of individual parts
             "vector_db": vector_db_builder is not None,  # Check if database tool is active
             "tutor_agent": tutor_agent is not None and tutor_agent.is_ready(),  # Check if AI brain is ready
@@ -133,6 +230,27 @@ async def health_check():  # Define the health check logic
     }
 
 
+@app.get("/health/live")  # Liveness probe: restart the container if this stops answering
+async def health_live():
+    """Liveness endpoint - the process is up and the event loop responds"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/health/ready")  # Readiness probe: only send traffic once this says 200
+async def health_ready():
+    """Readiness endpoint - 200 once every component is loaded and warmed up, 503 until then (or if a required one failed)"""
+    warmup = readiness.get_stats()
+    ready = warmup["ready"] and tutor_agent is not None
+    status = "ready" if ready else "failed" if warmup["failed"] else "warming_up"
+    return JSONResponse(status_code=200 if ready else 503, content=dict(warmup, status=status))
+
+
+@app.get("/metrics")  # Define an address for performance numbers
+async def get_metrics():  # Define the metrics logic
+    """Performance metrics (cache hit rates, latencies, counters)"""
+    return metrics.snapshot()  # Collect numbers from every registered component
+
+
 @app.post("/upload")  # Define an address for receiving new document files
 async def upload_document(  # Define the file processing logic
     file: UploadFile = File(...),  # The actual file being sent
@@ -214,31 +332,299 @@ async def upload_document(  # Define the file processing logic
         raise HTTPException(status_code=500, detail=str(e))  # Tell user about the error
 
 
+SESSION_COOKIE = "echolearn_session"  # Cookie that remembers a browser's session
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")  # Accept only simple, bounded IDs (request IDs too)
+
+
+def get_session_id(request: Request, response: Response) -> str:  # Work out which student is asking
+    """
+    Read the session ID from the X-Session-ID header or the session cookie,
+    or start a new session (returned to the client as a cookie)
+    """
+    session_id = request.headers.get("X-Session-ID") or request.cookies.get(SESSION_COOKIE)
+    if session_id and SESSION_ID_PATTERN.match(session_id):
+        return session_id
+    
+    session_id = uuid.uuid4().hex  # New student (or an invalid ID) - start a fresh conversation
+    response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite="lax")
+    return session_id
+
+
+def get_request_id(request: Request) -> str:  # Name this request so it can be cancelled
+    """
+    Use the client's X-Request-ID header (so it can call POST /cancel/{id} on barge-in) or make a new ID
+    """
+    request_id = request.headers.get("X-Request-ID")
+    if request_id and SESSION_ID_PATTERN.match(request_id):
+        return request_id
+    return uuid.uuid4().hex
+
+
+def get_deadline(request: Request) -> Optional[float]:  # When this request's answer should be back
+    """
+    Deadline from the X-Deadline-Ms header (milliseconds from now) or REQUEST_DEADLINE_MS (None = no budget)
+    """
+    header = request.headers.get("X-Deadline-Ms", "")
+    budget_ms = int(header) if header.isdigit() else Config.REQUEST_DEADLINE_MS
+    return time.time() + budget_ms / 1000 if budget_ms > 0 else None
+
+
+def tts_in_time(answer: str, audio_format: str, cancel: CancelToken) -> bool:  # Is there still time to speak?
+    """True unless the deadline leaves less than DEADLINE_TTS_RESERVE_MS and the audio is not cached already"""
+    remaining = cancel.remaining()
+    if remaining is None or remaining >= Config.DEADLINE_TTS_RESERVE_MS / 1000:
+        return True
+    return tts_engine.audio_path_for(answer, add_pauses=True, audio_format=audio_format).exists()
+
+
+async def watch_disconnect(request: Request, cancel: CancelToken):  # Runs next to each /ask request
+    """Cancel the request's work as soon as the client closes the connection"""
+    while not cancel.cancelled:
+        if await request.is_disconnected():
+            requests_in_flight.cancel(cancel.request_id, "client_disconnected")
+            return
+        await asyncio.sleep(Config.CANCEL_POLL_INTERVAL_MS / 1000)
+
+
+def make_coalesce_key(  # Build the key that identifies "the same request"
+    question: str,
+    use_retrieval: bool,
+    return_audio: bool,
+    pipelined: bool,
+    ignore_history: bool,
+    session_id: str = "default",
+    audio_mode: str = "file",
+    audio_format: str = "mp3",
+    top_k: Optional[int] = None,
+    max_tokens: Optional[int] = None
+) -> tuple:
+    """
+    Build the single-flight key for an /ask request (top_k/max_tokens: the load tier's limits)
+    """
+    normalized = " ".join(question.lower().split()).rstrip("?!. ")  # Ignore case, spacing and end punctuation
+    generation = tutor_agent.retriever.get_generation()  # New documents -> different answer
+    memory = tutor_agent.memory_store.find(session_id) if tutor_agent.memory_store and not ignore_history else None
+    history_free = ignore_history or not memory or not memory.get_history()
+    scope = "independent" if history_free else f"session:{session_id}"  # History-dependent answers only match their session
+    return (
+        normalized, use_retrieval, return_audio, pipelined, audio_mode, audio_format, generation, scope,
+        top_k, max_tokens  # A shortened answer under load must not reach a request made at full quality
+    )
+
+
+def answer_question(  # Runs in a worker thread: AI answer + voice for one question
+    question: str,
+    use_retrieval: bool,
+    return_audio: bool,
+    pipelined: bool,
+    ignore_history: bool,
+    session_id: str = "default",
+    audio_mode: str = "file",
+    audio_format: str = "mp3",
+    cancel: Optional[CancelToken] = None,
+    top_k: Optional[int] = None,
+    max_tokens: Optional[int] = None
+) -> dict:
+    """
+    Generate the answer (and audio) for a question - the shared part of an /ask request
+    If cancel fires, the LLM stream and queued sentences are dropped and RequestCancelled is raised
+    If cancel has a deadline, every stage cuts corners to meet it (reported in timing["degraded"])
+    top_k and max_tokens come from the load controller's tier (None = configured values)
+    """
+    start_time = time.time()  # Start thinking timer
+    cancel = cancel or CancelToken()
+    if return_audio and audio_mode != "stream":  # The LLM must leave time for speaking (stream audio plays as it goes)
+        cancel.reserved = Config.DEADLINE_TTS_RESERVE_MS / 1000
+    
+    audio_path = None  # Placeholder for voice file path
+    audio_segments = []  # Placeholder for per-sentence voice files (pipelined mode)
+    synthesis_time = 0  # Timer for speaking
+    time_to_first_audio = None  # How long until the student could hear the first words
+    pipeline = None  # Background sentence speaker (pipelined mode only)
+    stream = None  # Audio the client plays while it is still being spoken (stream mode only)
+    
+    try:
+        if audio_mode == "stream" and return_audio:  # Speak sentence by sentence into a stream the client can open right away
+            stream = audio_streams.create(tts_engine)
+            cancel.add_callback(stream.cancel)  # Barge-in stops the voice even after /ask has answered
+            if Config.TTS_FILLER_ENABLED:  # Say "let me think" if the first sentence is slow to arrive
+                filler = phrase_bank.filler()
+                if filler:
+                    stream.play_filler(filler, Config.TTS_FILLER_DELAY_MS / 1000)
+            result = tutor_agent.ask(
+                question, use_retrieval=use_retrieval, top_k=top_k, on_sentence=stream.submit,
+                ignore_history=ignore_history, session_id=session_id, cancel=cancel, max_tokens=max_tokens,
+                audio_format="mp3"  # Streams are always MP3
+            )
+        elif pipelined and return_audio:  # Speak sentence by sentence while the answer is being written
+            pipeline = tts_engine.start_pipeline(audio_format)  # Background speaker for this answer
+            cancel.add_callback(pipeline.cancel)
+            result = tutor_agent.ask(
+                question, use_retrieval=use_retrieval, top_k=top_k, on_sentence=pipeline.submit,
+                ignore_history=ignore_history, session_id=session_id, cancel=cancel, max_tokens=max_tokens,
+                audio_format=audio_format
+            )
+        else:
+            result = tutor_agent.ask(
+                question, use_retrieval=use_retrieval, top_k=top_k, ignore_history=ignore_history,
+                session_id=session_id, cancel=cancel, max_tokens=max_tokens, audio_format=audio_format
+            )
+    except BaseException:  # Cancelled or failed - nothing more will be spoken
+        if stream:
+            stream.cancel()  # Close it so its speaker thread and any /audio/stream reader stop waiting
+        if pipeline:
+            pipeline.cancel()
+            pipeline.finish()  # Release the workers (queued sentences were already dropped)
+        raise
+    agent_time = time.time() - start_time  # Stop thinking timer
+    
+    answer = result["answer"]  # Get the answer text
+    metrics.increment("prompt_tokens_total", result.get("prompt_tokens", 0))  # Track LLM input volume
+    metrics.increment("answers_generated")
+    
+    # Generate audio response if requested
+    if stream:  # Sentences are already being spoken - the rest keeps going after we answer
+        for path in result.get("cached_audio_segments") or [result.get("cached_audio_path")]:
+            if path:  # Same answer was already spoken - stream the saved audio
+                stream.add_file(path)
+        if result.get("cache_key") and not result["cached"]:  # Save the spoken sentences with the cached answer
+            cache_key = result["cache_key"]
+            stream.on_complete = lambda segments: tutor_agent.answer_cache.attach_audio(cache_key, audio_segments=segments)
+        stream.finish()  # No more sentences are coming
+        if stream.first_audio_time is not None:
+            time_to_first_audio = stream.first_audio_time - start_time
+    elif return_audio and (result.get("cached_audio_path") or result.get("cached_audio_segments")):
+        audio_path = result["cached_audio_path"]  # Same answer was already spoken - reuse the audio
+        audio_segments = result["cached_audio_segments"] if pipelined else []
+        if pipelined and not audio_segments:  # Cached as one file - serve it as a single segment
+            audio_segments, audio_path = [audio_path], None
+        if pipeline:  # Nothing was queued - just release the background worker
+            pipeline.finish()
+        time_to_first_audio = time.time() - start_time
+    elif pipeline:  # Sentences are already being spoken in the background
+        remaining = cancel.remaining()
+        audio_segments = pipeline.finish(None if remaining is None else max(0.0, remaining))  # Wait for the last sentences
+        if audio_segments is None:  # Not all spoken before the deadline
+            cancel.degrade("text_only")
+            audio_segments = []
+        synthesis_time = time.time() - start_time - agent_time  # Extra time spent after the LLM finished
+        if pipeline.first_audio_time is not None:
+            time_to_first_audio = pipeline.first_audio_time - start_time
+    elif return_audio and not tts_in_time(answer, audio_format, cancel):  # Audio would arrive too late
+        cancel.degrade("text_only")
+    elif return_audio:  # If user wants tutor to speak
+        cancel.check(skipped="tts_answers")
+        logger.info("Generating audio response...")  # Log that we are preparing voice
+        synthesis_start = time.time()  # Start timer
+        try:
+            audio_path = tts_engine.synthesize(answer, add_pauses=True, audio_format=audio_format)  # Turn answer text into voice
+            synthesis_time = time.time() - synthesis_start  # Stop timer
+            time_to_first_audio = time.time() - start_time  # The whole file must exist before playback
+        except Exception as tts_err:  # If speaking failed
+            logger.error(f"TTS Synthesis failed: {tts_err}")  # Log failure
+            audio_path = None  # Clear path
+    
+    # Keep the fresh audio next to the cached answer so the next student skips TTS too
+    if result.get("cache_key") and (audio_path or audio_segments) and not result["cached"]:
+        tutor_agent.answer_cache.attach_audio(
+            result["cache_key"], audio_path=audio_path, audio_segments=audio_segments,
+            synthesis_time=synthesis_time
+        )
+    
+    return {  # Send everything back to the user
+        "status": "success",  # tag
+        "question": question,  # user's question
+        "answer": answer,  # tutor's answer
+        "audio_path": audio_path,  # path to hear the voice
+        "audio_segments": audio_segments,  # per-sentence voice files in order (pipelined mode)
+        "audio_stream": f"/audio/stream/{stream.id}" if stream else None,  # play while it is being spoken (stream mode)
+        "sources": result["sources"],  # parts of documents used
+        "num_sources": result["num_sources"],  # how many sources
+        "used_retrieval": result["used_retrieval"],  # did we search docs?
+        "used_memory": result["used_memory"],  # did we remember past chat?
+        "cached": result["cached"],  # was this answer reused from an earlier student?
+        "session_id": session_id,  # conversation the answer was remembered in
+        "prompt_tokens": result.get("prompt_tokens", 0),  # size of the prompt sent to the AI
+        "timing": {  # speed report card (transcription is added per request)
+            "agent_time": round(agent_time, 2),
+            "synthesis_time": round(synthesis_time, 2),
+            "time_to_first_audio": time_to_first_audio,  # Seconds after the answer started (None = no audio)
+            "degraded": list(cancel.degraded)  # Shortcuts taken to meet the deadline
+        }
+    }
+
+
+def inline_audio(audio_path: Optional[str], audio_segments: list) -> dict:  # For audio_mode="inline"
+    """
+    Embed the answer's audio as base64 when it is under AUDIO_INLINE_MAX_KB (larger audio keeps its URL only)
+    """
+    paths = [audio_path] if audio_path else list(audio_segments)
+    if not paths:
+        return {"audio_inline": False}
+    try:
+        if sum(Path(path).stat().st_size for path in paths) > Config.AUDIO_INLINE_MAX_KB * 1024:
+            return {"audio_inline": False}  # Too big - fetch it from /audio (cacheable, supports Range)
+        encoded = [base64.b64encode(Path(path).read_bytes()).decode("ascii") for path in paths]
+    except FileNotFoundError:  # Evicted in the meantime
+        return {"audio_inline": False}
+    return {
+        "audio_inline": True,
+        "audio_mime": AUDIO_MIME_TYPES.get(Path(paths[0]).suffix, "audio/mpeg"),
+        "audio_base64": encoded[0] if audio_path else None,
+        "audio_segments_base64": [] if audio_path else encoded
+    }
+
+
 @app.post("/ask")  # Define an address for handling questions
 async def ask_question(  # Define the questioning logic
+    request: Request,  # The raw request (carries the session header/cookie)
+    http_response: Response,  # Lets us hand a new student their session cookie
     audio: UploadFile = File(None),  # Optional voice recording from user
     text: str = Form(None),  # Optional text question from user
     use_retrieval: bool = Form(True),  # Should we search the documents for answer?
-    return_audio: bool = Form(True)  # Should the tutor speak back?
+    return_audio: bool = Form(True),  # Should the tutor speak back?
+    pipelined: bool = Form(False),  # Speak each sentence while the AI is still writing the rest?
+    ignore_history: bool = Form(False),  # Answer without earlier chat (makes the answer cacheable)
+    audio_mode: str = Form("file"),  # "file" = audio URL, "inline" = small clips embedded as base64, "stream" = chunked MP3
+    audio_format: str = Form("mp3")  # "mp3", or "opus" for much smaller files (file/inline modes)
 ):
     """
     Ask a question via audio or text
     """
+    if audio_mode not in AUDIO_MODES:
+        raise HTTPException(status_code=400, detail=f"audio_mode must be one of {', '.join(AUDIO_MODES)}")
+    if audio_format not in AUDIO_FORMATS:
+        raise HTTPException(status_code=400, detail=f"audio_format must be one of {', '.join(AUDIO_FORMATS)}")
+    
+    request_id = get_request_id(request)  # POST /cancel/{request_id} stops this request's work
+    http_response.headers["X-Request-ID"] = request_id
+    deadline = get_deadline(request)  # Latency budget every stage consults
+    cancel = requests_in_flight.register(request_id, deadline)
+    watcher = asyncio.create_task(watch_disconnect(request, cancel)) if Config.CANCEL_ON_DISCONNECT else None
+    spoken_later = False  # Stream mode: stays cancellable until the answer has been spoken
+    tier = load_controller.current()  # Busy moment? Cheaper settings for this request
+    if tier.get("text_only"):
+        return_audio = False
+    
     try:  # Start error checking
         question = None  # Placeholder for the final text question
         transcription_time = 0  # Placeholder for measurement
         
         # Get question from audio or text
         if audio:  # If user sent a voice clip
-            # Save audio file
-            audio_path = Config.UPLOAD_DIR / f"question_{int(time.time())}.wav"  # Decide file name
-            with open(audio_path, "wb") as buffer:  # Open new file
-                shutil.copyfileobj(audio.file, buffer)  # Save the recording
+            audio_bytes = await audio.read()  # Keep the recording in memory (no temporary file)
             
             # Transcribe audio
             logger.info("Transcribing audio question...")  # Log that we are "listening"
             start_time = time.time()  # Start timer
-            stt_result = stt_engine.transcribe(str(audio_path))  # Use hearing tool to turn voice into text
+            transcriber = stt_pool or stt_batcher or stt_engine
+            profile = tier.get("stt_profile")  # None = let the transcriber choose from clip length and load
+            remaining = cancel.remaining()
+            tight = remaining is not None and remaining < Config.DEADLINE_STT_FAST_MS / 1000
+            if tight and profile != Config.STT_PROFILE_FAST:  # Tight budget - greedy decoding
+                profile = Config.STT_PROFILE_FAST
+                cancel.degrade("stt_fast_profile")
+            stt_result = await run_in_threadpool(transcriber.transcribe_bytes, audio_bytes, profile=profile)  # Decode + turn voice into text
             question = stt_result["transcript"]  # Get the text transcript
             transcription_time = time.time() - start_time  # Stop timer
             
@@ -253,13 +639,15 @@ async def ask_question(  # Define the questioning logic
             )
         
         if not question or not question.strip() or question == "...":  # If question is empty or junk
+            # The reply never changes - its audio was synthesized at startup
+            audio_path = await run_in_threadpool(phrase_bank.get, "not_heard") if return_audio else None
             return JSONResponse(  # Return a "sorry" message
                 status_code=200,
                 content={
                     "status": "warning",
                     "question": "",
-                    "answer": "I didn't quite catch that. Could you please repeat your question?",
-                    "audio_path": None,
+                    "answer": Config.FIXED_PHRASES["not_heard"],
+                    "audio_path": audio_path,
                     "sources": [],
                     "num_sources": 0,
                     "used_retrieval": False,
@@ -268,74 +656,244 @@ async def ask_question(  # Define the questioning logic
                 }
             )
         
-        # Get answer from tutor agent
+        # Get answer from tutor agent (identical questions arriving together share one computation)
         logger.info(f"Processing question with tutor agent...")  # Log that AI Brain is thinking
-        start_time = time.time()  # Start thinking timer
-        
-        result = tutor_agent.ask(question, use_retrieval=use_retrieval)  # Ask the AI tutor for answer
-        answer = result["answer"]  # Get the answer text
-        
-        agent_time = time.time() - start_time  # Stop thinking timer
-        
-        # Generate audio response if requested
-        audio_path = None  # Placeholder for voice file path
-        synthesis_time = 0  # Timer for speaking
+        session_id = get_session_id(request, http_response)  # Which student's conversation this belongs to
+        coalesce_key = make_coalesce_key(
+            question, use_retrieval, return_audio, pipelined, ignore_history, session_id, audio_mode, audio_format,
+            tier.get("top_k"), tier.get("max_tokens")
+        )
+        cancel.check(skipped="llm_calls")  # Gone while we were transcribing
+        response, shared = await single_flight.run(
+            coalesce_key,
+            lambda work: run_in_threadpool(  # work: cancelled once every request sharing it is cancelled
+                answer_question, question, use_retrieval, return_audio, pipelined, ignore_history, session_id,
+                audio_mode, audio_format, work, top_k=tier.get("top_k"), max_tokens=tier.get("max_tokens")
+            ),
+            cancel=cancel
+        )
         
-        if return_audio:  # If user wants tutor to speak
-            logger.info("Generating audio response...")  # Log that we are preparing voice
-            start_time = time.time()  # Start timer
-            try:
-                audio_path = tts_engine.synthesize(answer, add_pauses=True)  # Turn answer text into voice
-                synthesis_time = time.time() - start_time  # Stop timer
-            except Exception as tts_err:  # If speaking failed
-                logger.error(f"TTS Synthesis failed: {tts_err}")  # Log failure
-                audio_path = None  # Clear path
+        # Another student's request did the work - remember it for this one too (unless it was this same conversation)
+        if shared and tutor_agent.memory_store and response["session_id"] != session_id:
+            tutor_agent.get_memory(session_id).add_interaction(
+                user_message=question,
+                assistant_response=response["answer"],
+                metadata={"num_sources": response["num_sources"], "coalesced": True}
+            )
         
-        return {  # Send everything back to the user
-            "status": "success",  # tag
-            "question": question,  # user's question
-            "answer": answer,  # tutor's answer
-            "audio_path": audio_path,  # path to hear the voice
-            "sources": result["sources"],  # parts of documents used
-            "num_sources": result["num_sources"],  # how many sources
-            "used_retrieval": result["used_retrieval"],  # did we search docs?
-            "used_memory": result["used_memory"],  # did we remember past chat?
-            "timing": {  # speed report card
-                "transcription_time": round(transcription_time, 2),
-                "agent_time": round(agent_time, 2),
-                "synthesis_time": round(synthesis_time, 2),
-                "total_time": round(transcription_time + agent_time + synthesis_time, 2)
-            }
-        }
+        response = dict(
+            response, question=question, coalesced=shared, session_id=session_id, request_id=request_id
+        )  # Copy - may be shared
+        timing = dict(response["timing"])
+        timing["transcription_time"] = round(transcription_time, 2)
+        timing["total_time"] = round(transcription_time + timing["agent_time"] + timing["synthesis_time"], 2)
+        if timing["time_to_first_audio"] is not None:  # Measured from when this request arrived
+            timing["time_to_first_audio"] = round(transcription_time + timing["time_to_first_audio"], 2)
+        timing["degraded"] = cancel.degraded + timing["degraded"]  # STT's (this request) + the shared answer's
+        timing["deadline_missed"] = deadline is not None and time.time() > deadline
+        timing["load_tier"] = tier["name"]
+        response["timing"] = timing
+        load_controller.record(timing)  # Feeds the controller's view of recent latencies
+        if audio_mode == "inline":  # Small clips travel with the answer - no second request for the audio
+            response.update(await run_in_threadpool(inline_audio, response["audio_path"], response["audio_segments"]))
+        stream = audio_streams.get(response["audio_stream"].rsplit("/", 1)[-1]) if response["audio_stream"] else None
+        if stream:  # Barge-in while the answer is still being spoken must reach it
+            spoken_later = True
+            stream.add_done_callback(lambda: requests_in_flight.unregister(cancel))
+        return response
         
+    except RequestCancelled:  # Client went away or asked us to stop - nothing was remembered
+        return JSONResponse(
+            status_code=499,  # "Client Closed Request"
+            content={"status": "cancelled", "request_id": request_id, "reason": cancel.reason},
+            headers={"X-Request-ID": request_id}
+        )
+    except STTOverloadedError as e:  # Every speech worker is busy and the queue is full - ask the client to retry
+        logger.warning(f"Rejected voice question: {e}")
+        raise HTTPException(status_code=503, detail="Speech recognition is busy, please retry", headers={"Retry-After": "1"})
     except Exception as e:  # Catch all backend errors
         logger.error(f"Error processing question: {e}")  # Log failure
         raise HTTPException(status_code=500, detail=str(e))  # Send error back
+    finally:
+        if watcher:
+            watcher.cancel()
+        if not spoken_later:
+            requests_in_flight.unregister(cancel)
+
+
+@app.post("/cancel/{request_id}")  # Define address for stopping a question (barge-in)
+async def cancel_request(request_id: str):
+    """
+    Cancel an in-flight /ask request: closes the LLM stream, drops queued speech and skips the memory update
+    """
+    if not requests_in_flight.cancel(request_id, "cancel_endpoint"):
+        raise HTTPException(status_code=404, detail="No such request in flight")
+    return {"status": "cancelled", "request_id": request_id}
+
+
+@app.websocket("/ws/transcribe")  # Define address for live transcription while the student speaks
+async def transcribe_stream(
+    websocket: WebSocket,
+    format: str = "pcm16",  # pcm16, float32 or opus (one packet per message)
+    sample_rate: int = 16000,  # Rate of pcm16/float32 audio
+    language: Optional[str] = None
+):
+    """
+    Stream microphone audio and receive transcripts while speaking
+    Binary messages carry audio; send {"type": "end"} (or pause for STT_PAUSE_THRESHOLD) to finish an utterance
+    """
+    await websocket.accept()
+    try:
+        decoder = AudioStreamDecoder(format, sample_rate)
+    except ValueError as e:  # Unknown format - tell the client why before closing
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1003)
+        return
+    
+    segmenter = SpeechSegmenter()
+    jobs: asyncio.Queue = asyncio.Queue()  # Closed segments and utterance ends, in order
+    worker = asyncio.create_task(transcribe_segments(websocket, jobs, language))
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):  # Audio: decode and look for pauses (cheap - stays on the event loop)
+                try:
+                    samples = decoder.decode(message["bytes"])
+                except Exception as e:  # A corrupt packet - drop it and keep listening
+                    logger.warning(f"Could not decode live audio message: {e}")
+                    metrics.increment("stt_stream_decode_errors")
+                    await websocket.send_json({"type": "error", "detail": f"Could not decode audio: {e}"})
+                    continue
+                events = segmenter.feed(samples)
+            elif message.get("text"):  # Control message
+                try:
+                    control = json.loads(message["text"])
+                except ValueError:
+                    control = {}
+                events = segmenter.flush() + [("end",)] if control.get("type") == "end" else []
+            else:
+                events = []
+            for event in events:
+                jobs.put_nowait((event, time.time()))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        worker.cancel()  # The client is gone - drop segments nobody will read
+
+
+async def transcribe_segments(websocket: WebSocket, jobs: asyncio.Queue, language: Optional[str]):  # One per connection
+    """
+    Transcribe segments one at a time as they close and push partial/final transcripts
+    """
+    parts = []  # Text of the current utterance so far
+    while True:
+        event, queued_at = await jobs.get()
+        try:
+            if event[0] == "segment":
+                _, audio, start, end = event
+                result = await run_in_threadpool(  # Earlier text as the prompt keeps spelling consistent
+                    (stt_pool or stt_engine).transcribe_audio, audio, language, " ".join(parts)
+                )
+                if result["transcript"]:
+                    parts.append(result["transcript"])
+                metrics.increment("stt_stream_segments")
+                metrics.observe("stt_stream_segment", result["transcription_time"])
+                await websocket.send_json({
+                    "type": "partial",
+                    "transcript": " ".join(parts),  # Everything heard so far
+                    "segment": {"start": start, "end": end, "text": result["transcript"]},
+                    "transcription_time": round(result["transcription_time"], 3)
+                })
+            else:  # Utterance finished - the transcript is ready as soon as the last segment is
+                final_latency = time.time() - queued_at
+                metrics.observe("stt_stream_final_latency", final_latency)
+                await websocket.send_json({
+                    "type": "final",
+                    "transcript": " ".join(parts),
+                    "final_latency": round(final_latency, 3)  # Seconds from end of speech to this message
+                })
+                parts = []
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # Keep the stream alive after a bad segment
+            logger.error(f"Live transcription failed: {e}")
+            try:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+            except Exception:
+                return
+
+
+@app.get("/phrases")  # Define address for listing the ready-made phrases
+async def list_phrases():
+    """Fixed phrases whose audio is pre-synthesized ("filler" picks a random thinking filler)"""
+    return {"phrases": dict(phrase_bank.phrases) if phrase_bank else {}, "fillers": len(Config.TTS_FILLER_PHRASES)}
+
+
+@app.get("/phrases/{name}")  # Define address for playing a ready-made phrase
+async def get_phrase(name: str):
+    """
+    Audio for a fixed phrase, e.g. /phrases/greeting, or /phrases/filler while an answer is being generated
+    """
+    if not phrase_bank:
+        raise HTTPException(status_code=503, detail="Text-to-speech not initialized")
+    path = await run_in_threadpool(phrase_bank.filler if name == "filler" else lambda: phrase_bank.get(name))
+    if path is None:
+        raise HTTPException(status_code=404, detail="Phrase not found")
+    return FileResponse(path, media_type="audio/mpeg", headers={"Cache-Control": "public, max-age=86400"})
+
+
+@app.get("/audio/stream/{stream_id}")  # Define address for listening to an answer while it is being spoken
+async def get_audio_stream(stream_id: str):
+    """
+    Stream an answer's MP3 as each sentence is synthesized (chunked transfer - playback starts after the first sentence)
+    """
+    stream = audio_streams.get(stream_id)
+    if stream is None:  # Unknown or expired
+        raise HTTPException(status_code=404, detail="Audio stream not found")
+    
+    return StreamingResponse(  # Sync generator - Starlette reads it in a worker thread
+        stream.iter_chunks(),
+        media_type="audio/mpeg",
+        headers={"Cache-Control": "no-store"}
+    )
 
 
 @app.get("/audio/{filename}")  # Define address for downloading voice clips
-async def get_audio(filename: str):  # Define voice delivery logic
+async def get_audio(filename: str, request: Request):  # Define voice delivery logic
     """
-    Retrieve generated audio file
+    Retrieve generated audio file (supports Range requests and If-None-Match)
     """
     audio_path = Config.AUDIO_OUTPUT_DIR / filename  # Find where the voice file is stored
     
     if not audio_path.exists():  # If file is missing
         raise HTTPException(status_code=404, detail="Audio file not found")  # Tell user
     
-    return FileResponse(  # Send the actual audio file back to browser
+    if tts_engine and tts_engine.cache:  # Audio that is being listened to stays in the cache
+        tts_engine.cache.touch(audio_path)
+    
+    headers = {"Cache-Control": "no-cache"}
+    match = CONTENT_ADDRESSED.fullmatch(filename)
+    if match:  # The name changes whenever the audio would - browsers and proxies may keep it forever
+        headers = {"ETag": f'"{match.group(1)}"', "Cache-Control": "public, max-age=31536000, immutable"}
+        if headers["ETag"] in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+    
+    return FileResponse(  # Send the actual audio file back to browser (Starlette answers Range requests itself)
         audio_path,
-        media_type="audio/mpeg",  # Tell browser it's an MP3 style file
-        filename=filename
+        media_type=AUDIO_MIME_TYPES.get(audio_path.suffix, "audio/mpeg"),  # MP3 or Ogg Opus
+        filename=filename,
+        headers=headers
     )
 
 
 @app.post("/clear-memory")  # Define address for resetting conversation
-async def clear_memory():  # Define resetting logic
-    """Clear conversation memory"""
+async def clear_memory(request: Request, http_response: Response):  # Define resetting logic
+    """Clear conversation memory (for the calling session only)"""
     try:
         if tutor_agent:  # If AI Brain is active
-            tutor_agent.clear_memory()  # Wipe out the chat history
+            tutor_agent.clear_memory(get_session_id(request, http_response))  # Wipe out this student's chat history
             return {"status": "success", "message": "Conversation memory cleared"}  # Log success
         else:
             raise HTTPException(status_code=500, detail="Tutor agent not initialized")
@@ -344,11 +902,11 @@ async def clear_memory():  # Define resetting logic
 
 
 @app.get("/conversation-summary")  # Define address for getting a chat recap
-async def get_conversation_summary():  # Define summary logic
-    """Get conversation summary"""
+async def get_conversation_summary(request: Request, http_response: Response):  # Define summary logic
+    """Get conversation summary (for the calling session only)"""
     try:
         if tutor_agent:  # If active
-            summary = tutor_agent.get_conversation_summary()  # Get a short version of chat
+            summary = tutor_agent.get_conversation_summary(get_session_id(request, http_response))  # This student's chat
             return summary  # Send to user
         else:
             raise HTTPException(status_code=500, detail="Tutor agent not initialized")
@@ -362,6 +920,8 @@ async def clear_index():  # Define deletion logic
     try:
         if vector_db_builder:  # If active
             vector_db_builder.clear_index()  # Wipe the searchable database
+            if tutor_agent:  # Answers built from the old documents are no longer valid
+                tutor_agent.clear_caches()
             return {"status": "success", "message": "Vector index cleared"}  # Success message
         else:
             raise HTTPException(status_code=500, detail="Vector DB not initialized")
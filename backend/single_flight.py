@@ -0,0 +1,93 @@
+"""
+Single Flight for EchoLearn AI - This file merges identical requests that arrive at the same time
+When a whole class asks the same question at once, only one answer is computed - Everyone shares it
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple  # Import types for organization
+import asyncio  # Import asyncio for sharing one running computation between requests
+import logging  # Import logging for tracking merged requests
+
+from metrics import metrics  # Import the shared performance-numbers registry
+from request_context import CancelToken, RequestCancelled  # Import cancellation of abandoned requests
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for single-flight
+
+
+class SingleFlight:  # Define the request coalescer
+    """Coalesce concurrent calls with the same key onto one in-flight computation"""
+
+    def __init__(self):  # Initialize the coalescer
+        """
+        Initialize Single Flight
+        """
+        # key -> (the computation currently running for it, its cancel token, the waiting requests' tokens)
+        self.inflight: Dict[Hashable, Tuple[asyncio.Task, CancelToken, List[Optional[CancelToken]]]] = {}
+        self.leaders = 0  # Requests that actually did the work
+        self.coalesced = 0  # Requests that waited for someone else's work
+
+    async def run(  # Run fn once per key, sharing the result with concurrent callers
+        self,
+        key: Hashable,
+        fn: Callable[[CancelToken], Awaitable[Any]],
+        cancel: Optional[CancelToken] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Run fn, or wait for an identical call already in flight
+        fn gets the computation's own cancel token, which fires only once every waiting request was cancelled
+        Returns (result, shared) where shared is True if another request did the work
+        Raises RequestCancelled as soon as this caller's cancel fires (the others keep waiting)
+        """
+        entry = self.inflight.get(key)
+        shared = entry is not None and not entry[1].cancelled  # A cancelled computation is not worth joining
+
+        if shared:  # Someone is already computing this exact answer - wait for it
+            task, work, waiters = entry
+            self.coalesced += 1
+            metrics.increment("coalesced_requests")
+            logger.info(f"Coalesced duplicate request ({len(self.inflight)} in flight)")
+        else:  # First one here - start the computation
+            self.leaders += 1
+            work = CancelToken(cancel.request_id, cancel.deadline) if cancel else CancelToken()  # Leader's deadline
+            waiters = []
+            task = asyncio.ensure_future(fn(work))  # Separate task: one caller disconnecting doesn't cancel it for others
+            self.inflight[key] = (task, work, waiters)
+            task.add_done_callback(lambda done, k=key: self._forget(k, done))
+
+        waiters.append(cancel)  # None = a caller that never cancels
+        if cancel is None:
+            # shield(): a cancelled caller stops waiting, but the shared work keeps going for the others
+            return await asyncio.shield(task), shared
+
+        loop = asyncio.get_running_loop()
+        stopped = loop.create_future()  # Resolved when this caller is cancelled
+
+        def on_cancel():
+            if all(waiter is not None and waiter.cancelled for waiter in waiters):  # Nobody left to answer
+                work.cancel(cancel.reason)
+            loop.call_soon_threadsafe(lambda: stopped.done() or stopped.set_result(None))
+
+        cancel.add_callback(on_cancel)
+        done, _ = await asyncio.wait({task, stopped}, return_when=asyncio.FIRST_COMPLETED)  # Never cancels task
+        if stopped in done:  # Cancelled (even if the answer happened to be ready too)
+            raise RequestCancelled(cancel.reason)
+        stopped.cancel()
+        return task.result(), shared
+
+    def _forget(self, key: Hashable, task: asyncio.Task):  # Called when a computation finishes
+        """Remove a finished computation so the next request starts fresh"""
+        entry = self.inflight.get(key)
+        if entry and entry[0] is task:
+            del self.inflight[key]
+        if not task.cancelled():
+            task.exception()  # Mark any error as seen (every waiter already received it)
+
+    def get_stats(self) -> Dict:  # Report for /metrics
+        """Get coalescing statistics"""
+        total = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self.inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0
+        }
@@ -3,17 +3,78 @@ Speech-to-Text for EchoLearn AI - This file handles hearing and understanding us
 Converts audio to text using Faster-Whisper - A very fast and accurate tool
 """
 
-from faster_whisper import WhisperModel  # Import the Faster-Whisper tool
+from faster_whisper import BatchedInferencePipeline, WhisperModel, decode_audio  # Import the Faster-Whisper tools
 from pathlib import Path  # Import Path for managing file locations
-from typing import Optional, Dict  # Import types for organization
+from typing import Optional, Dict, List, Tuple  # Import types for organization
+import bisect  # Import bisect to match batched segments back to their clip
+import json  # Import json for custom decoding profiles
+import threading  # Import threading to count transcriptions in progress
+from io import BytesIO  # Import BytesIO to decode uploads without touching the disk
+import numpy as np  # Import numpy for in-memory audio
 import logging  # Import logging for tracking processing
 import time  # Import time for measuring speed
 
 from config import Config  # Import project settings
+from metrics import metrics  # Import the shared registry to count profile usage
 
 logging.basicConfig(level=logging.INFO)  # Setup standard log reports
 logger = logging.getLogger(__name__)  # Create a logger for speech-to-text
 
+SAMPLE_RATE = 16000  # Whisper listens at 16 kHz mono
+FALLBACK_TEMPERATURES = [0.0, 0.2, 0.4, 0.6, 0.8, 1.0]  # Retried in order when a decode looks like a hallucination
+
+# Decoding profiles: cheaper search for short clips and busy moments, full search when there is time
+DECODING_PROFILES = {
+    "greedy": {"beam_size": 1, "temperature_fallback": False, "without_timestamps": True},
+    "beam3": {"beam_size": 3, "temperature_fallback": False, "without_timestamps": True},
+    "beam5": {"beam_size": 5, "temperature_fallback": True, "without_timestamps": False},  # The original settings
+}
+DECODING_PROFILES.update(json.loads(Config.STT_DECODING_PROFILES_JSON or "{}"))  # Add or override profiles
+
+
+def choose_profile(duration: Optional[float], queue_depth: int = 0) -> str:  # Pick how hard to search
+    """
+    Choose a decoding profile from the clip length and how many other transcriptions are waiting
+    (STT_DECODING_PROFILE other than "auto" always uses that profile)
+    """
+    if Config.STT_DECODING_PROFILE != "auto":
+        return Config.STT_DECODING_PROFILE
+    if queue_depth >= Config.STT_BUSY_QUEUE_DEPTH:  # Busy: everyone gets the fast profile so the queue drains
+        return Config.STT_PROFILE_FAST
+    if duration is not None and duration <= Config.STT_SHORT_CLIP_S:  # "yes", "what's next?" - nothing to search
+        return Config.STT_PROFILE_FAST
+    if queue_depth > 0:  # Others waiting: a little cheaper than the full search
+        return Config.STT_PROFILE_BALANCED
+    return Config.STT_PROFILE_ACCURATE
+
+
+def decoding_options(profile: str) -> Dict:  # Profile -> WhisperModel.transcribe arguments
+    """Translate a decoding profile into faster-whisper transcribe() keyword arguments"""
+    settings = DECODING_PROFILES[profile]
+    return {
+        "beam_size": settings["beam_size"],
+        "temperature": FALLBACK_TEMPERATURES if settings["temperature_fallback"] else 0.0,
+        "without_timestamps": settings["without_timestamps"],
+    }
+
+
+def trim_silence(audio: np.ndarray, threshold: float = 0.01, frame_ms: int = 30, padding_ms: int = 200) -> np.ndarray:
+    """
+    Cut leading and trailing silence (frames quieter than threshold RMS), keeping a little padding
+    """
+    frame = SAMPLE_RATE * frame_ms // 1000
+    usable = len(audio) - len(audio) % frame
+    if not usable:
+        return audio
+    frames = audio[:usable].reshape(-1, frame)
+    loud = np.flatnonzero(np.sqrt(np.mean(frames * frames, axis=1)) > threshold)  # Every frame at once
+    if not len(loud):  # Nothing but silence - let Whisper decide (it will return no text)
+        return audio
+    padding = padding_ms * SAMPLE_RATE // 1000
+    start = max(0, loud[0] * frame - padding)
+    end = min(len(audio), (loud[-1] + 1) * frame + padding)
+    return audio[start:end]
+
 
 class SpeechToText:  # Define the class for converting voice to text
     """Convert speech audio to text"""
@@ -22,19 +83,27 @@ class SpeechToText:  # Define the class for converting voice to text
         self,
         model_size: str = None,
         language: str = None,
-        device: str = "cpu"
+        device: str = "cpu",
+        cpu_threads: int = None,
+        num_workers: int = None
     ):
         """
         Initialize Speech-to-Text
+        cpu_threads / num_workers are CTranslate2's thread budget (0 threads = its own default)
         """
         self.model_size = model_size or Config.STT_MODEL  # Select the model size (tiny, small, base, etc.)
         self.language = language or Config.STT_LANGUAGE  # Select the default language
         self.device = device  # Choose to run on CPU or Graphics Card
+        self.cpu_threads = cpu_threads if cpu_threads is not None else Config.STT_CPU_THREADS  # Threads per transcription
+        self.num_workers = num_workers or Config.STT_NUM_WORKERS  # Transcriptions the model runs at once
 
         # Lazy loading: we do NOT load the model here (loading it at startup would
         # use a lot of memory before any voice request even arrives). The model is
         # loaded on the first transcription request instead — see _load_model().
         self.model = None  # Placeholder; the real model is loaded on demand
+        self.batch_pipeline = None  # Batched decoding over the same model (created with it)
+        self.in_flight = 0  # Transcriptions running right now (the load signal for choosing a profile)
+        self._lock = threading.Lock()
         logger.info(f"Speech-to-Text ready (model '{self.model_size}' will load on first use)")
 
     def _load_model(self):  # Load the Faster-Whisper model the first time it is actually needed
@@ -52,8 +121,11 @@ class SpeechToText:  # Define the class for converting voice to text
         self.model = WhisperModel(
             self.model_size,
             device=self.device,
-            compute_type=compute_type
+            compute_type=compute_type,
+            cpu_threads=self.cpu_threads,
+            num_workers=self.num_workers
         )
+        self.batch_pipeline = BatchedInferencePipeline(self.model)  # Shares the loaded weights
 
         load_time = time.time() - start_time  # Calculate how long loading took
         logger.info(f"Model loaded in {load_time:.2f} seconds")  # Log finish
@@ -61,7 +133,8 @@ class SpeechToText:  # Define the class for converting voice to text
     def transcribe(  # Main function to turn an audio file into text
         self,
         audio_path: str,
-        language: Optional[str] = None
+        language: Optional[str] = None,
+        profile: Optional[str] = None
     ) -> Dict:
         """
         Transcribe audio file to text
@@ -71,23 +144,136 @@ class SpeechToText:  # Define the class for converting voice to text
         if not audio_path.exists():  # If the audio file is missing
             raise FileNotFoundError(f"Audio file not found: {audio_path}")
 
-        self._load_model()  # Load the Whisper model on first use (lazy loading)
-
         logger.info(f"Transcribing: {audio_path.name}")  # Log processing start
-        start_time = time.time()  # Start the clock
-        
-        # Run the transcription process
-        language = language or self.language  # Use choice language or default
-        
-        # This function "listens" to the entire file
-        segments, info = self.model.transcribe(
-            str(audio_path),  # Path must be a string
-            language=language,  # Tell it what language to listen for
-            beam_size=5,  # Complexity of search (bigger is better but slower)
-            vad_filter=True,  # "Voice Activity Detection" - skip silence automatically
-            vad_parameters=dict(min_silence_duration_ms=Config.STT_MIN_SILENCE_DURATION_MS)
+        audio = decode_audio(str(audio_path), sampling_rate=SAMPLE_RATE)  # Decode first: the length picks the profile
+        
+        # "Voice Activity Detection" - skip silence automatically
+        return self.transcribe_audio(audio, language, vad_filter=True, profile=profile)
+    
+    def transcribe_bytes(  # Turn an uploaded recording into text without saving it
+        self,
+        data: bytes,
+        language: Optional[str] = None,
+        profile: Optional[str] = None,
+        queue_depth: Optional[int] = None
+    ) -> Dict:
+        """
+        Decode an uploaded recording (wav/webm/ogg/mp3...) in memory, trim silence and transcribe it
+        """
+        start_time = time.time()
+        audio, decode_info = self.decode_upload(data)
+        
+        result = self.transcribe_audio(  # Still skip pauses inside the question
+            audio, language, vad_filter=True, profile=profile, queue_depth=queue_depth
+        )
+        result.update(decode_info)
+        result["transcription_time"] = time.time() - start_time
+        return result
+    
+    def decode_upload(self, data: bytes) -> Tuple[np.ndarray, Dict]:  # Bytes -> trimmed waveform
+        """Decode an uploaded recording to 16 kHz float32 and trim leading/trailing silence"""
+        start_time = time.time()
+        audio = decode_audio(BytesIO(data), sampling_rate=SAMPLE_RATE)  # float32 mono 16 kHz
+        trimmed = trim_silence(audio)
+        return trimmed, {
+            "decode_time": time.time() - start_time,
+            "trimmed_seconds": (len(audio) - len(trimmed)) / SAMPLE_RATE
+        }
+    
+    def transcribe_batch(  # Several students' clips in one model call
+        self,
+        clips: List[np.ndarray],
+        language: Optional[str] = None,
+        profile: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Transcribe several 16 kHz clips (each at most 30 s) with one batched inference call
+        The clips are laid end to end and passed as clip_timestamps, so each one is a row of the batch
+        """
+        self._load_model()
+        start_time = time.time()
+        
+        starts, offset = [], 0
+        for clip in clips:
+            starts.append(offset / SAMPLE_RATE)
+            offset += len(clip)
+        ends = starts[1:] + [offset / SAMPLE_RATE]
+        profile = profile or choose_profile(max(len(clip) for clip in clips) / SAMPLE_RATE, len(clips) - 1)
+        options = decoding_options(profile)
+        
+        segments, info = self.batch_pipeline.transcribe(
+            np.concatenate(clips),
+            language=language or self.language,
+            beam_size=options["beam_size"],
+            temperature=options["temperature"],  # The batched pipeline only uses the first temperature
+            without_timestamps=options["without_timestamps"],
+            batch_size=len(clips),  # Everything in one forward pass
+            vad_filter=False,  # Each clip is already trimmed; the clip boundaries are the chunks
+            clip_timestamps=[{"start": start, "end": end} for start, end in zip(starts, ends)]
         )
         
+        per_clip = [[] for _ in clips]
+        for segment in segments:  # Segment times are positions in the joined audio
+            index = max(0, bisect.bisect_right(starts, segment.start + 0.001) - 1)
+            segment.start -= starts[index]
+            segment.end -= starts[index]
+            per_clip[index].append(segment)
+        
+        metrics.increment(f"stt_profile_{profile}", len(clips))
+        return [
+            dict(self._report(clip_segments, info.language, info.language_probability, end - start, start_time),
+                 profile=profile)
+            for clip_segments, start, end in zip(per_clip, starts, ends)
+        ]
+    
+    def transcribe_audio(  # Turn audio that is already in memory into text
+        self,
+        audio: np.ndarray,
+        language: Optional[str] = None,
+        initial_prompt: Optional[str] = None,
+        vad_filter: bool = False,
+        profile: Optional[str] = None,
+        queue_depth: Optional[int] = None
+    ) -> Dict:
+        """
+        Transcribe a 16 kHz mono float32 waveform (e.g. one speech segment from a live stream)
+        initial_prompt (the text heard so far) helps Whisper keep names and spelling consistent
+        profile is a DECODING_PROFILES name; by default it is chosen from the clip length and queue_depth
+        (the number of other transcriptions waiting, default: the ones running in this process)
+        """
+        self._load_model()
+        start_time = time.time()
+        
+        with self._lock:
+            if queue_depth is None:
+                queue_depth = self.in_flight
+            self.in_flight += 1
+        profile = profile or choose_profile(len(audio) / SAMPLE_RATE, queue_depth)
+        metrics.increment(f"stt_profile_{profile}")
+        
+        try:
+            segments, info = self.model.transcribe(
+                audio,
+                language=language or self.language,
+                vad_filter=vad_filter,  # Live-stream segments were already cut at pauses
+                vad_parameters=dict(min_silence_duration_ms=Config.STT_MIN_SILENCE_DURATION_MS) if vad_filter else None,
+                initial_prompt=initial_prompt or None,
+                **decoding_options(profile)  # Beam size, temperature fallback, timestamps
+            )
+            result = self._collect(segments, info, start_time)  # Decoding happens here (segments are lazy)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        
+        result["profile"] = profile
+        return result
+    
+    def _collect(self, segments, info, start_time: float) -> Dict:  # Run the lazy decoding and build the report
+        """Decode all segments and build the transcription result"""
+        return self._report(segments, info.language, info.language_probability, info.duration, start_time)
+    
+    def _report(self, segments, language: str, language_probability: float, duration: float, start_time: float) -> Dict:
+        """Build the transcription result from decoded segments"""
         # Collect the text from all the different parts of the recording
         transcript_parts = []
         all_segments = []
@@ -118,9 +304,9 @@ class SpeechToText:  # Define the class for converting voice to text
         
         return {  # Return the full report
             "transcript": transcript,  # The text user said
-            "language": info.language,  # The language detected
-            "language_probability": info.language_probability,  # Probability score of language
-            "duration": info.duration,  # Total audio length
+            "language": language,  # The language detected
+            "language_probability": language_probability,  # Probability score of language
+            "duration": duration,  # Total audio length
             "segments": all_segments,  # Detailed timestamps
             "avg_confidence": avg_confidence,  # Average certainty
             "transcription_time": transcription_time  # Processing speed
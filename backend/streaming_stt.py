@@ -0,0 +1,176 @@
+"""
+Streaming Speech-to-Text for EchoLearn AI - This file listens while the student is still talking
+Decodes live audio frames, cuts them into speech segments at pauses (VAD) - Each segment is transcribed as soon as it closes
+"""
+
+from typing import List, Optional, Tuple  # Import types for organization
+import numpy as np  # Import numpy for fast frame energy math
+import logging  # Import logging for tracking streams
+
+from config import Config  # Import project settings
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for streaming speech-to-text
+
+SAMPLE_RATE = 16000  # Whisper listens at 16 kHz mono
+FRAME_MS = 30  # VAD decides speech/silence per 30 ms frame
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+INPUT_FORMATS = ("pcm16", "float32", "opus")  # Raw 16-bit PCM, raw float32 PCM, or one Opus packet per message
+
+
+class AudioStreamDecoder:  # Turns whatever the client sends into 16 kHz float32 samples
+    """Decode streamed PCM16/float32 chunks or Opus packets to 16 kHz mono float32"""
+
+    def __init__(self, input_format: str = "pcm16", sample_rate: int = SAMPLE_RATE):  # Initialize the decoder
+        """
+        Initialize Audio Stream Decoder
+        sample_rate is the client's rate (Opus is always decoded at 48 kHz)
+        """
+        if input_format not in INPUT_FORMATS:
+            raise ValueError(f"Unsupported audio format '{input_format}' (use one of {', '.join(INPUT_FORMATS)})")
+        self.input_format = input_format
+        self.sample_rate = 48000 if input_format == "opus" else sample_rate
+        self._leftover = b""  # Half a sample left over from the previous chunk
+
+        self._codec = None
+        self._resampler = None
+        if input_format == "opus" or self.sample_rate != SAMPLE_RATE:
+            import av  # PyAV comes with faster-whisper; only needed for Opus or resampling
+            self._av = av
+            self._resampler = av.AudioResampler(format="flt", layout="mono", rate=SAMPLE_RATE)
+            if input_format == "opus":
+                self._codec = av.CodecContext.create("opus", "r")
+                self._codec.sample_rate = self.sample_rate
+                self._codec.layout = "mono"
+
+    def decode(self, data: bytes) -> np.ndarray:  # One WebSocket message -> samples
+        """Decode one chunk of audio into 16 kHz mono float32 samples"""
+        if self._codec is not None:  # Opus: one packet per message
+            frames = self._codec.decode(self._av.Packet(data))
+            return self._resample(frames)
+
+        data = self._leftover + data
+        width = 2 if self.input_format == "pcm16" else 4
+        usable = len(data) - len(data) % width
+        self._leftover = data[usable:]
+        if self.input_format == "pcm16":
+            samples = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768.0
+        else:
+            samples = np.frombuffer(data[:usable], dtype="<f4").astype(np.float32)
+
+        if self._resampler is None:  # Already 16 kHz
+            return samples
+        frame = self._av.AudioFrame.from_ndarray(samples.reshape(1, -1), format="flt", layout="mono")
+        frame.sample_rate = self.sample_rate
+        return self._resample([frame])
+
+    def _resample(self, frames) -> np.ndarray:
+        """Resample decoded frames to 16 kHz mono float32 (with proper low-pass filtering)"""
+        parts = [out.to_ndarray().reshape(-1) for frame in frames for out in self._resampler.resample(frame)]
+        return np.concatenate(parts).astype(np.float32) if parts else np.zeros(0, dtype=np.float32)
+
+
+class SpeechSegmenter:  # Voice activity detection on a live stream
+    """
+    Energy-based VAD that closes a speech segment after STT_MIN_SILENCE_DURATION_MS
+    of silence and ends the utterance after STT_PAUSE_THRESHOLD seconds of silence
+    """
+
+    def __init__(  # Initialize the segmenter
+        self,
+        min_silence_ms: int = None,
+        pause_threshold: float = None,
+        max_segment_s: float = None,
+        energy_ratio: float = None,
+        min_energy: float = None
+    ):
+        """
+        Initialize Speech Segmenter
+        """
+        self.min_silence_frames = max(1, (min_silence_ms or Config.STT_MIN_SILENCE_DURATION_MS) // FRAME_MS)
+        self.pause_frames = int((pause_threshold or Config.STT_PAUSE_THRESHOLD) * 1000 // FRAME_MS)
+        self.max_segment_frames = int((max_segment_s or Config.STT_STREAM_MAX_SEGMENT_S) * 1000 // FRAME_MS)
+        self.energy_ratio = energy_ratio or Config.STT_STREAM_VAD_RATIO  # Speech = this many times louder than the room
+        self.min_energy = min_energy or Config.STT_STREAM_VAD_MIN_RMS  # ...and at least this loud (RMS of -1..1 audio)
+        self.padding_frames = 300 // FRAME_MS  # Keep 300 ms around speech so word edges are not clipped
+
+        self.noise_floor: Optional[float] = None  # Running estimate of the room's background level
+        self._pending = np.zeros(0, dtype=np.float32)  # Samples not yet making up a whole frame
+        self._preroll: List[np.ndarray] = []  # Last few silent frames (become the segment's lead-in)
+        self._segment: List[np.ndarray] = []  # Frames of the open segment
+        self._speech_run = 0  # Consecutive speech frames (2 needed to start a segment)
+        self._silence_run = 0  # Consecutive silent frames inside/after speech
+        self._frames_seen = 0  # Frames processed since the stream started
+        self._segment_start = 0  # Frame index where the open segment starts
+        self.heard_speech = False  # Has this utterance had any speech yet?
+
+    def feed(self, samples: np.ndarray) -> List[Tuple]:  # Add audio, get back what happened
+        """
+        Process samples and return events:
+        ("segment", audio, start_s, end_s) when a speech segment closes,
+        ("end",) when the student has been silent for STT_PAUSE_THRESHOLD
+        """
+        audio = np.concatenate([self._pending, samples]) if len(self._pending) else samples
+        whole = len(audio) - len(audio) % FRAME_SAMPLES
+        self._pending = audio[whole:]
+        if not whole:
+            return []
+
+        frames = audio[:whole].reshape(-1, FRAME_SAMPLES)
+        energies = np.sqrt(np.mean(frames * frames, axis=1))  # RMS of every frame at once
+        events = []
+        for frame, energy in zip(frames, energies):
+            events.extend(self._step(frame, float(energy)))
+        return events
+
+    def _step(self, frame: np.ndarray, energy: float) -> List[Tuple]:  # One 30 ms frame
+        self._frames_seen += 1
+        if self.noise_floor is None:
+            self.noise_floor = energy
+        is_speech = energy > max(self.min_energy, self.noise_floor * self.energy_ratio)
+
+        if not is_speech:  # Only silence teaches us the room's level
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * energy
+
+        if not self._segment:  # Waiting for speech
+            self._preroll.append(frame)
+            del self._preroll[:-self.padding_frames]
+            self._speech_run = self._speech_run + 1 if is_speech else 0
+            if self._speech_run >= 2:  # Two loud frames in a row - someone is talking
+                self._segment = list(self._preroll)
+                self._segment_start = self._frames_seen - len(self._segment)
+                self._preroll = []
+                self._silence_run = 0
+                self.heard_speech = True
+                return []
+            if self.heard_speech and not is_speech:
+                self._silence_run += 1
+                if self._silence_run >= self.pause_frames:  # Long pause - the student finished
+                    self._silence_run = 0
+                    self.heard_speech = False
+                    return [("end",)]
+            return []
+
+        self._segment.append(frame)
+        self._silence_run = 0 if is_speech else self._silence_run + 1
+        if self._silence_run >= self.min_silence_frames or len(self._segment) >= self.max_segment_frames:
+            return [self._close()]
+        return []
+
+    def _close(self) -> Tuple:  # Turn the open segment into an event
+        """Close the open segment, trimming trailing silence down to the padding"""
+        trailing = max(0, self._silence_run - self.padding_frames)
+        frames = self._segment[:len(self._segment) - trailing] if trailing else self._segment
+        start = self._segment_start * FRAME_MS / 1000
+        end = start + len(frames) * FRAME_MS / 1000
+        self._segment = []
+        self._speech_run = 0
+        # Silence already counted toward the end-of-utterance pause keeps counting
+        return ("segment", np.concatenate(frames), start, end)
+
+    def flush(self) -> List[Tuple]:  # The client said it is done
+        """Close any open segment (call when the stream ends)"""
+        events = [self._close()] if self._segment else []
+        self.heard_speech = False
+        self._silence_run = 0
+        return events
@@ -0,0 +1,153 @@
+"""
+STT Batcher for EchoLearn AI - This file transcribes questions that arrive together in one model call
+Collects clips for a few milliseconds, runs them as one Whisper batch and hands each request its own result
+"""
+
+from typing import Dict, List, Optional  # Import types for organization
+import queue  # Import queue for handing clips to the batching thread
+import threading  # Import threading for the batching thread and per-request wake-ups
+import logging  # Import logging for tracking batches
+import time  # Import time for the collection window and latency
+
+import numpy as np  # Import numpy for audio arrays
+
+from config import Config  # Import project settings
+from metrics import LatencyTracker, metrics  # Import latency tracking for percentiles
+from speech_to_text import SAMPLE_RATE, SpeechToText, choose_profile  # Import the engine that does the actual work
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for the batcher
+
+MAX_BATCH_CLIP_S = 30  # Whisper's window; longer clips are transcribed on their own
+
+
+class _Job:  # One request waiting for its transcript
+    def __init__(self, audio: np.ndarray, language: Optional[str], profile: Optional[str] = None):
+        self.audio = audio
+        self.language = language
+        self.profile = profile  # Forced decoding profile (e.g. the fast one for a tight deadline)
+        self.queued_at = time.time()
+        self.done = threading.Event()
+        self.result: Optional[Dict] = None
+        self.error: Optional[Exception] = None
+
+
+class STTBatcher:  # Define the micro-batching scheduler in front of SpeechToText
+    """Group concurrent transcriptions into batched Whisper calls"""
+
+    def __init__(self, stt: SpeechToText, max_batch_size: int = None, max_wait_ms: int = None):  # Initialize the batcher
+        """
+        Initialize STT Batcher
+        """
+        self.stt = stt
+        self.max_batch_size = max_batch_size or Config.STT_BATCH_MAX_SIZE  # Most clips per model call
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else Config.STT_BATCH_MAX_WAIT_MS) / 1000  # Collection window
+        self.queue: "queue.Queue[_Job]" = queue.Queue()
+
+        self.latency = LatencyTracker()  # Request arrival -> transcript ready
+        self.queue_wait = LatencyTracker()  # Request arrival -> its batch starts
+        self.batches = 0
+        self.clips = 0
+        self.audio_seconds = 0.0  # Speech transcribed (for the real-time factor)
+        self.busy_seconds = 0.0  # Time spent inside model calls
+        self.batch_sizes: Dict[int, int] = {}  # size -> how many batches had it
+
+        self._worker = threading.Thread(target=self._run, name="stt-batcher", daemon=True)
+        self._worker.start()
+
+    def transcribe_bytes(  # Same contract as SpeechToText
+        self,
+        data: bytes,
+        language: Optional[str] = None,
+        profile: Optional[str] = None
+    ) -> Dict:
+        """Decode an upload in the calling thread, then wait for it to be transcribed in a batch"""
+        start_time = time.time()
+        audio, decode_info = self.stt.decode_upload(data)  # Decoding runs in parallel across requests
+        result = self.transcribe_audio(audio, language, profile)
+        result.update(decode_info)
+        result["transcription_time"] = time.time() - start_time
+        return result
+
+    def transcribe_audio(  # Blocks until done
+        self,
+        audio: np.ndarray,
+        language: Optional[str] = None,
+        profile: Optional[str] = None
+    ) -> Dict:
+        """Queue a 16 kHz clip and wait for its transcript"""
+        job = _Job(audio, language or self.stt.language, profile)
+        self.queue.put(job)
+        job.done.wait()
+        if job.error:
+            raise job.error
+        return job.result
+
+    def _run(self):  # Background thread: collect, batch, fan out
+        while True:
+            jobs = [self.queue.get()]  # Sleep until the first request arrives
+            deadline = jobs[0].queued_at + self.max_wait
+            while len(jobs) < self.max_batch_size:  # Give concurrent requests a moment to join
+                try:
+                    jobs.append(self.queue.get(timeout=max(0.0, deadline - time.time())))
+                except queue.Empty:
+                    break
+
+            groups: Dict[tuple, List[_Job]] = {}  # One batch shares its decoding options, so split by language/profile
+            for job in jobs:
+                groups.setdefault((job.language, job.profile), []).append(job)
+            for (language, profile), group in groups.items():
+                self._run_batch(language, group, profile)
+
+    def _run_batch(self, language: str, jobs: List[_Job], profile: Optional[str] = None):  # One model call (or one per over-long clip)
+        batchable = [job for job in jobs if len(job.audio) <= MAX_BATCH_CLIP_S * SAMPLE_RATE]
+        singles = [job for job in jobs if job not in batchable]
+        start = time.time()
+        for job in jobs:
+            self.queue_wait.record(start - job.queued_at)
+        depth = self.queue.qsize() + len(jobs) - 1  # Others waiting, for choosing the decoding profile
+
+        try:
+            if len(batchable) > 1:
+                longest = max(len(job.audio) for job in batchable) / SAMPLE_RATE
+                results = self.stt.transcribe_batch(
+                    [job.audio for job in batchable], language, profile=profile or choose_profile(longest, depth)
+                )
+                for job, result in zip(batchable, results):
+                    job.result = result
+            else:  # Nothing to batch with - the regular path (temperature fallback, inner VAD)
+                singles = batchable + singles
+            for job in singles:
+                job.result = self.stt.transcribe_audio(
+                    job.audio, language, vad_filter=True, profile=profile, queue_depth=depth
+                )
+        except Exception as e:  # Every request in the batch gets the error
+            logger.error(f"Batched transcription of {len(jobs)} clips failed: {e}")
+            for job in jobs:
+                if job.result is None:
+                    job.error = e
+
+        finished = time.time()
+        self.batches += 1
+        self.clips += len(jobs)
+        self.batch_sizes[len(jobs)] = self.batch_sizes.get(len(jobs), 0) + 1
+        self.audio_seconds += sum(len(job.audio) for job in jobs) / SAMPLE_RATE
+        self.busy_seconds += finished - start
+        metrics.observe("stt_batch", finished - start)
+        for job in jobs:
+            self.latency.record(finished - job.queued_at)
+            job.done.set()
+
+    def get_stats(self) -> Dict:  # Report for /metrics
+        """Get batching statistics (throughput and latency percentiles)"""
+        return {
+            "batches": self.batches,
+            "clips": self.clips,
+            "avg_batch_size": round(self.clips / self.batches, 2) if self.batches else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "clips_per_busy_second": round(self.clips / self.busy_seconds, 2) if self.busy_seconds else 0.0,
+            "realtime_factor": round(self.audio_seconds / self.busy_seconds, 2) if self.busy_seconds else 0.0,
+            "queue_depth": self.queue.qsize(),
+            "queue_wait": self.queue_wait.get_stats(),
+            "latency": self.latency.get_stats()
+        }
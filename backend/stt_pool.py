@@ -0,0 +1,183 @@
+"""
+STT Worker Pool for EchoLearn AI - This file runs speech recognition in separate worker processes
+Each worker holds its own preloaded Whisper model on its own cores - Long recordings never stall the API process
+"""
+
+from concurrent.futures import ProcessPoolExecutor  # Import the process pool (the local IPC channel)
+from concurrent.futures.process import BrokenProcessPool  # Import the error raised when a worker dies
+from typing import Dict, List, Optional  # Import types for organization
+import multiprocessing  # Import multiprocessing for the spawn context and the shared worker counter
+import os  # Import os for core counts and CPU pinning
+import threading  # Import threading to protect the admission counter
+import logging  # Import logging for tracking workers
+import time  # Import time for latency
+
+import numpy as np  # Import numpy for in-memory audio
+
+from config import Config  # Import project settings
+from metrics import LatencyTracker, metrics  # Import latency tracking for transcription times
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for the worker pool
+
+_worker_stt = None  # The model inside a worker process (set by _init_worker)
+
+
+class STTOverloadedError(Exception):  # Raised when too many transcriptions are already waiting
+    """The STT pool's queue is full (the server answers 503)"""
+
+
+def _init_worker(counter, core_sets: List[List[int]], cpu_threads: int, num_workers: int):  # Runs once per process
+    """Pin the worker to its cores and load its model before it accepts any work"""
+    global _worker_stt
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+
+    if core_sets and hasattr(os, "sched_setaffinity"):  # Linux only
+        cores = core_sets[index % len(core_sets)]
+        os.sched_setaffinity(0, cores)
+        logger.info(f"STT worker {index} pinned to cores {cores}")
+
+    from speech_to_text import SpeechToText  # Imported here: only worker processes load Whisper
+    _worker_stt = SpeechToText(cpu_threads=cpu_threads, num_workers=num_workers)
+    _worker_stt._load_model()
+
+
+def _ping() -> int:  # Used to start and warm every worker
+    time.sleep(0.2)  # Keep this worker busy so the next ping starts another process
+    return os.getpid()
+
+
+def _transcribe_bytes(data: bytes, language: Optional[str], profile: Optional[str], queue_depth: int) -> Dict:
+    return _worker_stt.transcribe_bytes(data, language, profile=profile, queue_depth=queue_depth)
+
+
+def _transcribe_audio(audio: np.ndarray, language: Optional[str], initial_prompt: Optional[str], queue_depth: int) -> Dict:
+    return _worker_stt.transcribe_audio(audio, language, initial_prompt, queue_depth=queue_depth)
+
+
+class STTWorkerPool:  # Define the pool the API process talks to
+    """Bounded queue in front of worker processes that each hold a Whisper model"""
+
+    def __init__(  # Initialize the pool
+        self,
+        processes: int = None,
+        cpu_threads: int = None,
+        max_pending: int = None,
+        pin_cores: bool = None
+    ):
+        """
+        Initialize STT Worker Pool
+        """
+        self.processes = processes or Config.STT_POOL_PROCESSES  # Worker processes (one model each)
+        available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        self.cpu_threads = cpu_threads or Config.STT_POOL_CPU_THREADS or max(1, len(available) // self.processes)
+        self.max_pending = max_pending or Config.STT_POOL_MAX_PENDING  # Admission limit
+        pin_cores = Config.STT_POOL_PIN_CORES if pin_cores is None else pin_cores
+
+        # Split the cores into one set per worker so workers never compete for the same core
+        self.core_sets = []
+        if pin_cores and len(available) >= self.processes * self.cpu_threads:
+            self.core_sets = [
+                available[i * self.cpu_threads:(i + 1) * self.cpu_threads] for i in range(self.processes)
+            ]
+
+        self.pending = 0  # Transcriptions queued or running
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0  # Turned away because the queue was full
+        self.failures = 0
+        self.restarts = 0  # Times the pool was rebuilt after a worker died
+        self.latency = LatencyTracker()
+        self.executor = self._start()
+
+    def _start(self) -> ProcessPoolExecutor:  # Create the worker processes
+        context = multiprocessing.get_context("spawn")  # Clean processes (no copied threads or locks)
+        return ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(context.Value("i", 0), self.core_sets, self.cpu_threads, Config.STT_NUM_WORKERS)
+        )
+
+    def warmup(self):  # Call at startup
+        """Start every worker and wait until each has loaded its model"""
+        start = time.time()
+        pids = {future.result() for future in [self.executor.submit(_ping) for _ in range(self.processes)]}
+        logger.info(
+            f"STT pool ready: {len(pids)} workers x {self.cpu_threads} threads in {time.time() - start:.1f}s"
+        )
+
+    def transcribe_bytes(  # Same contract as SpeechToText
+        self,
+        data: bytes,
+        language: Optional[str] = None,
+        profile: Optional[str] = None
+    ) -> Dict:
+        """Transcribe an uploaded recording in a worker (raises STTOverloadedError if the queue is full)"""
+        return self._call(_transcribe_bytes, data, language, profile)
+
+    def transcribe_audio(
+        self,
+        audio: np.ndarray,
+        language: Optional[str] = None,
+        initial_prompt: Optional[str] = None
+    ) -> Dict:
+        """Transcribe a 16 kHz waveform in a worker (raises STTOverloadedError if the queue is full)"""
+        return self._call(_transcribe_audio, audio, language, initial_prompt)
+
+    def _call(self, function, *args) -> Dict:  # Admission control + one round trip to a worker
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                metrics.increment("stt_pool_rejected")
+                raise STTOverloadedError(f"{self.pending} transcriptions already waiting")
+            queue_depth = max(0, self.pending + 1 - self.processes)  # Requests that cannot start right away
+            self.pending += 1
+        args += (queue_depth,)  # The worker picks a cheaper decoding profile when the queue is long
+
+        start = time.time()
+        try:
+            try:
+                result = self.executor.submit(function, *args).result()
+            except BrokenProcessPool:  # A worker crashed (e.g. out of memory) - rebuild the pool and retry once
+                self._restart()
+                result = self.executor.submit(function, *args).result()
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            with self._lock:
+                self.pending -= 1
+        self.completed += 1
+        self.latency.record(time.time() - start)
+        return result
+
+    def _restart(self):
+        """Replace a broken pool (concurrent callers share one restart)"""
+        with self._lock:
+            if not getattr(self.executor, "_broken", False):  # Someone else already restarted it
+                return
+            logger.error("STT worker died - restarting the pool")
+            self.restarts += 1
+            self.executor = self._start()
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict:  # Report for /metrics
+        """Get pool statistics"""
+        return {
+            "processes": self.processes,
+            "cpu_threads": self.cpu_threads,
+            "pinned_cores": self.core_sets or None,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failures": self.failures,
+            "restarts": self.restarts,
+            "latency": self.latency.get_stats()
+        }
@@ -0,0 +1,103 @@
+"""
+LLM Router Tests for EchoLearn AI - Checks hedging and failover against local stub servers
+No API keys needed: every provider is a stub OpenAI-compatible server on localhost
+Usage: cd backend && python -m unittest discover tests
+"""
+
+from pathlib import Path  # Import Path to find the backend folder
+import sys  # Import sys to make the backend modules importable
+import time  # Import time for measuring how long an answer took
+import unittest  # Import the standard-library test runner
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # Make backend modules importable
+
+from config import Config  # Import project settings
+from llm_router import LLMProvider, LLMRouter  # Import the router under test
+from benchmarks.stub_llm_server import REPLY, start_stub_server  # Import the fake LLM server
+
+MESSAGES = [{"role": "user", "content": "What is machine learning?"}]
+
+
+class LLMRouterTest(unittest.TestCase):
+    """Hedge and failover ordering with fast, slow and failing providers"""
+
+    def setUp(self):
+        self.saved = {
+            name: getattr(Config, name) for name in (
+                "LLM_HEDGE_ENABLED", "LLM_HEDGE_DEFAULT_DELAY_S", "LLM_HEDGE_MIN_DELAY_S", "LLM_BACKOFF_BASE_S"
+            )
+        }
+        Config.LLM_HEDGE_DEFAULT_DELAY_S = 0.3  # Hedge quickly so the tests stay short
+        Config.LLM_HEDGE_MIN_DELAY_S = 0.1
+        Config.LLM_BACKOFF_BASE_S = 0.05
+        self.servers = []
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            setattr(Config, name, value)
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def provider(self, name: str, **options) -> LLMProvider:  # A provider backed by its own stub server
+        server = start_stub_server(0, **options)
+        self.servers.append(server)
+        return LLMProvider(name, "stub", "stub-model", f"http://127.0.0.1:{server.server_address[1]}/v1")
+
+    def router(self, providers, hedging: bool) -> LLMRouter:
+        Config.LLM_HEDGE_ENABLED = hedging
+        return LLMRouter(providers)
+
+    def test_hedge_answers_when_primary_is_slow(self):
+        slow = self.provider("slow", first_token_ms=3000)
+        fast = self.provider("fast", first_token_ms=50)
+        router = self.router([slow, fast], hedging=True)
+
+        start = time.time()
+        answer = router.complete(MESSAGES, max_tokens=5)
+
+        self.assertEqual(answer, " ".join(REPLY.split(" ")[:5]))
+        self.assertLess(time.time() - start, 2.0)  # Did not wait for the slow primary
+        self.assertEqual((router.hedges_fired, router.hedges_won), (1, 1))
+        # The loser's wait counts as a lower bound, so its hedge delay cannot drift down
+        self.assertEqual(slow.first_token_latency.count, 1)
+        self.assertGreaterEqual(slow.first_token_latency.percentile(50), 0.3)
+
+    def test_primary_answers_before_hedge_delay(self):
+        primary = self.provider("primary", first_token_ms=20)
+        secondary = self.provider("secondary", first_token_ms=20)
+        router = self.router([primary, secondary], hedging=True)
+
+        router.complete(MESSAGES, max_tokens=3)
+
+        self.assertEqual(router.hedges_fired, 0)
+        self.assertEqual(primary.first_token_latency.count, 1)
+        self.assertEqual(secondary.first_token_latency.count, 0)
+
+    def test_failover_follows_provider_order(self):
+        first = self.provider("first", first_token_ms=10, error_rate=1.0, error_status=500)
+        second = self.provider("second", first_token_ms=10, error_rate=1.0, error_status=503)
+        third = self.provider("third", first_token_ms=10)
+        router = self.router([first, second, third], hedging=False)
+
+        answer = router.complete(MESSAGES, max_tokens=3)
+
+        self.assertEqual(answer, " ".join(REPLY.split(" ")[:3]))
+        self.assertEqual((first.failures, second.failures, third.failures), (1, 1, 0))
+        self.assertEqual(router.failovers, 2)
+        self.assertEqual(third.first_token_latency.count, 1)
+
+    def test_rate_limited_primary_goes_last(self):
+        limited = self.provider("limited", first_token_ms=10, error_rate=1.0, error_status=429)
+        backup = self.provider("backup", first_token_ms=10)
+        router = self.router([limited, backup], hedging=False)
+
+        router.complete(MESSAGES, max_tokens=3)
+
+        self.assertEqual(limited.failures, 1)
+        self.assertTrue(limited.is_cooling_down())  # Retry-After was honoured
+        self.assertEqual([p.name for p in router._ordered_providers()], ["backup", "limited"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,16 +4,26 @@ Converts text to natural-sounding speech audio - So the AI "talks" to you
 """
 
 from pathlib import Path  # Import Path for managing file and folder locations
-from typing import Optional  # Import types for organization
+from typing import Dict, Iterator, Optional, List  # Import types for organization
+from concurrent.futures import ThreadPoolExecutor, wait  # Import a worker pool for speaking sentences in the background
 import logging  # Import logging for tracking sound generation
-import time  # Import time for naming files and measuring speed
+import os  # Import os for atomically moving finished files into place
+import threading  # Import threading because pipeline segments finish on several workers
+import time  # Import time for measuring speed
+import uuid  # Import uuid for temporary file names
 from openai import OpenAI  # Import OpenAI client (works for their high-quality voices)
 
 from config import Config  # Import project settings
+from audio_encoder import encode, transcode  # Import the in-memory MP3/Opus encoder for local voices
+from tts_cache import TTSCache  # Import the content-addressed audio store
+from parallel_tts import ParallelSynthesizer  # Import the sentence-group fan-out for long answers
+from request_context import record_saved  # Import the counter of work skipped by cancellations
 
 logging.basicConfig(level=logging.INFO)  # Setup standard log reports
 logger = logging.getLogger(__name__)  # Create a logger for text-to-speech
 
+AUDIO_FORMATS = ("mp3", "opus")  # Opus (in Ogg) is much smaller at speech bitrates - good for mobile data
+
 
 class TextToSpeech:  # Define the class for converting text into voice
     """Convert text to speech audio"""
@@ -22,7 +32,9 @@ class TextToSpeech:  # Define the class for converting text into voice
         self,
         provider: str = None,
         voice: str = None,
-        speed: float = None
+        speed: float = None,
+        use_cache: bool = True,
+        parallel: bool = True
     ):
         """
         Initialize Text-to-Speech
@@ -38,6 +50,13 @@ class TextToSpeech:  # Define the class for converting text into voice
         # Initialize the specific tool for the chosen company
         self._initialize_tts()
         
+        # Identical text is only synthesized once; the folder is kept under TTS_CACHE_MAX_MB
+        self.cache = TTSCache(self.output_dir) if use_cache and Config.TTS_CACHE_ENABLED else None
+        
+        # Long answers are split into sentence groups that are synthesized at the same time
+        parallel = parallel and Config.TTS_PARALLEL_ENABLED and self.provider in Config.TTS_PARALLEL_PROVIDERS
+        self.parallel = ParallelSynthesizer(self) if parallel else None
+        
         logger.info(f"TextToSpeech initialized with {self.provider} provider")
     
     def _initialize_tts(self):  # Internal function to connect to the voice provider
@@ -53,6 +72,7 @@ class TextToSpeech:  # Define the class for converting text into voice
             # gTTS is simple and doesn't need a special connection setup
             from gtts import gTTS
             self.gtts = gTTS
+            self.model = f"gtts-{Config.STT_LANGUAGE}"  # The language picks the voice
             
         elif self.provider == "coqui":  # If user chose local computer voices (Advanced)
             # Coqui TTS runs entirely on your machine
@@ -60,6 +80,8 @@ class TextToSpeech:  # Define the class for converting text into voice
                 from TTS.api import TTS
                 model_name = Config.get_tts_model()
                 self.tts_model = TTS(model_name)  # Load the heavy voice model
+                self.model = model_name
+                self.sample_rate = self.tts_model.synthesizer.output_sample_rate  # Rate of the returned waveform
                 logger.info(f"Loaded Coqui TTS model: {model_name}")
             except ImportError:
                 raise ImportError(
@@ -68,17 +90,20 @@ class TextToSpeech:  # Define the class for converting text into voice
         else:
             raise ValueError(f"Unsupported TTS provider: {self.provider}")
     
-    def synthesize(  # Main function to turn text into an MP3 file
+    def synthesize(  # Main function to turn text into an MP3 (or Opus) file
         self,
         text: str,
         output_filename: Optional[str] = None,
-        add_pauses: bool = True
+        add_pauses: bool = True,
+        audio_format: str = "mp3"
     ) -> str:
         """
         Convert text to speech and save as audio file
         """
         if not text or not text.strip():  # If there is no text to say
             raise ValueError("Text cannot be empty")
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(f"Unsupported audio format: {audio_format}")
         
         logger.info(f"Synthesizing speech ({len(text)} chars) using {self.provider}")
         start_time = time.time()  # Start the timer
@@ -87,37 +112,127 @@ class TextToSpeech:  # Define the class for converting text into voice
         if add_pauses:
             text = self._add_teaching_pauses(text)
         
-        # Create a unique filename if none was provided (using current time)
+        # Without a filename the file is named after its content, so identical text is only spoken once
+        cached = output_filename is None and self.cache is not None
         if output_filename is None:
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            output_filename = f"tts_{timestamp}.mp3"
+            output_filename = self._cache_path(text, audio_format).name
         
-        # Ensure the filename ends with .mp3
-        if not output_filename.endswith('.mp3'):
-            output_filename += '.mp3'
+        # Ensure the filename ends with the format's extension
+        if not output_filename.endswith(f'.{audio_format}'):
+            output_filename += f'.{audio_format}'
         
         output_path = self.output_dir / output_filename  # Full path to the file
+        if cached and self.cache.lookup(output_path):  # Already spoken - reuse the file
+            logger.info(f"Speech served from cache: {output_path.name}")
+            return str(output_path)
+        
+        # Write under a temporary name and move it into place, so a concurrent request for the
+        # same text never reads a half-written file
+        temp_path = output_path.with_name(f"{output_path.stem}.{uuid.uuid4().hex[:8]}{output_path.suffix}")
         
         # Use the chosen provider to actually make the sound
-        if self.provider == "openai":
-            self._synthesize_openai(text, output_path)
+        written_format = audio_format
+        if (
+            self.parallel and len(text) >= Config.TTS_PARALLEL_MIN_CHARS
+            and self.parallel.synthesize(text, temp_path)
+        ):
+            written_format = "mp3"  # Long text - sentence groups were synthesized side by side and joined
+        elif self.provider == "openai":
+            self._synthesize_openai(text, temp_path, audio_format)
         elif self.provider == "gtts":
-            self._synthesize_gtts(text, output_path)
+            self._synthesize_gtts(text, temp_path)
+            written_format = "mp3"  # Google only speaks MP3
         elif self.provider == "coqui":
-            self._synthesize_coqui(text, output_path)
+            self._synthesize_coqui(text, temp_path, audio_format)
+        
+        if written_format != audio_format:  # Convert in memory (e.g. gTTS MP3 -> Opus)
+            temp_path.write_bytes(transcode(temp_path.read_bytes(), audio_format))
+        
+        os.replace(temp_path, output_path)
         
         synthesis_time = time.time() - start_time  # Calculate how long it took
+        if cached:
+            self.cache.record(output_path, synthesis_time)
         logger.info(f"Speech synthesis complete in {synthesis_time:.2f}s: {output_path.name}")
         
-        return str(output_path)  # Return the path to the finished MP3 file
+        return str(output_path)  # Return the path to the finished audio file
+    
+    def _cache_path(self, text: str, audio_format: str = "mp3") -> Path:  # Content-addressed file for spoken text
+        key = TTSCache.key(self.provider, self.model, self.voice, self.speed, text, audio_format)
+        return self.output_dir / f"tts_{key}.{audio_format}"
+    
+    def audio_path_for(self, text: str, add_pauses: bool = True, audio_format: str = "mp3") -> Path:
+        """Content-addressed path where synthesize() puts the audio for this text (it may not exist yet)"""
+        return self._cache_path(self._add_teaching_pauses(text) if add_pauses else text, audio_format)
+    
+    def synthesize_stream(self, text: str, add_pauses: bool = True) -> Iterator[bytes]:  # Bytes as they are made
+        """
+        Yield MP3 bytes while the provider is still producing them (the finished file is also cached)
+        """
+        if not text or not text.strip():
+            raise ValueError("Text cannot be empty")
+        if add_pauses:
+            text = self._add_teaching_pauses(text)
+        
+        output_path = self._cache_path(text)
+        if self.cache is not None and self.cache.lookup(output_path):  # Already spoken - stream the file
+            yield from self._read_chunks(output_path)
+            return
+        
+        start_time = time.time()
+        temp_path = output_path.with_name(f"{output_path.stem}.{uuid.uuid4().hex[:8]}.mp3")
+        try:
+            with open(temp_path, "wb") as f:  # Keep a copy so the next request for this text is a cache hit
+                if self.provider == "openai":
+                    chunks = self._stream_openai(text)
+                elif self.provider == "gtts":
+                    chunks = self._stream_gtts(text)
+                else:  # Coqui produces the whole waveform at once - send it as soon as it is encoded
+                    chunks = [self._synthesize_bytes(text)]
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+        except BaseException:  # Failed or abandoned halfway - never cache a partial file
+            temp_path.unlink(missing_ok=True)
+            raise
+        os.replace(temp_path, output_path)
+        if self.cache is not None:
+            self.cache.record(output_path, time.time() - start_time)
+    
+    def _synthesize_bytes(self, text: str, audio_format: str = "mp3") -> bytes:  # Straight to memory (no file)
+        """Synthesize text and return the MP3 bytes (Coqui can also encode Opus directly)"""
+        if self.provider == "coqui":
+            waveform = self.tts_model.tts(text=text)  # Float samples at self.sample_rate
+            return encode(waveform, self.sample_rate, audio_format)
+        chunks = self._stream_openai(text) if self.provider == "openai" else self._stream_gtts(text)
+        return b"".join(chunks)
+    
+    def _read_chunks(self, path) -> Iterator[bytes]:  # Stream an existing file
+        with open(path, "rb") as f:
+            yield from iter(lambda: f.read(Config.TTS_STREAM_CHUNK_BYTES), b"")
+    
+    def _stream_openai(self, text: str) -> Iterator[bytes]:  # OpenAI sends audio while it is still generating
+        with self.client.audio.speech.with_streaming_response.create(
+            model=self.model,
+            voice=self.voice,
+            input=text,
+            speed=self.speed,
+            response_format="mp3"
+        ) as response:
+            yield from response.iter_bytes(chunk_size=Config.TTS_STREAM_CHUNK_BYTES)
+    
+    def _stream_gtts(self, text: str) -> Iterator[bytes]:  # gTTS fetches long text in parts - yield each one
+        tts = self.gtts(text=text, lang=Config.STT_LANGUAGE, slow=False if self.speed >= 1.0 else True)
+        yield from tts.stream()
     
-    def _synthesize_openai(self, text: str, output_path: Path):  # Helper for OpenAI synthesis
+    def _synthesize_openai(self, text: str, output_path: Path, audio_format: str = "mp3"):  # Helper for OpenAI
         """Synthesize using OpenAI TTS"""
         response = self.client.audio.speech.create(  # Ask OpenAI to generate audio
             model=self.model,
             voice=self.voice,
             input=text,
-            speed=self.speed
+            speed=self.speed,
+            response_format=audio_format  # OpenAI encodes Opus itself
         )
         
         # Save the audio data sent back by OpenAI into our local file
@@ -132,22 +247,10 @@ class TextToSpeech:  # Define the class for converting text into voice
         )
         tts.save(str(output_path))  # Save to local file
     
-    def _synthesize_coqui(self, text: str, output_path: Path):  # Helper for local synthesis
+    def _synthesize_coqui(self, text: str, output_path: Path, audio_format: str = "mp3"):  # Helper for local synthesis
         """Synthesize using Coqui TTS"""
-        # Note: Coqui usually makes .wav files, which are larger than .mp3
-        wav_path = output_path.with_suffix('.wav')
-        self.tts_model.tts_to_file(text=text, file_path=str(wav_path))  # Generate WAV
-        
-        # If the user really wants an MP3, we try to convert it
-        if output_path.suffix == '.mp3':
-            try:
-                from pydub import AudioSegment
-                audio = AudioSegment.from_wav(str(wav_path))
-                audio.export(str(output_path), format='mp3')
-                wav_path.unlink()  # Delete the original large WAV file
-            except ImportError:
-                logger.warning("pydub not available for MP3 conversion, keeping WAV")
-                return str(wav_path)
+        # The waveform is encoded in memory and written once (no temporary WAV, no ffmpeg process)
+        output_path.write_bytes(self._synthesize_bytes(text, audio_format))
     
     def _add_teaching_pauses(self, text: str) -> str:  # Helper to make AI sound like a tutor
         """
@@ -173,6 +276,12 @@ class TextToSpeech:  # Define the class for converting text into voice
         """
         return self.synthesize(text, add_pauses=True)  # Currently just uses standard synthesis
     
+    def start_pipeline(self, audio_format: str = "mp3") -> "SentencePipeline":  # Speak an answer sentence by sentence
+        """
+        Start a pipelined synthesis that speaks sentences as they are submitted
+        """
+        return SentencePipeline(self, audio_format)
+    
     def get_available_voices(self) -> list:  # Show which voice names are allowed
         """Get list of available voices for current provider"""
         if self.provider == "openai":
@@ -184,6 +293,78 @@ class TextToSpeech:  # Define the class for converting text into voice
         return []
 
 
+class SentencePipeline:  # Speaks sentences in the background while the AI keeps writing
+    """Synthesize answer sentences in order while the LLM is still generating"""
+    
+    def __init__(self, tts: TextToSpeech, audio_format: str = "mp3"):  # Initialize the pipeline for one answer
+        """
+        Initialize Sentence Pipeline
+        """
+        self.tts = tts  # The voice engine that does the actual work
+        self.audio_format = audio_format  # Format of every segment file
+        self.executor = ThreadPoolExecutor(max_workers=Config.TTS_PIPELINE_WORKERS)  # Background speakers
+        self.futures = []  # One pending result per sentence, kept in order
+        self.first_audio_time: Optional[float] = None  # When the first sentence became playable
+        self.cancelled = False  # Set on barge-in/disconnect - remaining sentences are not spoken
+        self._finished: Dict[int, bool] = {}  # index -> produced audio, for segments done out of order
+        self._next = 0  # First segment not finished yet (playback can only start from the front)
+        self._lock = threading.Lock()
+    
+    def submit(self, sentence: str):  # Queue one sentence for speaking
+        """
+        Queue a sentence for synthesis (returns immediately)
+        """
+        if not sentence or not sentence.strip():  # Nothing to say
+            return
+        if self.cancelled:
+            record_saved("tts_segments")
+            return
+        index = len(self.futures)  # Position of this sentence in the answer
+        self.futures.append(self.executor.submit(self._synthesize_segment, sentence, index))
+    
+    def _synthesize_segment(self, sentence: str, index: int) -> Optional[str]:  # Speak one sentence
+        """Synthesize one sentence, returning its audio path (None if it failed)"""
+        if self.cancelled:  # Started just as the pipeline was cancelled
+            record_saved("tts_segments")
+            return None
+        path = None
+        try:
+            path = self.tts.synthesize(sentence, add_pauses=True, audio_format=self.audio_format)  # Named by content - repeated sentences are free
+        except Exception as e:  # One bad sentence should not silence the whole answer
+            logger.error(f"Segment {index} synthesis failed: {e}")
+        
+        with self._lock:  # Audio is playable once every segment before it is done (workers finish out of order)
+            self._finished[index] = path is not None
+            while self._next in self._finished:
+                if self._finished.pop(self._next) and self.first_audio_time is None:
+                    self.first_audio_time = time.time()
+                self._next += 1
+        return path
+    
+    def finish(self, timeout: Optional[float] = None) -> Optional[List[str]]:  # Wait for every sentence and return the files in order
+        """
+        Wait for all queued sentences and return their audio paths in answer order
+        Returns None if they are not all spoken within timeout seconds (the rest is dropped)
+        """
+        _, pending = wait(self.futures, timeout=timeout)
+        if pending:  # Out of time - half an answer is worse than none
+            for future in pending:
+                future.cancel()
+            self.executor.shutdown(wait=False)  # Sentences already being spoken finish in the background (and are cached)
+            return None
+        paths = [None if future.cancelled() else future.result() for future in self.futures]  # In submit order
+        self.executor.shutdown(wait=True)  # Release the background workers
+        return [path for path in paths if path]  # Drop sentences that failed
+    
+    def cancel(self):  # The student interrupted or went away
+        """Stop speaking: drop queued sentences (the ones being synthesized right now still finish)"""
+        if self.cancelled:
+            return
+        self.cancelled = True
+        dropped = sum(1 for future in self.futures if future.cancel())  # Only not-yet-started ones cancel
+        record_saved("tts_segments", dropped)
+
+
 if __name__ == "__main__":  # Code for manual testing
     # Example usage
     try:
@@ -0,0 +1,103 @@
+"""
+Token Counter for EchoLearn AI - This file measures text the way the AI model does
+Counts tokens with a real tokenizer (tiktoken or a HuggingFace tokenizer) - Keeps prompts inside a budget
+"""
+
+from typing import Dict, List  # Import types for organization
+import threading  # Import threading so the tokenizer is only loaded once
+import logging  # Import logging for tracking tokenizer loading
+
+from config import Config  # Import project settings
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for the token counter
+
+
+class TokenCounter:  # Define the class that counts tokens
+    """Count tokens with the configured tokenizer (falls back to ~4 chars per token)"""
+
+    _encoder = None  # Shared tokenizer (loaded once for the whole process)
+    _encoder_kind = None  # "hf", "tiktoken" or "chars"
+    _lock = threading.Lock()  # Protect the one-time loading
+
+    def __init__(self):  # Initialize the counter
+        """
+        Initialize Token Counter
+        """
+        self._load_encoder()  # Make sure the shared tokenizer is ready
+
+    @classmethod
+    def _load_encoder(cls):  # Load the tokenizer the first time anyone needs it
+        """Load the tokenizer once (HuggingFace model if configured, else tiktoken)"""
+        if cls._encoder_kind is not None:  # Already loaded
+            return
+
+        with cls._lock:
+            if cls._encoder_kind is not None:  # Another thread finished loading while we waited
+                return
+
+            if Config.TOKENIZER_HF_MODEL:  # Exact tokenizer of the LLM (e.g. a Llama tokenizer repo)
+                try:
+                    from transformers import AutoTokenizer
+                    cls._encoder = AutoTokenizer.from_pretrained(Config.TOKENIZER_HF_MODEL)
+                    cls._encoder_kind = "hf"
+                    logger.info(f"Token counter using HuggingFace tokenizer: {Config.TOKENIZER_HF_MODEL}")
+                    return
+                except Exception as e:
+                    logger.warning(f"Could not load tokenizer {Config.TOKENIZER_HF_MODEL}: {e}")
+
+            try:
+                import tiktoken
+                cls._encoder = tiktoken.get_encoding(Config.TOKENIZER_ENCODING)
+                cls._encoder_kind = "tiktoken"
+                logger.info(f"Token counter using tiktoken encoding: {Config.TOKENIZER_ENCODING}")
+            except Exception as e:  # Not installed (or encoding files unavailable) - estimate instead
+                logger.warning(f"tiktoken not available ({e}), estimating 4 characters per token")
+                cls._encoder = None
+                cls._encoder_kind = "chars"
+
+    def count(self, text: str) -> int:  # Count tokens in one string
+        """Count the tokens in a text"""
+        if not text:
+            return 0
+        if self._encoder_kind == "tiktoken":
+            return len(self._encoder.encode(text, disallowed_special=()))
+        if self._encoder_kind == "hf":
+            return len(self._encoder.encode(text, add_special_tokens=False))
+        return max(1, len(text) // 4)  # Rough math: 4 characters per token
+
+    def count_messages(self, messages: List[Dict]) -> int:  # Count a whole chat request
+        """Count tokens of chat messages including the per-message overhead"""
+        # Chat formats wrap every message in a few special tokens (role markers, separators)
+        return sum(self.count(message["content"]) + 4 for message in messages) + 2
+
+    def truncate(self, text: str, max_tokens: int) -> str:  # Cut text down to a token limit
+        """Truncate text to at most max_tokens, preferring to cut at a sentence end"""
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+
+        if self._encoder_kind == "tiktoken":
+            cut = self._encoder.decode(self._encoder.encode(text, disallowed_special=())[:max_tokens])
+        elif self._encoder_kind == "hf":
+            cut = self._encoder.decode(self._encoder.encode(text, add_special_tokens=False)[:max_tokens])
+        else:
+            cut = text[:max_tokens * 4]
+
+        last_stop = max(cut.rfind(". "), cut.rfind("\n"))  # Prefer ending on a whole sentence
+        if last_stop > len(cut) // 2:
+            cut = cut[:last_stop + 1]
+        return cut.strip()
+
+    @property
+    def kind(self) -> str:  # Which tokenizer is in use
+        """Name of the tokenizer backend in use"""
+        return self._encoder_kind
+
+
+if __name__ == "__main__":  # Code for manual testing
+    counter = TokenCounter()
+    sample = "Machine learning is a way for computers to learn from examples."
+    print(f"Tokenizer: {counter.kind}")
+    print(f"'{sample}' -> {counter.count(sample)} tokens")
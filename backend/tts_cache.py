@@ -0,0 +1,161 @@
+"""
+TTS Cache for EchoLearn AI - This file makes sure the same sentence is never spoken twice
+Names audio files by a hash of everything that affects the sound and keeps the audio folder under a size limit
+"""
+
+from pathlib import Path  # Import Path for managing audio files
+from typing import Dict  # Import types for organization
+import hashlib  # Import hashlib for content-addressed file names
+import os  # Import os for file times
+import re  # Import re for normalizing text
+import threading  # Import threading for the background sweeper
+import logging  # Import logging for tracking evictions
+import time  # Import time for eviction ages
+
+from config import Config  # Import project settings
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for the TTS cache
+
+
+def normalize_text(text: str) -> str:  # Whitespace differences do not change the speech
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class TTSCache:  # Define the content-addressed audio store
+    """Content-addressed audio files with least-recently-used eviction by total size"""
+
+    def __init__(  # Initialize the cache
+        self,
+        output_dir: Path = None,
+        max_mb: float = None,
+        min_age_seconds: int = None,
+        sweep_interval: int = None
+    ):
+        """
+        Initialize TTS Cache
+        """
+        self.output_dir = Path(output_dir or Config.AUDIO_OUTPUT_DIR)  # The folder being managed
+        self.max_bytes = int((max_mb or Config.TTS_CACHE_MAX_MB) * 1024 * 1024)  # Size limit for the folder
+        # Files younger than this are never evicted (a student may not have downloaded them yet)
+        self.min_age = min_age_seconds if min_age_seconds is not None else Config.TTS_CACHE_MIN_AGE_SECONDS
+        self.sweep_interval = sweep_interval or Config.TTS_CACHE_SWEEP_INTERVAL_SECONDS
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.hits = 0  # Sentences served from disk
+        self.misses = 0  # Sentences that had to be synthesized
+        self.synthesis_time = 0.0  # Seconds spent synthesizing misses (to estimate time saved)
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.pinned = set()  # Files that are never evicted (pre-rendered phrases)
+        self.size = sum(path.stat().st_size for path in self.output_dir.iterdir() if path.is_file())  # Running estimate
+
+        self._wake = threading.Event()  # Set to sweep early (the folder went over its limit)
+        self._sweeper = threading.Thread(target=self._run, name="tts-cache-sweeper", daemon=True)
+        self._sweeper.start()
+
+    @staticmethod
+    def key(provider: str, model: str, voice: str, speed: float, text: str, audio_format: str = "mp3") -> str:
+        """Hash of everything that changes the audio"""
+        content = "\x1f".join([provider, str(model), str(voice), f"{speed:.2f}", audio_format, normalize_text(text)])
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+
+    def lookup(self, path: Path) -> bool:  # Is this audio already on disk?
+        """Return True (and mark the file recently used) if the audio was already synthesized"""
+        hit = self.touch(path)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return hit
+
+    def touch(self, path: Path) -> bool:  # Mark a file recently used (also called when it is downloaded)
+        """Bump the file's modification time, the clock used for least-recently-used eviction"""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def pin(self, path):  # Keep a file regardless of the size limit
+        """Exclude a file from eviction"""
+        with self._lock:
+            self.pinned.add(Path(path).name)
+
+    def record(self, path: Path, synthesis_time: float):  # A new file was written
+        """Count a freshly synthesized file towards the folder size"""
+        try:
+            size = Path(path).stat().st_size
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self.size += size
+            self.synthesis_time += synthesis_time
+            over_limit = self.size > self.max_bytes
+        if over_limit:
+            self._wake.set()  # Do not wait for the next scheduled sweep
+
+    def sweep(self) -> int:  # Delete the least recently used files until the folder fits
+        """Evict the oldest files until the folder is under its size limit, returning how many were removed"""
+        files = []
+        for path in self.output_dir.iterdir():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # Deleted while we were listing
+                continue
+            if path.is_file():
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+
+        removed = 0
+        now = time.time()
+        for mtime, size, path in sorted(files, key=lambda item: item[0]):  # Least recently used first
+            if total <= self.max_bytes:
+                break
+            if now - mtime < self.min_age:  # Everything after this is newer still
+                break
+            if path.name in self.pinned:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+            with self._lock:
+                self.evictions += 1
+                self.evicted_bytes += size
+
+        with self._lock:
+            self.size = total  # Resynchronize with what is actually on disk
+        if removed:
+            logger.info(f"TTS cache evicted {removed} files, {total / 1024 / 1024:.1f} MB left")
+        return removed
+
+    def _run(self):  # Background thread: sweep on a schedule or when the folder grows too big
+        while True:
+            self._wake.wait(timeout=self.sweep_interval)
+            self._wake.clear()
+            try:
+                self.sweep()
+            except Exception as e:  # Never let the sweeper die
+                logger.error(f"TTS cache sweep failed: {e}")
+
+    def get_stats(self) -> Dict:  # Report for /metrics
+        """Get hit rate, size and eviction statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            average_synthesis = self.synthesis_time / self.misses if self.misses else 0.0
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "estimated_seconds_saved": round(self.hits * average_synthesis, 2),
+                "size_mb": round(self.size / 1024 / 1024, 2),
+                "max_mb": round(self.max_bytes / 1024 / 1024, 2),
+                "pinned": len(self.pinned),
+                "evictions": self.evictions,
+                "evicted_mb": round(self.evicted_bytes / 1024 / 1024, 2)
+            }
@@ -3,14 +3,21 @@ Tutor Agent for EchoLearn AI - This is the "brain" of our application
 Main RAG-based tutor that combines retrieval, LLM, and memory - It coordinates everything
 """
 
-from typing import Optional, Dict  # Import types for organization
-from openai import OpenAI  # Import OpenAI client (works for both GPT and Groq)
+from typing import Optional, Dict, List, Callable, Iterator  # Import types for organization
 import logging  # Import logging for tracking the brain's thoughts
+import time  # Import time for measuring how long answers take
 
 from config import Config  # Import our project settings
 from retriever import DocumentRetriever  # Import the tool that finds relevant document parts
 from prompt import TutorPrompts  # Import the instruction templates for the AI
-from memory import ConversationMemory  # Import the tool that remembers past chat
+from memory import ConversationMemory, SessionMemoryStore  # Import the tools that remember past chat
+from memory_db import SQLiteMemoryBackend  # Import the durable (SQLite) conversation storage
+from memory_summarizer import MemorySummarizer  # Import the background writer of running summaries
+from sentence_segmenter import SentenceSegmenter  # Import the tool that cuts streamed answers into sentences
+from answer_cache import AnswerCache, PromptCache  # Import the caches that remember earlier answers
+from token_counter import TokenCounter  # Import the tool that measures prompts in LLM tokens
+from llm_router import LLMRouter  # Import the tool that spreads requests across AI companies
+from request_context import CancelToken, RequestCancelled, record_saved  # Import cancellation of abandoned requests
 
 logging.basicConfig(level=logging.INFO)  # Setup standard log reports
 logger = logging.getLogger(__name__)  # Create a logger for the tutor agent
@@ -32,8 +39,25 @@ class TutorAgent:  # Define the main AI Brain class
         # Initialize the retriever (the tool that looks through our PDFs)
         self.retriever = retriever or DocumentRetriever()
         
-        # Initialize memory (the tool that remembers what we just said)
-        self.memory = ConversationMemory() if use_memory else None
+        # Initialize memory (the tool that remembers what we just said) - one conversation per student session
+        self.memory_store = None
+        if use_memory:
+            # Optional durable storage: the store then acts as a hot cache in front of SQLite
+            backend = SQLiteMemoryBackend() if Config.MEMORY_BACKEND == "sqlite" else None
+            summarizer = None
+            if Config.MEMORY_MODE == "summary":  # Fold trimmed turns into a summary with a small, cheap LLM call
+                summarizer = MemorySummarizer(lambda messages: self.router.complete(
+                    messages, max_tokens=Config.MEMORY_SUMMARY_MAX_TOKENS, temperature=0.2,
+                    session_id="memory-summarizer"  # Own fair-queue lane so summaries never jump ahead of students
+                ))
+            self.memory_store = SessionMemoryStore(backend=backend, summarizer=summarizer)
+        
+        # Initialize the caches (so repeated questions skip the LLM entirely)
+        self.answer_cache = AnswerCache() if Config.ANSWER_CACHE_ENABLED else None
+        self.prompt_cache = PromptCache()  # Exact-match cache for simplify/examples prompts
+        
+        # Token counter for keeping prompts inside the budget
+        self.token_counter = TokenCounter()
         
         # Initialize the AI Model (LLM) based on what the user chose (OpenAI or Groq)
         self.llm_provider = Config.LLM_PROVIDER
@@ -42,47 +66,69 @@ class TutorAgent:  # Define the main AI Brain class
         logger.info(f"TutorAgent initialized with {self.llm_provider} LLM")  # Log startup
     
     def _initialize_llm(self):  # Internal function to setup the connection to the AI company
-        """Initialize the LLM based on configured provider"""
-        if self.llm_provider == "openai":  # If using OpenAI (ChatGPT)
-            if not Config.OPENAI_API_KEY:  # Check if key is missing
-                raise ValueError("OpenAI API key not found in configuration")  # Error if so
-            
-            self.client = OpenAI(api_key=Config.OPENAI_API_KEY)  # Connect to OpenAI
-            self.model = Config.get_llm_model()  # Use the model from config (e.g. gpt-4)
-            
-        elif self.llm_provider == "groq":  # If using Groq (super fast AI)
-            if not Config.GROQ_API_KEY:  # Check if key is missing
-                raise ValueError("Groq API key not found in configuration")  # Error if so
-            
-            # Groq uses the exact same software tool as OpenAI (OpenAI-compatible)
-            self.client = OpenAI(
-                api_key=Config.GROQ_API_KEY,
-                base_url="https://api.groq.com/openai/v1"  # Just point it to Groq's web address
-            )
-            self.model = Config.get_llm_model()  # Use the model from config (eg. llama-3.1)
-            
-        else:  # If the user chose something we don't support
-            raise ValueError(f"Unsupported LLM provider: {self.llm_provider}")
+        """Initialize the LLM router (primary provider plus any configured fallbacks)"""
+        # Every provider speaks the OpenAI protocol, so the router just holds one client per provider
+        # and picks whichever answers first / doesn't fail (ValueError if the primary has no key)
+        self.router = LLMRouter()
+        self.client = self.router.primary.client  # The primary connection (kept for readiness checks)
+        self.model = self.router.primary.model  # Use the model from config (e.g. gpt-4 or llama-3.1)
     
     def ask(  # The main function to talk to the tutor
         self,
         question: str,
         use_retrieval: bool = True,
-        top_k: Optional[int] = None
+        top_k: Optional[int] = None,
+        on_sentence: Optional[Callable[[str], None]] = None,
+        ignore_history: bool = False,
+        session_id: str = "default",
+        cancel: Optional[CancelToken] = None,
+        max_tokens: Optional[int] = None,
+        audio_format: Optional[str] = None
     ) -> Dict:
         """
         Ask a question to the tutor
+        If on_sentence is given, the answer is streamed and each finished sentence is passed to it
+        session_id picks the student's own conversation memory (and their turn in the LLM queue)
+        If cancel fires, the LLM stream is closed and RequestCancelled is raised (nothing is remembered)
+        If cancel has a deadline, retrieval and answer length shrink to fit the time left
+        max_tokens lowers LLM_MAX_TOKENS (e.g. shorter answers under load)
+        audio_format is the format the caller speaks in - cached audio in another format is not reused
         """
+        cancel = cancel or CancelToken()  # A token nobody cancels keeps the checks below simple
+        narrowed = top_k is not None and top_k < Config.RETRIEVAL_TOP_K  # Fewer chunks asked for (e.g. under load)
         logger.info(f"Processing question: '{question[:50]}...'")  # Log the start of the question
+        memory = self.get_memory(session_id)  # This student's conversation
+        
+        # Only questions that don't depend on earlier chat can be answered from the cache
+        history_free = ignore_history or not memory or not memory.get_history()
+        use_cache = self.answer_cache is not None and history_free
+        query_embedding = self.retriever.embed_query(question) if use_cache else None  # Reused by the search
+        
+        # Get chat history first (remember what we said 5 minutes ago) - it shares the token budget
+        chat_history = "" if ignore_history else self._get_chat_history(memory)
+        history_tokens = self.token_counter.count(chat_history)
+        context_budget = max(0, Config.PROMPT_TOKEN_BUDGET - history_tokens)  # Whatever history left over
         
         # Retrieve relevant context (find the right page in the PDF)
         context = ""  # Start with no document info
         sources = []  # Start with no sources list
         
+        remaining = cancel.remaining()  # Running late? Search less (or not at all) to leave time for the answer
+        if use_retrieval and remaining is not None and self.retriever.is_ready():
+            if remaining < Config.DEADLINE_RETRIEVAL_SKIP_MS / 1000:
+                use_retrieval = False
+                cancel.degrade("retrieval_skipped")
+            elif remaining < Config.DEADLINE_RETRIEVAL_REDUCE_MS / 1000:
+                top_k = min(top_k or Config.RETRIEVAL_TOP_K, Config.DEADLINE_REDUCED_TOP_K)
+                cancel.degrade("retrieval_reduced")
+        
         if use_retrieval and self.retriever.is_ready():  # If search is ON and we have documents
+            cancel.check(skipped="retrievals")
             retrieval_result = self.retriever.retrieve_with_context(  # Search the database
                 question,
-                top_k=top_k
+                top_k=top_k,
+                query_embedding=query_embedding,
+                token_budget=context_budget
             )
             context = retrieval_result["context"]  # Get the combined text from the documents
             sources = retrieval_result["results"]  # Get a list of which chunks were found
@@ -90,13 +136,14 @@ class TutorAgent:  # Define the main AI Brain class
         else:
             logger.info("Skipping retrieval (disabled or retriever not ready)")  # Log that we skip search
         
-        # Get chat history (remember what we said 5 minutes ago)
-        chat_history = ""
-        if self.memory:  # If memory is ON
-            chat_history = self.memory.get_formatted_history(  # Get the last few messages
-                num_turns=3,  # Include last 3 turns for context
-                format="chat"
-            )
+        # Check the answer cache (same kind of question about the same document parts)
+        if use_cache:
+            chunk_ids = tuple(source["chunk_id"] for source in sources)
+            generation = self.retriever.get_generation()
+            cached = self.answer_cache.lookup(query_embedding, chunk_ids, generation)
+            if cached:
+                cancel.check(skipped="memory_updates" if memory else None)
+                return self._answer_from_cache(question, cached, sources, memory, on_sentence, audio_format)
         
         # Choose the right instructions (prompt) for the AI brain
         if chat_history and context:  # Best case: we have both history AND document info
@@ -118,18 +165,55 @@ class TutorAgent:  # Define the main AI Brain class
         else:  # Fallback: just ask the question directly to the AI
             user_prompt = f"Please answer this question: {question}"
         
+        # Measure the full request the way the AI company will bill it
+        prompt_tokens = self.token_counter.count_messages([
+            {"role": "system", "content": TutorPrompts.get_system_prompt()},
+            {"role": "user", "content": user_prompt}
+        ])
+        logger.info(f"Prompt size: {prompt_tokens} tokens (history {history_tokens})")
+        
         # Generate the actually answer using the AI (GPT-4 or Llama-3)
+        cache_key = None  # Set once a fresh answer is stored in the cache
+        spoken: List[str] = []  # Sentences already handed to on_sentence (the student may be hearing them)
+        cancel.check(skipped="llm_calls")
         try:
-            response = self._generate_response(user_prompt)  # Send instructions to the AI company
+            generation_start = time.time()  # Start the LLM timer (its duration is what a cache hit saves)
+            max_tokens = self._max_tokens(cancel, max_tokens)  # Shorter answers when the deadline is close
+            if on_sentence:  # Pipelined mode: hand out sentences while the AI is still writing
+                response = self._generate_sentences(
+                    user_prompt, lambda sentence: (spoken.append(sentence), on_sentence(sentence)),
+                    session_id, cancel, max_tokens
+                )
+            else:  # Normal mode: wait for the whole answer
+                response = self._generate_response(user_prompt, session_id, cancel, max_tokens)  # Send instructions to the AI company
             logger.info(f"Generated response ({len(response)} chars)")  # Log when done
             
+            # Remember the answer for the next student who asks (not one cut short for a deadline or under load)
+            full_quality = not cancel.degraded and not narrowed and max_tokens >= Config.LLM_MAX_TOKENS
+            if use_cache and response and full_quality:
+                cache_key = self.answer_cache.store(
+                    query_embedding, chunk_ids, generation, response, time.time() - generation_start
+                )
+            
+        except RequestCancelled:  # Nobody is listening - no apology, no cache entry, no memory
+            record_saved("llm_streams")
+            if memory:
+                record_saved("memory_updates")
+            logger.info(f"Generation cancelled ({cancel.reason})")
+            raise
         except Exception as e:  # If the AI company is down or errors happened
             logger.error(f"Error generating response: {e}")  # Log the error
-            response = "I apologize, but I encountered an error processing your question. Please try again."
+            apology = Config.FIXED_PHRASES["error"]  # Pre-synthesized at startup, so its audio is instant
+            response = " ".join(spoken + [apology])  # Keep the text in step with what was already spoken
+            if on_sentence:  # Still give the listener something to say
+                on_sentence(apology)
+        
+        # A student who went away never heard this turn, so it is not part of the conversation
+        cancel.check(skipped="memory_updates" if memory else None)
         
         # Save this interaction to memory (so we remember it for the NEXT question)
-        if self.memory:
-            self.memory.add_interaction(
+        if memory:
+            memory.add_interaction(
                 user_message=question,
                 assistant_response=response,
                 metadata={"num_sources": len(sources)}
@@ -142,10 +226,97 @@ class TutorAgent:  # Define the main AI Brain class
             "sources": sources,  # Which document parts were used
             "num_sources": len(sources),  # How many sources
             "used_memory": chat_history != "",  # Did we use history?
-            "used_retrieval": use_retrieval and len(sources) > 0  # Did we use documents?
+            "used_retrieval": use_retrieval and len(sources) > 0,  # Did we use documents?
+            "cached": False,  # Freshly generated
+            "cache_key": cache_key,  # Lets the server attach the spoken audio to the cached answer
+            "prompt_tokens": prompt_tokens  # Size of the prompt sent to the AI
         }
     
-    def _generate_response(self, prompt: str) -> str:  # Internal helper to actually call the AI
+    def get_memory(self, session_id: str = "default") -> Optional[ConversationMemory]:  # Find a student's memory
+        """Get the conversation memory for a session (None if memory is off)"""
+        return self.memory_store.get(session_id) if self.memory_store else None
+    
+    def _get_chat_history(self, memory: Optional[ConversationMemory]) -> str:  # Fetch history that fits its budget share
+        """
+        Get recent chat history, using at most HISTORY_TOKEN_SHARE of the prompt budget
+        """
+        if not memory:  # If memory is OFF
+            return ""
+        
+        history_budget = memory.prompt_budget
+        # Every kept turn (plus the running summary, if any), dropping the oldest until it fits
+        chat_history = memory.get_formatted_history(num_turns=memory.max_turns, format="chat", token_budget=history_budget)
+        if chat_history or not memory.get_history():
+            return chat_history
+        
+        # Even the latest turn alone is too long - keep its beginning
+        latest = memory.get_formatted_history(num_turns=1, format="chat")
+        return self.token_counter.truncate(latest, history_budget)
+    
+    def _answer_from_cache(  # Build the report card for a cache hit
+        self,
+        question: str,
+        cached: Dict,
+        sources: list,
+        memory: Optional[ConversationMemory],
+        on_sentence: Optional[Callable[[str], None]] = None,
+        audio_format: Optional[str] = None
+    ) -> Dict:
+        """
+        Build the ask() result for a cached answer
+        """
+        response = cached["answer"]
+        has_audio = self.answer_cache.audio_available(cached, audio_format)  # May be cleaned up or in another format
+        
+        if on_sentence and not has_audio:  # Pipelined caller still needs sentences to speak
+            for sentence in SentenceSegmenter.split(response):
+                on_sentence(sentence)
+        
+        if memory:  # The student did ask, so it still belongs in the conversation
+            memory.add_interaction(
+                user_message=question,
+                assistant_response=response,
+                metadata={"num_sources": len(sources), "cached": True}
+            )
+        
+        return {
+            "answer": response,
+            "question": question,
+            "sources": sources,
+            "num_sources": len(sources),
+            "used_memory": False,  # Cached answers never depend on history
+            "used_retrieval": len(sources) > 0,
+            "cached": True,
+            "cache_key": cached["id"],
+            "cache_similarity": round(cached["similarity"], 4),
+            "cached_audio_path": cached["audio_path"] if has_audio else None,
+            "cached_audio_segments": cached["audio_segments"] if has_audio else [],
+            "prompt_tokens": 0  # No prompt was sent
+        }
+    
+    def _max_tokens(self, cancel: CancelToken, limit: Optional[int] = None) -> int:  # Answer length that still fits the deadline
+        """
+        limit (default LLM_MAX_TOKENS), or fewer when the time left (minus the first-token wait and
+        what later stages reserved) would not be enough to generate that many tokens
+        """
+        limit = min(limit or Config.LLM_MAX_TOKENS, Config.LLM_MAX_TOKENS)
+        remaining = cancel.remaining()
+        if remaining is None:  # No deadline
+            return limit
+        seconds = remaining - cancel.reserved - self.router.expected_first_token()
+        tokens = max(Config.DEADLINE_MIN_TOKENS, int(seconds * Config.DEADLINE_LLM_TOKENS_PER_SECOND))
+        if tokens >= limit:
+            return limit
+        cancel.degrade("max_tokens_capped")
+        return tokens
+    
+    def _generate_response(  # Internal helper to actually call the AI
+        self,
+        prompt: str,
+        session_id: str = "default",
+        cancel: Optional[CancelToken] = None,
+        max_tokens: Optional[int] = None
+    ) -> str:
         """
         Generate response using configured LLM
         """
@@ -155,38 +326,93 @@ class TutorAgent:  # Define the main AI Brain class
             {"role": "user", "content": prompt}  # Give it the question and context
         ]
         
-        # Send the request over the internet to OpenAI/Groq
-        response = self.client.chat.completions.create(
-            model=self.model,  # The model name
-            messages=messages,  # The conversation contents
+        # Send the request over the internet to OpenAI/Groq (the router hedges and fails over)
+        response = self.router.complete(
+            messages,  # The conversation contents
             temperature=Config.LLM_TEMPERATURE,  # How creative to be
-            max_tokens=Config.LLM_MAX_TOKENS  # How long the answer can be
+            max_tokens=max_tokens or Config.LLM_MAX_TOKENS,  # How long the answer can be
+            session_id=session_id,  # Whose turn it is if we have to queue for the rate limit
+            cancel=cancel  # Closes the stream if the student goes away
         )
         
         # Return only the text reply from the AI
-        return response.choices[0].message.content.strip()
+        return response
+    
+    def _stream_response(  # Internal helper to stream the AI reply
+        self,
+        prompt: str,
+        session_id: str = "default",
+        cancel: Optional[CancelToken] = None,
+        max_tokens: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        Stream response text pieces from the configured LLM as they are generated
+        """
+        messages = [
+            {"role": "system", "content": TutorPrompts.get_system_prompt()},
+            {"role": "user", "content": prompt}
+        ]
+        
+        # Ask the AI company to send the answer piece by piece
+        yield from self.router.stream(
+            messages,
+            temperature=Config.LLM_TEMPERATURE,
+            max_tokens=max_tokens or Config.LLM_MAX_TOKENS,
+            session_id=session_id,
+            cancel=cancel
+        )
+    
+    def _generate_sentences(
+        self,
+        prompt: str,
+        on_sentence: Callable[[str], None],
+        session_id: str = "default",
+        cancel: Optional[CancelToken] = None,
+        max_tokens: Optional[int] = None
+    ) -> str:  # Stream + split
+        """
+        Stream the response and call on_sentence for every completed sentence
+        """
+        segmenter = SentenceSegmenter()  # Cuts the stream into speakable sentences
+        pieces = []  # Everything received, to build the full answer
+        
+        for delta in self._stream_response(prompt, session_id, cancel, max_tokens):
+            pieces.append(delta)
+            for sentence in segmenter.feed(delta):  # Hand out each sentence as soon as it is complete
+                on_sentence(sentence)
+        
+        remainder = segmenter.flush()  # The last sentence may have no ending punctuation
+        if remainder:
+            on_sentence(remainder)
+        
+        return "".join(pieces).strip()
     
-    def simplify_explanation(self, text: str) -> str:  # Special tool to make things easier
+    def simplify_explanation(self, text: str, session_id: str = "default") -> str:  # Special tool to make things easier
         """
         Simplify a complex explanation
         """
         prompt = TutorPrompts.format_simplify_prompt(text)  # Get "simplify" instructions
         
+        cache_key = PromptCache.make_key(self.model, prompt)  # Same text -> same simplification
+        cached = self.prompt_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         messages = [
             {"role": "system", "content": TutorPrompts.get_system_prompt()},
             {"role": "user", "content": prompt}
         ]
         
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
+        answer = self.router.complete(
+            messages,
             temperature=Config.LLM_TEMPERATURE,
-            max_tokens=Config.LLM_MAX_TOKENS
+            max_tokens=Config.LLM_MAX_TOKENS,
+            session_id=session_id
         )
-        
-        return response.choices[0].message.content.strip()
+        self.prompt_cache.put(cache_key, answer)
+        return answer
     
-    def generate_examples(self, concept: str, num_examples: int = 2) -> str:  # Tools to give examples
+    def generate_examples(self, concept: str, num_examples: int = 2, session_id: str = "default") -> str:  # Tools to give examples
         """
         Generate examples for a concept
         """
@@ -198,32 +424,51 @@ class TutorAgent:  # Define the main AI Brain class
         
         prompt = TutorPrompts.format_example_prompt(concept, context, num_examples)  # Get "example" instructions
         
+        cache_key = PromptCache.make_key(self.model, prompt)  # Same concept and context -> same examples
+        cached = self.prompt_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         messages = [
             {"role": "system", "content": TutorPrompts.get_system_prompt()},
             {"role": "user", "content": prompt}
         ]
         
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
+        answer = self.router.complete(
+            messages,
             temperature=Config.LLM_TEMPERATURE,
-            max_tokens=Config.LLM_MAX_TOKENS
+            max_tokens=Config.LLM_MAX_TOKENS,
+            session_id=session_id
         )
-        
-        return response.choices[0].message.content.strip()
+        self.prompt_cache.put(cache_key, answer)
+        return answer
     
-    def clear_memory(self):  # Function to forget the chat history
+    def clear_memory(self, session_id: str = "default"):  # Function to forget one student's chat history
         """Clear conversation memory"""
-        if self.memory:  # If memory is active
-            self.memory.clear_history()  # Wipe history
-            logger.info("Memory cleared")  # Log action
+        if self.memory_store:  # If memory is active
+            self.memory_store.clear(session_id)  # Wipe history
+            logger.info(f"Memory cleared for session {session_id}")  # Log action
+    
+    def clear_caches(self):  # Function to forget cached answers (e.g. after the documents changed)
+        """Clear the answer and prompt caches"""
+        if self.answer_cache:
+            self.answer_cache.clear()
+        self.prompt_cache.clear()
+    
+    def get_cache_stats(self) -> Dict:  # Function to report how well the caches work
+        """Get answer/prompt cache statistics"""
+        return {
+            "answer_cache": self.answer_cache.get_stats() if self.answer_cache else {"enabled": False},
+            "prompt_cache": self.prompt_cache.get_stats()
+        }
     
-    def get_conversation_summary(self) -> Dict:  # Function to get a recap of what was discussed
+    def get_conversation_summary(self, session_id: str = "default") -> Dict:  # Function to recap one conversation
         """Get conversation summary"""
-        if not self.memory:  # If memory is OFF
+        if not self.memory_store:  # If memory is OFF
             return {"memory_enabled": False}
         
-        summary = self.memory.get_summary()  # Get summary from memory tool
+        memory = self.memory_store.find(session_id)  # Don't create a session just to report it is empty
+        summary = memory.get_summary() if memory else {"num_turns": 0, "session_id": session_id}
         summary["memory_enabled"] = True
         return summary
     
@@ -0,0 +1,87 @@
+"""
+Warmup for EchoLearn AI - This file gets every model loaded before the first student arrives
+Loads and dummy-runs the heavy components in parallel at startup and tracks what is ready - Backs /health/ready
+"""
+
+from concurrent.futures import ThreadPoolExecutor  # Import a thread pool to warm components side by side
+from contextlib import contextmanager  # Import contextmanager for timing one component
+from typing import Callable, Dict, Iterable  # Import types for organization
+import threading  # Import threading to protect the status table
+import logging  # Import logging for tracking warmup
+import time  # Import time for load times
+
+logging.basicConfig(level=logging.INFO)  # Setup standard log reports
+logger = logging.getLogger(__name__)  # Create a logger for warmup
+
+
+class ReadinessTracker:  # Define the table of component states
+    """Record each component's state (pending/loading/ready/failed) and how long it took to load"""
+
+    def __init__(self, optional: Iterable[str] = ()):  # Initialize the tracker
+        """
+        Initialize Readiness Tracker
+        """
+        self.components: Dict[str, Dict] = {}  # name -> {"state", "load_time", "error"}
+        self.optional = set(optional)  # Components the server can answer without (e.g. "tts" -> text-only)
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def expect(self, name: str):  # Announce a component before it starts loading
+        """Mark a component as pending (the server is not ready until it finishes)"""
+        with self._lock:
+            self.components[name] = {"state": "pending", "load_time": None}
+
+    @contextmanager
+    def track(self, name: str):  # Time one component's loading
+        """Context manager: marks the component loading, then ready (or failed, re-raising the error)"""
+        with self._lock:
+            self.components[name] = {"state": "loading", "load_time": None}
+        start = time.time()
+        try:
+            yield
+        except Exception as e:
+            with self._lock:
+                self.components[name] = {"state": "failed", "load_time": round(time.time() - start, 2), "error": str(e)}
+            raise
+        with self._lock:
+            self.components[name] = {"state": "ready", "load_time": round(time.time() - start, 2)}
+
+    def run(self, tasks: Dict[str, Callable[[], object]]):  # Warm several components at once
+        """Run every warmup task in its own thread and wait for all of them (failures are logged, not raised)"""
+        for name in tasks:
+            self.expect(name)
+
+        def warm(name, task):
+            try:
+                with self.track(name):
+                    task()
+                logger.info(f"Warmed up {name} in {self.components[name]['load_time']}s")
+            except Exception as e:  # One broken component should not stop the others from loading
+                logger.error(f"Warmup of {name} failed: {e}")
+
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=max(1, len(tasks)), thread_name_prefix="warmup") as pool:
+            for name, task in tasks.items():
+                pool.submit(warm, name, task)
+        logger.info(f"Warmup finished in {time.time() - start:.1f}s")
+
+    def is_ready(self) -> bool:
+        """True once every component has finished loading and none of the required ones failed"""
+        with self._lock:
+            return all(
+                c["state"] == "ready" or (c["state"] == "failed" and name in self.optional)
+                for name, c in self.components.items()
+            )
+
+    def get_stats(self) -> Dict:  # Report for /health/ready
+        """Get each component's state and load time"""
+        with self._lock:
+            components = {name: dict(status) for name, status in self.components.items()}
+        failed = [name for name, status in components.items() if status["state"] == "failed"]
+        return {
+            "ready": self.is_ready(),
+            "degraded": [name for name in failed if name in self.optional],  # Unusable, but answers still work
+            "failed": [name for name in failed if name not in self.optional],  # Unusable and needed - not ready
+            "uptime": round(time.time() - self.started, 1),
+            "components": components
+        }
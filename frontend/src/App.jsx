@@ -9,6 +9,18 @@ import './App.css'; // Import the design styles
 // production (set in .env.development / .env.production or the host's env vars).
 const API_URL = import.meta.env.VITE_API_URL || '';
 
+// Each browser keeps its own conversation with the tutor. The ID is stored
+// locally and sent with every request so the backend can find this student's memory.
+const getSessionId = () => {
+    let sessionId = localStorage.getItem('echolearn_session');
+    if (!sessionId) {
+        sessionId = (window.crypto?.randomUUID?.() || `${Date.now()}-${Math.random().toString(36).slice(2)}`).replace(/[^A-Za-z0-9_-]/g, '');
+        localStorage.setItem('echolearn_session', sessionId);
+    }
+    return sessionId;
+};
+const SESSION_HEADERS = { headers: { 'X-Session-ID': getSessionId() } };
+
 const App = () => { // Define the main frontend application
     // Variables that keep track of what's happening on the screen
     const [file, setFile] = useState(null); // Current uploaded PDF file
@@ -235,7 +247,7 @@ const App = () => { // Define the main frontend application
             formData.append('use_retrieval', 'true');
             formData.append('return_audio', 'true');
 
-            const response = await axios.post(`${API_URL}/ask`, formData); // Talk to backend
+            const response = await axios.post(`${API_URL}/ask`, formData, SESSION_HEADERS); // Talk to backend
             handleAgentResponse(response.data); // Handle the AI answer
         } catch (error) {
             console.error('Question failed:', error);
@@ -253,7 +265,7 @@ const App = () => { // Define the main frontend application
             formData.append('use_retrieval', 'true');
             formData.append('return_audio', 'true');
 
-            const response = await axios.post(`${API_URL}/ask`, formData);
+            const response = await axios.post(`${API_URL}/ask`, formData, SESSION_HEADERS);
 
             if (response.data.question) {
                 setMessages(prev => [...prev, { role: 'user', content: response.data.question }]);
@@ -324,7 +336,7 @@ const App = () => { // Define the main frontend application
     const handleDeleteHistory = async () => {
         if (window.confirm('Are you sure you want to clear your conversation history?')) {
             try {
-                await axios.post(`${API_URL}/clear-memory`);
+                await axios.post(`${API_URL}/clear-memory`, null, SESSION_HEADERS);
                 setMessages([]);
                 stopAudio();
                 alert('History cleared successfully.');